@@ -1,15 +1,18 @@
 import pandas as pd
 import numpy as np
-from fooStrat.constants import fp_cloud
-from fooStrat.response import con_res
+from fooStrat.constants import fp_data
+from fooStrat.response import read_res
 from fooStrat.features import feat_odds_accuracy
+from fooStrat.store import read_partitions, read_frame
+from fooStrat.sql import query_store
 
-source_core = pd.read_pickle(fp_cloud + 'pro_data/source_core.pkl')
-match_odds = pd.read_pickle(fp_cloud + 'pro_data/match_odds.pkl')
-wins = con_res(data=source_core, obj='win')
+source_core = read_partitions('match_table', columns=['div', 'season', 'date', 'home_team', 'away_team', 'FTR'])
+match_odds = read_frame('match_odds')
+wins = read_res('win')
 
 
-match_odds.query("div == 'E0' & season == '2020' & field == 'odds_win'")
+# ad hoc queries on one league without loading the data (see `fooStrat.sql.connect_store`)
+query_store("select * from match_odds where season = '2020' and field = 'odds_win'", div=['E0'])
 
 ho = feat_odds_accuracy(data=source_core, odds=match_odds)
 
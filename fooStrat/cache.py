@@ -0,0 +1,217 @@
+import os
+import sys
+import hashlib
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from fooStrat.constants import fp_data, fp_cache, cache_mem_bytes, cache_disk_bytes
+from fooStrat.store import dataset_version, sub_datasets
+
+# memory tier: key -> [token, data, size] in least recently used order
+cache_mem = OrderedDict()
+# byte limits & location of the tiers (see `set_cache`)
+cache_conf = {'mem': cache_mem_bytes, 'disk': cache_disk_bytes, 'path': fp_cache}
+cache_stats = {'hit_mem': 0, 'hit_disk': 0, 'miss': 0, 'evict_mem': 0, 'evict_disk': 0}
+
+
+def set_cache(mem=None, disk=None, path=None):
+    """Configures the cache (defaults are set in `fooStrat.constants`).
+
+    Parameters:
+    -----------
+        mem:    int
+                optional, the byte limit of the memory tier (0 disables it)
+        disk:   int
+                optional, the byte limit of the disk tier (0 disables it)
+        path:   str
+                optional, the directory of the disk tier (on a local drive)
+
+    """
+    if mem is not None:
+        cache_conf['mem'] = int(mem)
+        evict_mem()
+    if disk is not None:
+        cache_conf['disk'] = int(disk)
+    if path is not None:
+        cache_conf['path'] = os.path.join(os.path.expanduser(path), '')
+    if cache_conf['path'] is not None:
+        evict_disk()
+
+
+def comp_size(x):
+    """The size of an artifact in memory (bytes)."""
+    if isinstance(x, (pd.DataFrame, pd.Series)):
+        return int(np.sum(x.memory_usage(deep=True)))
+    elif isinstance(x, np.ndarray):
+        return x.nbytes
+    elif isinstance(x, dict):
+        return sum(comp_size(i) for i in x.values())
+    elif isinstance(x, (list, tuple)):
+        return sum(comp_size(i) for i in x)
+    return sys.getsizeof(x)
+
+
+def cache_token(dataset, path=fp_data):
+    """The version token of the datasets an artifact is read from (see `fooStrat.store.dataset_version`).
+    A dataset also covers its sub-datasets (eg. 'flib' covers the factor libraries of all leagues). The
+    time of the last write is included, so that rebuilding a dataset from scratch invalidates it too."""
+    dataset = [dataset] if isinstance(dataset, str) else dataset
+    l = []
+    for k in dataset:
+        for i in sub_datasets(k, path=path):
+            fp = path + 'pro_data/' + i + '.version'
+            l.append((i, dataset_version(i, path=path), os.stat(fp).st_mtime_ns if os.path.isfile(fp) else 0))
+    return tuple(l)
+
+
+def read_cached(fun, dataset, path=fp_data, **kwargs):
+    """Reads an artifact through the cache. The artifact is looked up in memory, then on disk and
+    only read by `fun` if neither tier holds the latest version.
+
+    Parameters:
+    -----------
+        fun:        function
+                    the reader (eg. `fooStrat.store.read_frame`), called as fun(path=path, **kwargs)
+        dataset:    str or list
+                    the dataset(s) the artifact is read from (eg. 'match_odds' or 'flib/e0'), a cached
+                    copy is invalidated whenever any of them is written (in any process)
+        path:       str
+                    the root path of the data
+        kwargs:     the arguments of `fun` (they identify the artifact along with `fun` & `path`)
+
+    Details:
+    --------
+        The memory tier holds the most recently used artifacts up to its byte limit. The disk tier
+        stores artifacts as pickle files in a local directory, so that artifacts are shared across
+        processes (eg. the mechanics scripts), and removes the least recently used files beyond its
+        byte limit. Note that dataframes are returned as shallow copies of the cached dataframes,
+        so adding columns is fine but values must not be modified in place.
+
+    Returns:
+    --------
+        The artifact as returned by `fun`.
+
+    Example:
+    --------
+    match_odds = read_cached(read_frame, 'match_odds', name='match_odds')
+    flib = read_cached(read_flib, flib_name('E0'), div=['E0'])
+
+    """
+    key = fun.__module__ + '.' + fun.__name__ + repr((path, sorted(kwargs.items())))
+    token = cache_token(dataset, path=path)
+
+    x = cache_mem.get(key)
+    if x is not None and x[0] == token:
+        cache_mem.move_to_end(key)
+        cache_stats['hit_mem'] += 1
+        return share_cached(x[1])
+
+    res = None
+    fp = cache_conf['path']
+    if fp is not None and cache_conf['disk'] > 0:
+        fk = hashlib.sha1(key.encode()).hexdigest()
+        fn = fp + fk + '_' + hashlib.sha1(repr(token).encode()).hexdigest() + '.pkl'
+        if os.path.isfile(fn):
+            try:
+                res = pd.read_pickle(fn)
+                os.utime(fn)
+                cache_stats['hit_disk'] += 1
+            except (OSError, EOFError):
+                # evicted or being written by another process
+                res = None
+
+    if res is None:
+        res = fun(path=path, **kwargs)
+        cache_stats['miss'] += 1
+        if fp is not None and cache_conf['disk'] > 0 and comp_size(res) <= cache_conf['disk']:
+            os.makedirs(fp, exist_ok=True)
+            # outdated versions of the artifact are removed right away
+            for i in os.listdir(fp):
+                if i.startswith(fk + '_'):
+                    os.remove(fp + i)
+            pd.to_pickle(res, fn + '.' + str(os.getpid()) + '.tmp')
+            os.replace(fn + '.' + str(os.getpid()) + '.tmp', fn)
+            evict_disk()
+
+    size = comp_size(res)
+    cache_mem.pop(key, None)
+    if size <= cache_conf['mem']:
+        cache_mem[key] = [token, res, size]
+        evict_mem()
+    return share_cached(res)
+
+
+def share_cached(x):
+    """Returns a cached artifact (dataframes as shallow copies)."""
+    if isinstance(x, (pd.DataFrame, pd.Series)):
+        return x.copy(deep=False)
+    elif isinstance(x, dict):
+        return {k: share_cached(v) for k, v in x.items()}
+    return x
+
+
+def evict_mem():
+    """Removes the least recently used artifacts from memory until the byte limit is met."""
+    size = sum(i[2] for i in cache_mem.values())
+    while size > cache_conf['mem'] and len(cache_mem) > 0:
+        size -= cache_mem.popitem(last=False)[1][2]
+        cache_stats['evict_mem'] += 1
+
+
+def evict_disk():
+    """Removes the least recently used files from the disk tier until the byte limit is met."""
+    fp = cache_conf['path']
+    if fp is None or not os.path.isdir(fp):
+        return
+    fl = []
+    for i in os.listdir(fp):
+        if i.endswith('.pkl'):
+            try:
+                st = os.stat(fp + i)
+            except OSError:
+                continue
+            fl.append([st.st_mtime, st.st_size, fp + i])
+    fl.sort()
+    size = sum(i[1] for i in fl)
+    for t, s, fn in fl:
+        if size <= cache_conf['disk']:
+            break
+        try:
+            os.remove(fn)
+        except OSError:
+            pass
+        size -= s
+        cache_stats['evict_disk'] += 1
+
+
+def cache_info():
+    """The hit & miss statistics of the cache along with the number of artifacts and bytes held by each
+    tier (the disk tier is shared with other processes).
+
+    Returns:
+    --------
+        A dictionary.
+
+    """
+    fp = cache_conf['path']
+    fl = [] if fp is None or not os.path.isdir(fp) else [fp + i for i in os.listdir(fp) if i.endswith('.pkl')]
+    n = cache_stats['hit_mem'] + cache_stats['hit_disk'] + cache_stats['miss']
+    res = dict(cache_stats)
+    res['hit_ratio'] = (cache_stats['hit_mem'] + cache_stats['hit_disk']) / n if n > 0 else np.nan
+    res['mem_items'] = len(cache_mem)
+    res['mem_bytes'] = sum(i[2] for i in cache_mem.values())
+    res['disk_items'] = len(fl)
+    res['disk_bytes'] = sum(os.path.getsize(i) for i in fl if os.path.isfile(i))
+    return res
+
+
+def clear_cache(disk=False):
+    """Empties the memory tier (and optionally the disk tier) and resets the statistics."""
+    cache_mem.clear()
+    for k in cache_stats:
+        cache_stats[k] = 0
+    fp = cache_conf['path']
+    if disk is True and fp is not None and os.path.isdir(fp):
+        for i in os.listdir(fp):
+            if i.endswith('.pkl'):
+                os.remove(fp + i)
@@ -1,6 +1,31 @@
+import os
 # constants
 fp_cloud = '/Users/dariopopadic/Library/Mobile Documents/com~apple~CloudDocs/Data/fooStrat/'
 fp_cloud_source = fp_cloud + 'src_data/'
 fp_cloud_process = fp_cloud + 'pro_data/'
 fp_cloud_log = fp_cloud + 'log_data/'
-
+# local working directory (eg. export FOOSTRAT_LOCAL=~/fooStrat_data/): the pipeline reads from
+# and writes to it and `fooStrat.sync` mirrors it to the cloud folder, without it the cloud
+# folder is used directly
+fp_local = os.environ.get('FOOSTRAT_LOCAL')
+fp_data = fp_cloud if fp_local is None else os.path.join(os.path.expanduser(fp_local), '')
+fp_data_source = fp_data + 'src_data/'
+fp_data_process = fp_data + 'pro_data/'
+fp_data_log = fp_data + 'log_data/'
+# storage format & compression codec of each stored artifact (see `fooStrat.testing.bench_codecs`):
+# partitioned & segmented datasets are parquet (codecs none, snappy, lz4, zstd), single tables are
+# pickle (uncompressed), parquet or feather (codecs none, lz4, zstd)
+store_codec = {'source_core': ['parquet', 'zstd'],
+               'match_table': ['parquet', 'zstd'],
+               'results': ['parquet', 'zstd'],
+               'team_season': ['parquet', 'zstd'],
+               'flib': ['parquet', 'zstd'],
+               'match_odds': ['feather', 'zstd'],
+               'upcoming_games': ['feather', 'zstd']}
+# cache of frequently read artifacts (see `fooStrat.cache`): byte limits of the memory tier and of the
+# optional disk tier on a local drive (eg. export FOOSTRAT_CACHE=~/fooStrat_cache/), which is shared
+# by all processes (eg. the mechanics scripts)
+cache_mem_bytes = int(float(os.environ.get('FOOSTRAT_CACHE_MEM', 2e9)))
+cache_disk_bytes = int(float(os.environ.get('FOOSTRAT_CACHE_DISK', 20e9)))
+fp_cache = os.environ.get('FOOSTRAT_CACHE')
+fp_cache = None if fp_cache is None else os.path.join(os.path.expanduser(fp_cache), '')
@@ -142,7 +142,7 @@ def comp_edge(factor_data, results, byf=['overall']):
 
     # erase non-events..
     er_ed.dropna(subset=['result'], inplace=True)
-    res = pd.DataFrame()
+    res = []
     for k in byf:
         if k == "overall":
             key_gr = 'bucket'
@@ -160,8 +160,9 @@ def comp_edge(factor_data, results, byf=['overall']):
             res0.rename(columns={k: 'field'}, inplace=True)
 
         res0.drop(['hits', 'n_obs'], axis=1, inplace=True)
-        res = res.append(res0, ignore_index=True, sort=False)
+        res.append(res0)
 
+    res = pd.concat(res, axis=0, ignore_index=True, sort=False)
     res.sort_values(by=['field', 'bucket'], inplace=True)
     res.reset_index(drop=True, inplace=True)
 
@@ -4,7 +4,6 @@ from scipy.stats import zscore
 from itertools import chain
 import fooStrat.servicers as fose
 import fooStrat.metrics as sfs
-from fooStrat.mapping import odds_fields, odds_fields_neutral
 from fooStrat.response import con_res_wd
 
 def fhome(data):
@@ -14,7 +13,7 @@ def fhome(data):
 
     Parameters:
     -----------
-        data(dataframe): a dataframe with columns div, date, season, home_team, away_team, field, val
+        data(dataframe): a dataframe with columns div, date, season, home_team, away_team, field, val or the match table
 
     Returns:
     --------
@@ -33,7 +32,7 @@ def fhome(data):
     """
     # 2 ways to identify games: 1) FTR and 2) AvgA
     # data_cf = data.query("field=='FTR' | field=='AvgA'")[['div', 'season', 'date', 'home_team', 'away_team']]
-    data_cf = data.query("field=='FTR'")[['div', 'season', 'date', 'home_team', 'away_team']]
+    data_cf = fose.match_fields(data, code=['FTR'], dropna=False)[['div', 'season', 'date', 'home_team', 'away_team']]
     data_cf.reset_index(drop=True, inplace=True)
 
     # home
@@ -67,7 +66,7 @@ def feat_goalbased(data, k=5):
     Parameters:
     -----------
     data:       pandas dataframe
-                a dataframe with columns div, date, season, home_team, away_team, field, val
+                a dataframe with columns div, date, season, home_team, away_team, field, val or the match table
     k:          integer
                 the lookback window to be used
 
@@ -112,8 +111,8 @@ def feat_goalbased(data, k=5):
 
     # ----- feature: points per game (last 5)
     feat_ppg = data_goals_co_i.copy()
-    feat_ppg['val'] = feat_ppg.loc[:, ['g_scored', 'g_received']]. \
-        apply(lambda x: 3 if x[0] > x[1] else (1 if x[0] == x[1] else 0), axis=1)
+    feat_ppg['val'] = np.where(feat_ppg['g_scored'] > feat_ppg['g_received'], 3,
+                               np.where(feat_ppg['g_scored'] == feat_ppg['g_received'], 1, 0))
     feat_ppg = feat_ppg.sort_values('date').groupby(['team'])['val']. \
         rolling(k, min_periods=1).sum().reset_index()
     feat_ppg['val'] = feat_ppg['val'] / k
@@ -154,7 +153,7 @@ def feat_resbased(data):
     Parameters:
     -----------
     data:       pandas dataframe
-                a dataframe with columns div, date, season, home_team, away_team, field, val
+                a dataframe with columns div, date, season, home_team, away_team, field, val or the match table
     k:          integer
                 the lookback window to be used
 
@@ -179,23 +178,21 @@ def feat_turnaround(data):
     Parameters:
     -----------
         data:   pandas dataframe
-                a dataframe with columns div, date, season, home_team, away_team, field, val
+                a dataframe with columns div, date, season, home_team, away_team, field, val or the match table
 
     Details
     -------
         - for turnaround-ability, when there is no half-time data, full-time results are considered only
 
     """
-    data_ed = data.query("field in ['HTAG', 'HTHG', 'FTAG', 'FTHG']")
-
     # half-time goals
-    htg = fose.neutralise_field(data_ed,
+    htg = fose.neutralise_field(data,
                                 field=['HTHG', 'HTAG'],
                                 field_name=['g_scored_ht', 'g_received_ht'],
                                 field_numeric=True,
                                 column_field=True)
     # full-time goals
-    ftg = fose.neutralise_field(data_ed,
+    ftg = fose.neutralise_field(data,
                                 field=['FTHG', 'FTAG'],
                                 field_name=['g_scored_ft', 'g_received_ft'],
                                 field_numeric=True,
@@ -207,14 +204,13 @@ def feat_turnaround(data):
     cog['val'] = (cog['g_scored_ft'] - cog['g_received_ft']) - (cog['g_scored_ht'] - cog['g_received_ht'])
     # handle missing data by simply taking into account the end-result
     cog['val_nan'] = (cog['g_scored_ft'] - cog['g_received_ft'])
-    cog['val'] = cog[['val', 'val_nan']].apply(lambda x: x[1] if np.isnan(x[0]) else x[0], axis=1)
+    cog['val'] = np.where(cog['val'].isna(), cog['val_nan'], cog['val'])
     cog['field'] = 'turnaround_ability_last'
     cog = cog[['div', 'season', 'date', 'team', 'field', 'val']]
 
     # --- turnaround ability (past 3)
     cog_past = cog.copy()
-    tmp = cog_past.groupby('team', as_index=False)['val'].rolling(window=3, min_periods=1).sum()
-    cog_past['val'] = tmp.reset_index(level=0, drop=True)
+    cog_past['val'] = cog_past.groupby('team')['val'].transform(lambda x: x.rolling(window=3, min_periods=1).sum())
     cog_past['field'] = 'turnaround_ability_trend'
 
     # combine
@@ -232,7 +228,7 @@ def feat_turnaround(data):
 
 
 
-def feat_stanbased(data):
+def feat_stanbased(data, team_season=None):
     """Calculates standings based factors:
         - position residual
         - points residual
@@ -240,13 +236,15 @@ def feat_stanbased(data):
 
     Parameters:
     -----------
-        data:   pandas dataframe
-                a dataframe with columns div, date, season, home_team, away_team, field, val
+        data:           pandas dataframe
+                        a dataframe with columns div, date, season, home_team, away_team, field, val or the match table
+        team_season:    pandas dataframe
+                        optional, the stored team-season summary of the seasons in data (see
+                        `fooStrat.processing.read_team_season`), otherwise it is constructed from data
 
     """
-    df_0 = data[data['field'].isin(['FTR', 'FTHG', 'FTAG'])]
     # compute rolling league standings
-    df_1 = fose.comp_league_standing(data=df_0, home_goals='FTHG', away_goals='FTAG', result='FTR')
+    df_1 = fose.comp_league_standing(data=data, home_goals='FTHG', away_goals='FTAG', result='FTR')
     # a=df_1.query("div=='E2' & team in ['shrewsbury']").sort_values(['team', 'date'])
 
     # --- points advantage
@@ -277,7 +275,9 @@ def feat_stanbased(data):
     rppa = fose.expand_field(data=rppa, dates=None)
 
     # --- team quality cluster (no lag required here)
-    tqc = sfs.team_quality_cluster(data=df_1) # already a z-score where necessary
+    if team_season is None:
+        team_season = fose.con_team_season(data=data, home_goals='FTHG', away_goals='FTAG', result='FTR')
+    tqc = sfs.team_quality_cluster(data=team_season) # already a z-score where necessary
     # add dummy-date
     tqc = fose.insert_tp1_vals(data=tqc)
 
@@ -459,27 +459,33 @@ def feat_strength(data, k=3):
 
 
 
-def feat_odds_volatility(data,
-                         odds_fields=odds_fields,
-                         odds_fields_neutral=odds_fields_neutral):
-    """Calculates odds volatility of win/draw events across all bookies for each game."""
-    data_neu = fose.neutralise_field_multi(data=data,
-                                           field=odds_fields,
-                                           field_map=odds_fields_neutral,
-                                           field_numeric=True,
-                                           column_field=False)
-    # unique fields
-    ofn = odds_fields_neutral.groupby('event')['field_neutral'].unique().reset_index()
-    ofn = ofn.explode('field_neutral').reset_index(drop=True).rename(columns={'field_neutral': 'field'})
-    # add event
-    data_neu = pd.merge(data_neu,
-                        ofn,
-                        how='left',
-                        on='field')
-    # --- odds volatility
-    # calculate vol of draw/win and derive average
-    df1 = data_neu.groupby(['season', 'div', 'date', 'team', 'event'])['val'].std().reset_index()
-    df1 = df1.groupby(['season', 'div', 'date', 'team'])['val'].mean().reset_index()
+def feat_odds_volatility(data, cube=None):
+    """Calculates odds volatility of win/draw events across all bookies for each game.
+
+    Parameters:
+    -----------
+        data:   pd dataframe
+                the match table (see `fooStrat.processing.con_match_table`)
+        cube:   tuple
+                optional, the odds and axes of the odds cube (see `fooStrat.processing.read_odds_cube`),
+                so that `data` does not need the odds columns
+
+    """
+    values, axes = fose.con_odds_cube(data) if cube is None else cube
+    # vol of win/draw from each team's perspective & average
+    vol = fose.comp_odds_vol(values, axes)
+    oc = list(axes['outcome'])
+    gm = pd.DataFrame({k: axes[k] for k in ['season', 'div', 'date']})
+    res = []
+    for k, j in [['home_team', 'home'], ['away_team', 'away']]:
+        i = [oc.index(j), oc.index('draw')]
+        n = np.sum(~np.isnan(vol[:, i]), axis=1)
+        with np.errstate(invalid='ignore'):
+            v = np.nansum(vol[:, i], axis=1) / n
+        # teams without any win/draw odds are left out
+        res.append(gm.assign(team=axes[k], val=v)[~np.isnan(values[:, :, i]).all(axis=(1, 2))])
+    df1 = pd.concat(res, axis=0, sort=False, ignore_index=True)
+    df1 = df1.sort_values(['season', 'div', 'date', 'team']).reset_index(drop=True)
     df1['field'] = 'odds_volatility'
 
     return df1
@@ -493,7 +499,7 @@ def feat_odds_accuracy(data, odds):
     # Parameters:
     -------------
         data:   pd dataframe
-                a dataframe with columns div, date, season, home_team, away_team, field, val
+                a dataframe with columns div, date, season, home_team, away_team, field, val or the match table
         odds:   pd dataframe
                 a dataframe with columns div, date, season, field, val
 
@@ -515,21 +521,22 @@ def feat_odds_accuracy(data, odds):
 
 
 
-def feat_odds_uncertainty(data, odds):
+def feat_odds_uncertainty(data, odds, cube=None):
     """Derives the prediction (or odds) uncertainty features:
         - volatility of odds (the lower, the better)
         - odds prediction accuracy (the more accurate, the better)
         - pricing spread (the lower, the better - yet to implement)
-       Estimates are performed over the last 10 games for each team.
+       Estimates are performed over the last 10 games for each team. Pass the odds `cube` (see
+       `feat_odds_volatility`) if `data` holds no odds columns.
     """
     # --- odds volatility
-    df1 = feat_odds_volatility(data=data)
+    df1 = feat_odds_volatility(data=data, cube=cube)
     df1_ed = fose.expand_field(data=df1)
     df1_ed['val'] = df1_ed.groupby(['div', 'season', 'date', 'field'])['val'].transform(lambda x: zscore(-1 * x, ddof=1))
 
     # --- historical odds prediction accuracy
     df2 = feat_odds_accuracy(data=data, odds=odds)
-    df2_ed = df2.query("field in ['win', 'lose']").groupby(['div', 'season', 'team']).agg('mean').reset_index()
+    df2_ed = df2.query("field in ['win', 'lose']").groupby(['div', 'season', 'team'])[['val']].agg('mean').reset_index()
     df2_ed['field'] = "odds_accuracy"
     # expand field
     date_univ = fose.con_date_univ(data=data)
@@ -538,7 +545,7 @@ def feat_odds_uncertainty(data, odds):
 
     # --- odds uncertainty composite
     dfc = pd.concat([df1_ed, df2_ed], axis=0, sort=True)
-    dfc = dfc.groupby(['div', 'season', 'date', 'team']).agg('mean').reset_index()
+    dfc = dfc.groupby(['div', 'season', 'date', 'team'])[['val']].agg('mean').reset_index()
     dfc['field'] = "uncertainty_composite"
     dfc['val'] = dfc.groupby(['div', 'season', 'date', 'field'])['val'].transform(lambda x: zscore(x, ddof=1))
 
@@ -1,5 +1,8 @@
 import pandas as pd
+import numpy as np
 import os
+from multiprocessing import get_context
+from concurrent.futures import ProcessPoolExecutor
 
 def anti_join(x, y, on):
     """Anti-join function that returns rows from x not matching y."""
@@ -8,6 +11,52 @@ def anti_join(x, y, on):
     return z
 
 
+def hash_keys(data, on):
+    """Hashes the key columns of a dataframe into a single uint64 key per row (categorical and object
+    columns with the same values have the same keys)."""
+    x = data[on].copy()
+    for k in on:
+        # dates are hashed at the same resolution
+        if pd.api.types.is_datetime64_any_dtype(x[k]):
+            x[k] = x[k].values.astype('datetime64[ns]')
+    return pd.util.hash_pandas_object(x, index=False).values
+
+
+def upsert(x, y, on):
+    """Upsert function that returns the rows of x & y where rows of y replace the rows of x with the same
+    keys (rows are matched by hashed keys, see `hash_keys`)."""
+    y = y[~pd.Series(hash_keys(y, on)).duplicated(keep='last').values]
+    x = x[~np.isin(hash_keys(x, on), hash_keys(y, on))]
+    return pd.concat([x, y], axis=0, ignore_index=True, sort=False)
+
+
+def map_jobs(fun, *args, n_jobs=1):
+    """Applies a function to each element of the arguments (as `map`) in n_jobs worker processes. The
+    results are returned in the order of the arguments irrespective of which worker finishes first."""
+    return list(imap_jobs(fun, *args, n_jobs=n_jobs))
+
+
+def imap_jobs(fun, *args, n_jobs=1):
+    """As `map_jobs` but the results are yielded one by one (in the order of the arguments), so that they
+    can be consumed while the workers are still running."""
+    args = [list(i) for i in args]
+    if n_jobs == 1 or len(args[0]) <= 1:
+        yield from map(fun, *args)
+        return
+    # forked workers so that the function can be run from scripts
+    with ProcessPoolExecutor(max_workers=min(n_jobs, len(args[0])), mp_context=get_context('fork')) as ex:
+        yield from ex.map(fun, *args)
+
+
+def last_period(data, per):
+    """The rows of a dataframe with a sorted date index within the last period `per` (eg. '365D'), as
+    `DataFrame.last` which is no longer part of pandas."""
+    if len(data) == 0:
+        return data
+    start = data.index[-1] - pd.tseries.frequencies.to_offset(per)
+    return data.iloc[data.index.searchsorted(start, side='right'):]
+
+
 def ver_type(data, field):
     """Make sure data types in a dataframe are as desired. Make adjustments if not.
 
@@ -20,8 +69,10 @@ def ver_type(data, field):
 
                     str:        object
                     float:      float64
+                    float32:    float32
                     int:        int64
                     date:       datatime64
+                    cat:        category
 
                 For example, one wants an input field in data to be a string. In that case,
                 you set field = {'my_column': 'str'} and the my_column field is checked whether
@@ -35,8 +86,10 @@ def ver_type(data, field):
     # the template to compare desired types to
     temp = {'str': 'object',
             'float': 'float64',
+            'float32': 'float32',
             'int': 'int64',
-            'date': 'datetime'}
+            'date': 'datetime',
+            'cat': 'category'}
 
     for (key, value) in field.items():
         i = [key, value]
@@ -48,10 +101,14 @@ def ver_type(data, field):
                 data[i[0]] = pd.to_numeric(data[i[0]], downcast='signed', errors='coerce')
             elif i[1] == "float":
                 data[i[0]] = pd.to_numeric(data[i[0]], errors='coerce')
+            elif i[1] == "float32":
+                data[i[0]] = pd.to_numeric(data[i[0]], errors='coerce').astype('float32')
             elif i[1] == "str":
                 data[i[0]] = pd.to_string(data[i[0]])
             elif i[1] == "date":
                 data[i[0]] = pd.to_datetime(data[i[0]], errors='coerce')
+            elif i[1] == "cat":
+                data[i[0]] = data[i[0]].astype('category')
 
     return data
 
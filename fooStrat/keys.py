@@ -0,0 +1,172 @@
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from fooStrat.constants import fp_data
+from fooStrat.store import lock_dataset, bump_version
+
+# bit widths of the components of a packed key
+key_bits = {'div': 8, 'season': 7, 'date': 16, 'team': 14, 'field': 12}
+# the key component of each key column
+key_kinds = {'div': 'div',
+             'season': 'season',
+             'date': 'date',
+             'team': 'team',
+             'home_team': 'team',
+             'away_team': 'team',
+             'opponent': 'team',
+             'field': 'field'}
+# seasons are stored relative to the first season
+season_0 = 1950
+# key dictionaries in use by root path (see `read_keys`)
+key_cache = {}
+
+
+def read_keys(path=fp_data):
+    """Retrieves the key dictionary which maps div, team and field names to integers.
+
+    Details:
+    --------
+        The dictionary is read once from `pro_data/key_dict.parquet` and kept in memory. Names
+        that are not in the stored dictionary are added in memory when they are encoded, so
+        that keys are consistent within a session. Use `update_keys` to store new names.
+
+    Returns:
+    --------
+        A dict with a name -> integer dict for each of div, team, field.
+
+    """
+    if path not in key_cache:
+        kd = {'div': {}, 'team': {}, 'field': {}}
+        fp = path + 'pro_data/key_dict.parquet'
+        with lock_dataset('key_dict', path=path):
+            if os.path.isfile(fp):
+                x = pq.read_table(fp).to_pandas()
+                for k, y in x.groupby('kind', sort=False):
+                    kd[k] = dict(zip(y['name'], y['id'].astype(int)))
+        key_cache[path] = kd
+    return key_cache[path]
+
+
+def encode_keys(x, kind, path=fp_data):
+    """Encodes a column as integers (see `read_keys`). Missing values are encoded as -1.
+
+    Parameters:
+    -----------
+        x:      pandas series
+                the values to encode (eg. team names or dates)
+        kind:   str
+                one of div, season, date, team, field
+        path:   str
+                the root path of the data
+
+    """
+    miss = np.asarray(pd.isna(x))
+    if kind == 'date':
+        res = pd.to_datetime(x).values.astype('datetime64[D]').astype('int64')
+    elif kind == 'season':
+        res = pd.to_numeric(x).fillna(season_0).values.astype('int64') - season_0
+    else:
+        kd = read_keys(path=path)[kind]
+        codes, u = pd.factorize(x)
+        for i in u:
+            if i not in kd:
+                kd[i] = len(kd)
+        res = np.array([kd[i] for i in u], dtype='int64')[codes]
+    res[miss] = -1
+
+    if (res[~miss] < 0).any() or (res >= 2 ** key_bits[kind]).any():
+        raise ValueError("The " + kind + " key is out of range.")
+    return res
+
+
+def pack_key(data, on, path=fp_data):
+    """Packs the key columns of a dataframe into a single int64 key.
+
+    Parameters:
+    -----------
+        data:   pandas dataframe
+                the data with the key columns
+        on:     list
+                the key columns (eg. ['div', 'season', 'date', 'team'])
+        path:   str
+                the root path of the data
+
+    Details:
+    --------
+        The same columns in the same order must be packed to compare keys. Dates are packed as
+        day numbers and the names of divisions, teams and fields as their integer in the key
+        dictionary (see `read_keys`). Rows with a missing key column (eg. upcoming games without
+        a date) are given the key -1.
+
+    Example:
+    --------
+    x['key'] = pack_key(x, on=['div', 'season', 'team', 'date', 'field'])
+
+    """
+    res = np.zeros(len(data), dtype='int64')
+    miss = np.zeros(len(data), dtype=bool)
+    for k in on:
+        tmp = encode_keys(data[k], kind=key_kinds[k], path=path)
+        miss |= tmp < 0
+        res = (res << key_bits[key_kinds[k]]) | tmp
+    res[miss] = -1
+    return res
+
+
+def merge_key(x, y, on, how='inner', path=fp_data):
+    """Merges two dataframes on their packed keys (see `pack_key`) instead of the key columns.
+    Same as `pd.merge(x, y, on=on, how=how)` although the rows of an outer join are not sorted and
+    rows with missing keys never match."""
+    kx = pack_key(x, on=on, path=path)
+    ky = pack_key(y, on=on, path=path)
+    # rows with missing keys get distinct negative keys
+    nx, ny = (kx < 0).sum(), (ky < 0).sum()
+    kx[kx < 0] = -1 - np.arange(nx)
+    ky[ky < 0] = -1 - nx - np.arange(ny)
+    xk = x.assign(key_int=kx)
+    yk = y.assign(key_int=ky)
+    if how in ['inner', 'left']:
+        res = pd.merge(xk, yk.drop(on, axis=1), on='key_int', how=how)
+    elif how == 'right':
+        res = pd.merge(xk.drop(on, axis=1), yk, on='key_int', how=how)
+    else:
+        # the keys of both sides
+        res = pd.concat([xk[on + ['key_int']], yk[on + ['key_int']]], axis=0, sort=False)
+        res = res.drop_duplicates('key_int')
+        res = pd.merge(res, xk.drop(on, axis=1), on='key_int', how='left')
+        res = pd.merge(res, yk.drop(on, axis=1), on='key_int', how='left')
+    return res.drop('key_int', axis=1)
+
+
+def anti_join_key(x, y, on, path=fp_data):
+    """Returns the rows from x not matching y on their packed keys (see `pack_key`). Rows with
+    missing keys never match."""
+    ky = pack_key(y, on=on, path=path)
+    return x[~np.isin(pack_key(x, on=on, path=path), ky[ky >= 0])]
+
+
+def update_keys(data, path=fp_data):
+    """Adds the div, team and field names in `data` to the stored key dictionary. The stored dictionary
+    is re-read under an exclusive lock (see `fooStrat.store.lock_dataset`), so that concurrent writers
+    never assign the same integer to different names or lose each other's names."""
+    with lock_dataset('key_dict', shared=False, path=path):
+        # names that were only encoded in memory are dropped in favour of the stored dictionary
+        key_cache.pop(path, None)
+        kd = read_keys(path=path)
+        n0 = sum(len(i) for i in kd.values())
+        for k in data.columns:
+            if key_kinds.get(k) in kd:
+                encode_keys(data[k].dropna(), kind=key_kinds[k], path=path)
+        if sum(len(i) for i in kd.values()) == n0:
+            return
+
+        res = pd.DataFrame([[k, str(n), i] for k, v in kd.items() for n, i in v.items()],
+                           columns=['kind', 'name', 'id'])
+        fp = path + 'pro_data/key_dict.parquet'
+        tmp = fp + '.' + str(os.getpid()) + '.tmp'
+        os.makedirs(path + 'pro_data/', exist_ok=True)
+        pq.write_table(pa.Table.from_pandas(res, preserve_index=False), tmp)
+        os.replace(tmp, fp)
+        bump_version('key_dict', path=path)
@@ -42,6 +42,15 @@ competition = {'E0':'England Premier League',
                'USA MLS':'USA MLS'}
 # ml_map = pd.DataFrame(list(competition.items()), columns=['Div', 'Competition'])
 ml_map = pd.read_csv('./data/mapping/leagues.csv', encoding = "ISO-8859-1", delimiter=";")
+# field groups (the class of a field), the source data is stored in a file per group
+fd_map = pd.read_csv('./data/mapping/fields.csv').dropna(subset=['field'])
+field_groups = dict(zip(fd_map['field'], fd_map['class']))
+# fields that are renamed at ingest (see `fooStrat.processing.synchronise_data`)
+field_alias = {'Res': 'FTR', 'HG': 'FTHG', 'AG': 'FTAG'}
+# match table (see `fooStrat.processing.con_match_table`): a column per field, the results are codes
+# (eg. 'H', 'D', 'A') and all other fields are numeric
+match_cols = [i for i in fd_map['field'] if i not in field_alias]
+match_codes = [i for i in fd_map.loc[fd_map['event'].isin(['result_ft', 'result_ht']), 'field'] if i in match_cols]
 
 
 # odds mapping
@@ -63,6 +72,17 @@ odds_fields = {'odds_home_win':oh,
                'odds_draw_win':od,
                'odds_under_25_goal':btp5,
                'odds_above_25_goal': atp5}
+# odds cube (see `fooStrat.servicers.con_odds_cube`): outcome & bookmaker of each odds field
+odds_outcomes = {'odds_home_win': 'home',
+                 'odds_draw_win': 'draw',
+                 'odds_away_win': 'away',
+                 'odds_above_25_goal': 'over',
+                 'odds_under_25_goal': 'under'}
+# aggregates across bookmakers (maximum & average odds) rather than bookmakers
+odds_aggregates = ['BbMx', 'BbAv', 'Max', 'Avg']
+odds_books = pd.DataFrame([[f, f[:-4] if f[-4:] in ['>2.5', '<2.5'] else f[:-1], odds_outcomes[k]]
+                           for k in odds_outcomes for f in odds_fields[k]],
+                          columns=['field', 'bookmaker', 'outcome'])
 
 # symmetric odds map
 owsy = ['B365_win', 'BS_win', 'BW_win', 'GB_win', 'IW_win', 'LB_win',
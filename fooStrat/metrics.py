@@ -10,17 +10,18 @@ def team_quality_cluster(data):
     Parameters:
     -----------
         data:   pandas dataframe
-                an object retrieved from comp_league_standing
+                the team-season summary (see `fooStrat.servicers.con_team_season`)
 
     Details:
     --------
         Note that these features are unusual in a sense that there is only a single
-        value for each team and season.
+        value for each team and season (as of the last game of the season).
 
     """
 
     # last game of season
-    data_ed = data.groupby(['div', 'season']).apply(lambda x: x[x['date'] == x['date'].max()]).reset_index(drop=True)
+    data_ed = data.sort_values(['div', 'season', 'team']).reset_index(drop=True)
+    data_ed['date'] = data_ed.groupby(['div', 'season'])['last_date'].transform('max')
 
     # -- team quality cluster
     tqual = data_ed.copy()
@@ -31,9 +32,8 @@ def team_quality_cluster(data):
 
     # -- autocorrelation last 5y
     acf = data_ed.copy()
-    tmp = acf.groupby('team', as_index=False)['points'].rolling(window=5, min_periods=1). \
-        apply(lambda x: pd.Series(x).autocorr(lag=1), raw=True)
-    acf['val'] = tmp.reset_index(level=0, drop=True)
+    acf['val'] = acf.groupby('team')['points']. \
+        transform(lambda x: x.rolling(window=5, min_periods=1).apply(lambda y: pd.Series(y).autocorr(lag=1), raw=True))
     acf = acf[['div', 'season', 'date', 'team', 'val']]
     acf['field'] = 'team_quality_consistency'
     acf = acf[acf['val'].notna()].reset_index(level=0, drop=True)
@@ -52,7 +52,8 @@ def fform(data, field, type, k=5):
     Parameters:
     -----------
         data:   pandas dataframe
-                a dataframe with columns div, date, season, home_team, away_team, field, val
+                a dataframe with columns div, date, season, home_team, away_team, field, val or the
+                match table (see `servicers.match_fields`)
         field:  str
                 the relevant field in the field column of data to the calculate the factor
         type:   str
@@ -62,13 +63,7 @@ def fform(data, field, type, k=5):
 
     """
 
-    data_ed = data.query('field==@field').loc[:, ['div',
-                                                  'season',
-                                                  'date',
-                                                  'home_team',
-                                                  'away_team',
-                                                  'val']]
-    data_ed = data_ed.dropna().reset_index(drop=True)
+    data_ed = fose.match_fields(data, code=[field]).rename(columns={field: 'val'})
 
     h = data_ed.loc[:, 'val'].apply(lambda x: 3 if x == 'H' else (1 if x == 'D' else 0))
     h = pd.concat([data_ed.loc[:, ['div',
@@ -1,11 +1,16 @@
 import pandas as pd
 import numpy as np
+from functools import partial
+from multiprocessing import get_context
+from concurrent.futures import ProcessPoolExecutor
 from sklearn.metrics import confusion_matrix
 from sklearn.naive_bayes import GaussianNB
 from sklearn.linear_model import LogisticRegression
 from sklearn.neighbors import KNeighborsClassifier
 from sklearn.tree import DecisionTreeClassifier
-from fooStrat.helpers import class_accuracy_stats, transform_range
+from fooStrat.helpers import class_accuracy_stats, transform_range, last_period
+from fooStrat.constants import fp_data
+from fooStrat.store import part_key, write_cube, open_cube
 import fooStrat.servicers as fose
 
 
@@ -136,15 +141,7 @@ def con_mod_datset_1(data, per_ind, t_fit, t_pred, per, categorical=None, pred_m
     --------
         X_train, X_test, y_train, id_test
     """
-    # consider only last n obervations (adjustment needed in prediction mode)
-    if pred_mode is False:
-        per_ind_t = per_ind.query("date <= @t_pred").set_index('date').last(per).reset_index()
-    else:
-        # extract prediction date to filter relevant estimation window & add back afterwards
-        t_pred_ed = per_ind['date'].iloc[-2]
-        per_ind_t = per_ind.query("date <= @t_pred_ed").set_index('date').last(per).reset_index()
-        per_ind_t = pd.concat([per_ind_t, per_ind.tail(1)], axis=0, sort=True).reset_index(drop=True)
-
+    per_ind_t = mod_window(per_ind=per_ind, t_pred=t_pred, per=per, pred_mode=pred_mode)
     data_edoh = pd.merge(data, per_ind_t['date'], how="inner", on="date")
     # one-hot encoding
     if categorical is not None:
@@ -172,6 +169,167 @@ def con_mod_datset_1(data, per_ind, t_fit, t_pred, per, categorical=None, pred_m
 
 
 
+def mod_window(per_ind, t_pred, per, pred_mode=False):
+    """Retrieves the dates of the lookback period for a model fit (see `con_mod_datset_1`)."""
+    # consider only last n obervations (adjustment needed in prediction mode)
+    if pred_mode is False:
+        per_ind_t = per_ind.query("date <= @t_pred").set_index('date').pipe(last_period, per=per).reset_index()
+    else:
+        # extract prediction date to filter relevant estimation window & add back afterwards
+        t_pred_ed = per_ind['date'].iloc[-2]
+        per_ind_t = per_ind.query("date <= @t_pred_ed").set_index('date').pipe(last_period, per=per).reset_index()
+        per_ind_t = pd.concat([per_ind_t, per_ind.tail(1)], axis=0, sort=True).reset_index(drop=True)
+    return per_ind_t
+
+
+
+def con_mod_cube(factors, results, path=fp_data):
+    """Construct the modelling data set of a league as a dense float32 cube (date x team x feature)
+    and store it so that it can be memory-mapped (see `fooStrat.store.open_cube`).
+
+    Parameters:
+    -----------
+        factors:    pandas dataframe
+                    signals for each team of a single league with columns season, div, date, team, field, val
+        results:    pandas dataframe
+                    results of games with columns season, div, date, team, val
+        path:       str
+                    the root path of the data
+
+    Details:
+    --------
+        This is the dense equivalent of `con_mod_datset_0`. The first feature of the cube is the
+        result and dates/teams without a result are missing. The axes are stored sorted next to
+        the cube (date, team, feature) together with the season of each date and the division.
+
+    """
+    div = factors['div'].unique()
+    if len(div) != 1:
+        raise ValueError("The factors of a single league are required to construct a cube.")
+    keys = ['div', 'season', 'date', 'team']
+    rcon = results.loc[results['div'] == div[0], keys + ['val']].assign(field='result')
+    fcon = pd.merge(factors[keys + ['field', 'val']], rcon[keys], on=keys, how='inner')
+    data = pd.concat([rcon, fcon], axis=0, sort=False, ignore_index=True)
+
+    dates = np.sort(data['date'].unique()).astype('datetime64[ns]')
+    teams = np.sort(data['team'].astype(str).unique())
+    features = ['result'] + sorted(fcon['field'].astype(str).unique())
+    seasons = data.groupby('date')['season'].max().reindex(dates).values
+
+    values = np.full((len(dates), len(teams), len(features)), np.nan, dtype='float32')
+    values[pd.Index(dates).get_indexer(data['date']),
+           pd.Index(teams).get_indexer(data['team'].astype(str)),
+           pd.Index(features).get_indexer(data['field'].astype(str))] = data['val'].astype('float32').values
+
+    write_cube(values, {'date': dates, 'team': teams, 'feature': np.array(features),
+                        'season': seasons, 'div': np.array([str(div[0])])},
+               name='cube/' + part_key(div[0]), path=path)
+
+
+
+def cube_window(values, axes, t0=None, t1=None):
+    """Retrieves the dates t0 <= date <= t1 of a cube as a view (no data is copied).
+
+    Returns:
+    --------
+        The values and dates of the window.
+
+    """
+    i0 = 0 if t0 is None else np.searchsorted(axes['date'], np.datetime64(t0, 'ns'), side='left')
+    i1 = len(axes['date']) if t1 is None else np.searchsorted(axes['date'], np.datetime64(t1, 'ns'), side='right')
+    return values[i0:i1], axes['date'][i0:i1]
+
+
+
+def elim_na_cube(div, min=0.70, path=fp_data):
+    """Eliminates features where the majority of observations are missing (as in
+    `fooStrat.servicers.elim_na_features`) and returns the remaining features of a cube."""
+    values, axes = open_cube('cube/' + part_key(div), path=path)
+    obs = values[:, :, 1:][~np.isnan(values[:, :, 0])]
+    voi = axes['feature'][1:]
+    rc = np.mean(~np.isnan(obs), axis=0) > min
+    # eliminate features that are no longer active as of latest
+    inact = np.sum(np.isnan(obs[-100:]), axis=0) >= 50
+    return [str(i) for i in voi[rc & ~inact]]
+
+
+
+def cube_levels(values, axes, feature):
+    """The categories of a categorical feature of a cube (see `con_mod_cube`) across all dates & teams."""
+    x = values[:, :, list(axes['feature']).index(feature)]
+    return np.unique(x[~np.isnan(x)])
+
+
+
+def con_mod_datset_2(values, axes, team, per_ind, t_fit, t_pred, per, features=None, categorical=None,
+                     pred_mode=False, dropna=False):
+    """Construct the modelling dataset for a single model fit at time t and a single team from
+    a cube (see `con_mod_cube`). Same as `con_mod_datset_1` but the lookback period is a view on
+    the (memory-mapped) cube and only the window of the team is copied.
+
+    Parameters:
+    -----------
+        values:     numpy array
+                    the cube with dimensions date x team x feature
+        axes:       dict
+                    the axis indexes of the cube
+        team:       str
+                    the team to construct the dataset for
+        features:   list
+                    optional, the features to use (defaults to all)
+        dropna:     boolean, default False
+                    whether to drop observations with missing data for any of the features (as
+                    `fooStrat.servicers.elim_na_features`), by default only observations without
+                    data for any feature of the cube are left out (as in `con_mod_datset_0`)
+        (see `con_mod_datset_1` for all other parameters)
+
+    Details:
+    --------
+        The categorical features are one-hot encoded with the categories of the entire cube (see
+        `cube_levels`), so that the columns are the same in every window.
+
+    Returns:
+    --------
+        X_train, X_test, y_train, id_test
+    """
+    per_ind_t = mod_window(per_ind=per_ind, t_pred=t_pred, per=per, pred_mode=pred_mode)
+    x, dates = cube_window(values, axes, t0=per_ind_t['date'].min(), t1=t_pred)
+    x = x[:, np.searchsorted(axes['team'], team)]
+
+    features = list(axes['feature'][1:]) if features is None else list(features)
+    fi = pd.Index(axes['feature']).get_indexer(features)
+    # observations in the lookback period with a result & data for any feature
+    obs = np.isin(dates, per_ind_t['date'].values.astype('datetime64[ns]')) & ~np.isnan(x[:, 0])
+    obs = obs & ~np.isnan(x[:, 1:]).all(axis=1)
+    if dropna is True:
+        obs = obs & ~np.isnan(x[:, fi]).any(axis=1)
+    x = x[obs]
+    dates = dates[obs]
+    X = x[:, fi]
+    # one-hot encoding
+    if categorical is not None:
+        cf = [features.index(i) for i in categorical]
+        oh = [(X[:, [j]] == cube_levels(values, axes, features[j])).astype('float32') for j in cf]
+        X = np.concatenate([np.delete(X, cf, axis=1)] + oh, axis=1)
+
+    # training & prediction data set
+    is_train = dates <= np.datetime64(t_fit, 'ns')
+    is_test = (dates > np.datetime64(t_fit, 'ns')) & (dates <= np.datetime64(t_pred, 'ns'))
+    X_train = X[is_train]
+    y_train = x[is_train, 0]
+    X_test = X[is_test]
+
+    # meta data with keys
+    meta_test = pd.DataFrame({'date': dates[is_test],
+                              'div': axes['div'][0],
+                              'season': axes['season'][np.searchsorted(axes['date'], dates[is_test])],
+                              'team': team,
+                              'result': x[is_test, 0]})
+
+    return X_train, X_test, y_train, meta_test
+
+
+
 def est_hist_proba(data,
                    est_dates,
                    start_date=None,
@@ -247,6 +405,12 @@ def est_proba_ensemble(data, per_ind, t_fit, t_pred, lookback, categorical, mode
                                                            per=lookback,
                                                            categorical=categorical,
                                                            pred_mode=pred_mode)
+    return est_proba_models(X_train, X_test, y_train, meta_test, models=models)
+
+
+
+def est_proba_models(X_train, X_test, y_train, meta_test, models):
+    """Estimate probabilities using the average of various models (see `est_proba_ensemble`)."""
     if len(X_train) < 1 or len(X_test) < 1:
         est_proba = pd.DataFrame()
     else:
@@ -275,6 +439,77 @@ def est_proba_ensemble(data, per_ind, t_fit, t_pred, lookback, categorical, mode
 
 
 
+def est_proba_cube(team, div, per_iter, per_ind, lookback, features, categorical, models, dropna=False,
+                   path=fp_data):
+    """Estimate historical probabilities of a team for all estimation periods from the memory-mapped
+    cube of a league (see `est_hist_proba_cube`)."""
+    values, axes = open_cube('cube/' + part_key(div), path=path)
+    res = []
+    for t in range(1, len(per_iter)):
+        X_train, X_test, y_train, meta_test = con_mod_datset_2(values=values,
+                                                               axes=axes,
+                                                               team=team,
+                                                               per_ind=per_ind,
+                                                               t_fit=per_iter[t - 1],
+                                                               t_pred=per_iter[t],
+                                                               per=lookback,
+                                                               features=features,
+                                                               categorical=categorical,
+                                                               dropna=dropna)
+        res.append(est_proba_models(X_train, X_test, y_train, meta_test, models=models))
+    return pd.concat(res, axis=0, sort=False) if len(res) > 0 else pd.DataFrame()
+
+
+
+def est_hist_proba_cube(div,
+                        est_dates,
+                        start_date=None,
+                        lookback='156W',
+                        features=None,
+                        categorical=None,
+                        models=['nb', 'knn', 'lg', 'dt'],
+                        dropna=False,
+                        n_jobs=1,
+                        path=fp_data):
+    """Estimate historical probability using an ensemble model for each team of a league. Same
+    as `est_hist_proba` but the modelling data is read from the memory-mapped cube of the league
+    (see `con_mod_cube`).
+
+    Parameters:
+    -----------
+        div:        str
+                    the league (eg. 'E0' or 'e0')
+        features:   list
+                    optional, the features to use (defaults to all)
+        dropna:     boolean, default False
+                    whether to leave out observations with missing data for any feature (see
+                    `con_mod_datset_2`)
+        n_jobs:     int, default 1
+                    the number of worker processes, teams are estimated in parallel and all workers
+                    share one copy of the cube in memory
+        (see `est_hist_proba` for all other parameters)
+
+    """
+    per_iter = mod_periods(est_dates=est_dates, start_date=start_date)
+    per_ind = est_dates[['div', 'season', 'date']]
+    axes = open_cube('cube/' + part_key(div), path=path)[1]
+    args = dict(div=div, per_iter=per_iter, per_ind=per_ind, lookback=lookback, features=features,
+                categorical=categorical, models=models, dropna=dropna, path=path)
+    if n_jobs == 1:
+        res = [est_proba_cube(k, **args) for k in axes['team']]
+    else:
+        # forked workers so that the estimation can be run from scripts
+        with ProcessPoolExecutor(max_workers=n_jobs, mp_context=get_context('fork')) as ex:
+            res = list(ex.map(partial(est_proba_cube, **args), axes['team']))
+    res = [i for i in res if len(i) > 0]
+    if len(res) == 0:
+        return pd.DataFrame()
+    res = pd.concat(res, axis=0, sort=False)
+    res = res.sort_values(['date', 'team']).reset_index(drop=True)
+    return res
+
+
+
 
 
 
@@ -1,12 +1,40 @@
 import pandas as pd
 import numpy as np
 import os
-import glob
-from fooStrat.helpers import anti_join
-from fooStrat.constants import fp_cloud, fp_cloud_source, fp_cloud_process
-
-
-def ret_xl_cols(file_names, id_col):
+import re
+import shutil
+import hashlib
+import xlrd
+import openpyxl
+from functools import partial
+from itertools import chain
+from fooStrat.helpers import anti_join, ver_type, map_jobs, imap_jobs, upsert
+from fooStrat.constants import fp_data, fp_data_source, fp_data_process
+from fooStrat.store import read_partitions, write_partitions, delete_partitions, part_key, \
+    write_segment, read_segments, compact_segments, replace_segments, delete_segments, lock_dataset, \
+    read_frame, write_frame, list_partitions, write_cube, open_cube, read_catalog, update_catalog, comp_catalog_stats
+from fooStrat.servicers import match_fields, con_odds_cube, con_standings_index, con_standings, comp_standings_asof, \
+    con_team_season
+from fooStrat.response import con_res_table
+from fooStrat.keys import update_keys, merge_key
+from fooStrat.mapping import field_groups, field_alias, match_cols, match_codes
+
+
+# format version of the parse cache, to be increased whenever the parsed data changes (see `xl_cache_dir`)
+xl_cache_version = 1
+# keys of the factor library (see `update_flib`)
+flib_keys = ['div', 'season', 'team', 'date', 'field']
+# data types of the source data (see `synchronise_data`)
+source_types = {'div': 'cat',
+                'date': 'date',
+                'home_team': 'cat',
+                'away_team': 'cat',
+                'field': 'cat',
+                'val': 'float32',
+                'code': 'cat'}
+
+
+def ret_xl_cols(file_names, id_col, n_jobs=1, path=fp_data):
     """Returns all available columns across all tabs and multiple excel files.
 
     Parameters:
@@ -14,30 +42,286 @@ def ret_xl_cols(file_names, id_col):
         file_names (list): a list with file names to examine (eg.
                            ['all-euro-data-2002-2003.xls', 'all-euro-data-2017-2018.xlsx'])
         id_col (string): the key column in each tab (eg. 'Div')
+        n_jobs (int): the number of worker processes, files are examined in parallel
+        path (string): the root path of the data (location of the schema cache)
 
     Returns:
     --------
     A list of all available columns.
 
+    Details:
+    --------
+    Only the header row and the first data row of each tab are read (see `con_xl_schema`).
+
+    """
+    res = con_xl_schema(file_names, id_col=id_col, n_jobs=n_jobs, path=path)
+    return res.rename(columns={'div': id_col})[['field', id_col, 'season']]
+
+
+def xl_season(file):
+    """The season in the name of an excel file (eg. 'all-euro-data-2017-2018.xlsx' -> '2017-2018'), None
+    if the name holds no season."""
+    x = re.search(r'(\d{4})-(\d{4})', os.path.basename(file))
+    return None if x is None else x.group(0)
+
+
+def read_xl_header(file):
+    """Reads the header row and the first data row of each tab of an excel file without parsing the other
+    rows (xlsx files are streamed with openpyxl, the tabs of xls files are loaded on demand with xlrd).
+
+    Returns:
+    --------
+        A dictionary with a dataframe (with at most one row) for each tab.
+
+    """
+    rows = {}
+    if file.rsplit('.', 1)[1] == 'xls':
+        wb = xlrd.open_workbook(file, on_demand=True)
+        try:
+            for k in wb.sheet_names():
+                sh = wb.sheet_by_name(k)
+                rows[k] = [sh.row_values(i) for i in range(min(sh.nrows, 2))]
+                wb.unload_sheet(k)
+        finally:
+            wb.release_resources()
+    else:
+        wb = openpyxl.load_workbook(file, read_only=True, data_only=True)
+        try:
+            for sh in wb.worksheets:
+                rows[sh.title] = [list(i) for i in sh.iter_rows(min_row=1, max_row=2, values_only=True)]
+        finally:
+            wb.close()
+
+    res = {}
+    for k, v in rows.items():
+        # columns without a name are dropped
+        ix = [] if len(v) == 0 else [j for j, c in enumerate(v[0]) if c is not None and c != '']
+        res[k] = pd.DataFrame([[r[j] for j in ix] for r in v[1:]], columns=[v[0][j] for j in ix])
+    return res
+
+
+def xl_schema(file, id_col, path=fp_data):
+    """The schema of an excel file: the fields of each tab with the division (as per the first data row)
+    and the season (as per the file name, see `xl_season`). The schema is kept in the parse cache keyed
+    by the content hash of the file (see `read_workbook`).
+
+    Parameters:
+    -----------
+        file (string):      the excel file
+        id_col (list):      the column(s) that identify the division (eg. 'Div' or ['Country', 'League'])
+        path (string):      the root path of the data
+
+    """
+    id_col = [id_col] if isinstance(id_col, str) else list(id_col)
+    nm = 'schema_' + hashlib.sha1(repr((os.path.basename(file), id_col)).encode()).hexdigest()[:16]
+    fn = xl_cache_dir(path=path) + nm + '_' + hash_file(file) + '.pkl'
+    if os.path.isfile(fn):
+        return pd.read_pickle(fn)
+
+    res = []
+    for k, i in read_xl_header(file).items():
+        div = np.nan
+        if i.shape[0] > 0 and all(c in i.columns for c in id_col) and i[id_col].iloc[0].notna().all():
+            # edit due to varying whitespace (see `process_data_minor`)..
+            div = re.sub(r'\s+', ' ', ' '.join(str(c) for c in i[id_col].iloc[0]).strip())
+        res.append(pd.DataFrame({'sheet': k, 'div': div, 'field': [str(c) for c in i.columns]},
+                                columns=['sheet', 'div', 'field']))
+    res = pd.concat(res, axis=0, ignore_index=True, sort=False) if len(res) > 0 else \
+        pd.DataFrame(columns=['sheet', 'div', 'field'])
+    res.insert(0, 'file', os.path.basename(file))
+    res['season'] = xl_season(file)
+    write_xl_cache(res, fn)
+    return res
+
+
+def con_xl_schema(file_names, id_col='Div', n_jobs=1, path=fp_data):
+    """Constructs the schema catalog of excel files, ie. which fields are available by division & season,
+    without parsing the data of the files (see `xl_schema`). Run it ahead of a restoration to check the
+    source files for schema drift (eg. new or renamed fields).
+
+    Parameters:
+    -----------
+        file_names (list):  the excel files to examine (eg. ['data/src_data/all-euro-data-2017-2018.xlsx'])
+        id_col (list):      the column(s) that identify the division (eg. 'Div' or ['Country', 'League'])
+        n_jobs (int):       the number of worker processes, files are examined in parallel
+        path (string):      the root path of the data (location of the schema cache)
+
+    Returns:
+    --------
+        A dataframe with columns file, sheet, div, season, field. The season is missing for files that
+        hold several seasons (eg. 'new_leagues_data.xlsx').
+
+    Example:
+    --------
+    schema = con_xl_schema(['data/src_data/all-euro-data-2017-2018.xlsx'])
+    comp_field_avail(schema)[['FTHG', 'PSCH']]
+
+    """
+    res = map_jobs(partial(xl_schema, id_col=id_col, path=path), file_names, n_jobs=n_jobs)
+    if len(res) == 0:
+        return pd.DataFrame(columns=['file', 'sheet', 'div', 'field', 'season'])
+    return pd.concat(res, axis=0, ignore_index=True, sort=False)
+
+
+def comp_field_avail(schema):
+    """The field availability by division & season (a row per div/season, a boolean column per field) of a
+    schema catalog (see `con_xl_schema`)."""
+    x = schema.dropna(subset=['div']).assign(avail=True)
+    res = x.pivot_table(index=['div', 'season'], columns='field', values='avail', aggfunc='any', fill_value=False)
+    res.columns.name = None
+    return res.astype(bool)
+
+
+def read_sheet_chunk(file, sheets):
+    """Reads some tabs of an excel file, the file is opened & loaded once for all of them."""
+    with pd.ExcelFile(file) as x:
+        return [x.parse(k) for k in sheets]
+
+
+def read_sheets(file, n_jobs=1):
+    """Reads all tabs of an excel file (as `pd.read_excel(file, sheet_name=None)`). With n_jobs > 1 the
+    tabs are parsed in parallel worker processes and returned in the order of the file."""
+    return dict(iter_sheets(file, n_jobs=n_jobs))
+
+
+def iter_sheets(file, n_jobs=1):
+    """Yields the tabs of an excel file one by one as (name, dataframe), so that a single tab is held in
+    memory at a time (see `read_sheets`). With n_jobs > 1 the tabs are split in n_jobs consecutive chunks
+    and each worker opens the file once to parse its chunk (see `read_sheet_chunk`)."""
+    with pd.ExcelFile(file) as x:
+        sh = x.sheet_names
+        if n_jobs == 1 or len(sh) <= 1:
+            for k in sh:
+                yield k, x.parse(k)
+            return
+    ch = [list(i) for i in np.array_split(np.array(sh, dtype=object), min(n_jobs, len(sh)))]
+    for k, res in zip(ch, imap_jobs(partial(read_sheet_chunk, file), ch, n_jobs=n_jobs)):
+        yield from zip(k, res)
+
+
+def hash_file(file):
+    """The content hash of a file (sha1)."""
+    h = hashlib.sha1()
+    with open(file, 'rb') as f:
+        for b in iter(lambda: f.read(1 << 20), b''):
+            h.update(b)
+    return h.hexdigest()
+
+
+def melt_sheet(data, key, key_cols_l, key_cols_map):
+    """Melts a tab of an excel file of major leagues into long format (see `process_data_major`), tabs
+    without data or key columns return None."""
+    extra_key_nm, si = key
+    data[extra_key_nm] = si
+    if data.shape[0] == 0:
+        return None
+    res = None
+    if sum(s in key_cols_l for s in data.columns) != len(key_cols_l):
+        data = data.rename(columns=key_cols_map)
+    else:
+        res = pd.melt(data,
+                      id_vars=key_cols_l,
+                      var_name='field',
+                      value_name='val').dropna()
+    print(si + ' league: ' + data['Div'][0])
+    return res
+
+
+def iter_workbook(file, key, key_cols_l, key_cols_map, n_jobs=1):
+    """Yields the tabs of an excel file of major leagues one by one in long format (see `melt_sheet`)."""
+    for k, i in iter_sheets(file, n_jobs=n_jobs):
+        x = melt_sheet(i, key=key, key_cols_l=key_cols_l, key_cols_map=key_cols_map)
+        if x is not None:
+            yield x
+
+
+def parse_workbook(file, key, key_cols_l, key_cols_map, n_jobs=1):
+    """Parses all tabs of an excel file of major leagues into a single long dataframe (see
+    `process_data_major`), with n_jobs > 1 the tabs are parsed in parallel."""
+    df = list(iter_workbook(file, key=key, key_cols_l=key_cols_l, key_cols_map=key_cols_map, n_jobs=n_jobs))
+    if len(df) == 0:
+        return pd.DataFrame()
+    return pd.concat(df, axis=0, ignore_index=True, sort=False)
+
+
+def read_workbook(file, key, key_cols_l, key_cols_map, path=fp_data, n_jobs=1):
+    """Parses an excel file of major leagues (see `parse_workbook`) through the parse cache. The parsed data is
+    kept in the parse cache (see `xl_cache_dir`) keyed by the file name, the parse parameters and the content
+    hash of the file, so only new or modified files go through the (slow) excel parser.
+
+    Parameters:
+    -----------
+        file (string):          the excel file
+        key (list):             the name & value of the file key (eg. ['season', '2017-2018'])
+        key_cols_l (list):      the key columns (see `process_data_major`)
+        key_cols_map (dict):    the key column mapping (see `process_data_major`)
+        path (string):          the root path of the data
+        n_jobs (int):           the number of worker processes to parse the tabs of the file
+
     """
-    df_cols = pd.DataFrame()
-    for f in file_names:
-        df0 = pd.read_excel(f, sheet_name=None)
-        for key, i in df0.items():
-            seas = f[23:32]
-            if (i.shape[0] == 0):
-                val = np.nan
-            else:
-                val = i.loc[1, id_col]
-            df_tmp = pd.DataFrame({"field": i.columns.values, id_col: val, "season": seas})
-            df_cols = df_cols.append(df_tmp, ignore_index=True, sort=False)
-    return df_cols
+    # the cache entry of a file is replaced whenever its content changes
+    nm = hashlib.sha1(repr((os.path.basename(file), list(key), key_cols_l,
+                            sorted(key_cols_map.items()))).encode()).hexdigest()[:16]
+    fn = xl_cache_dir(path=path) + nm + '_' + hash_file(file) + '.pkl'
+    if os.path.isfile(fn):
+        print(key[1] + ' is loaded from the parse cache: ' + os.path.basename(file))
+        return pd.read_pickle(fn)
+
+    res = parse_workbook(file, key=key, key_cols_l=key_cols_l, key_cols_map=key_cols_map, n_jobs=n_jobs)
+    write_xl_cache(res, fn)
+    return res
 
 
+def xl_cache_dir(path=fp_data):
+    """The directory of the parse cache (pro_data/xl_cache/<version>/). The version covers the format version
+    of the cache (`xl_cache_version`) and the versions of pandas & the excel parsers, so that parsed data is
+    never reused by a different parser."""
+    v = repr((xl_cache_version, pd.__version__, xlrd.__VERSION__, openpyxl.__version__))
+    return path + 'pro_data/xl_cache/' + hashlib.sha1(v.encode()).hexdigest()[:8] + '/'
 
 
+def prune_xl_cache(path=fp_data):
+    """Removes the entries of the parse cache of other versions (see `xl_cache_dir`) and of files whose
+    content no longer matches any file in src_data.
 
-def process_data_major(fi_nm, extra_key, key_cols, key_cols_map):
+    Returns:
+    --------
+        The number of entries removed.
+
+    """
+    root = path + 'pro_data/xl_cache/'
+    if not os.path.isdir(root):
+        return 0
+    fp = xl_cache_dir(path=path)
+    src = path + 'src_data/'
+    h = set() if not os.path.isdir(src) else {hash_file(src + i) for i in os.listdir(src) if os.path.isfile(src + i)}
+    n = 0
+    for i in os.listdir(root):
+        if root + i + '/' == fp:
+            continue
+        shutil.rmtree(root + i) if os.path.isdir(root + i) else os.remove(root + i)
+        n += 1
+    for i in os.listdir(fp) if os.path.isdir(fp) else []:
+        if i.endswith('.pkl') and i[:-4].rsplit('_', 1)[-1] not in h:
+            os.remove(fp + i)
+            n += 1
+    return n
+
+
+def write_xl_cache(data, fn):
+    """Stores an entry of the parse cache (named <file key>_<content hash>.pkl, see `read_workbook`) and
+    removes the outdated entries of the same file."""
+    fp, nm = os.path.split(fn)
+    fp = os.path.join(fp, '')
+    os.makedirs(fp, exist_ok=True)
+    for i in os.listdir(fp):
+        if i.startswith(nm.rsplit('_', 1)[0] + '_'):
+            os.remove(fp + i)
+    pd.to_pickle(data, fn + '.' + str(os.getpid()) + '.tmp')
+    os.replace(fn + '.' + str(os.getpid()) + '.tmp', fn)
+
+
+def process_data_major(fi_nm, extra_key, key_cols, key_cols_map, cache=True, n_jobs=1, path=fp_data):
     """Processes the structured data that is stored in tabs in multiple excel files and puts them together tidied up.
     The excel files need not to have the same fields/columns but they do need to have the key columns present. Key
     columns are: Div | Date | HomeTeam | AwayTeam
@@ -50,6 +334,10 @@ def process_data_major(fi_nm, extra_key, key_cols, key_cols_map):
         key_cols (dict): a dictionary specifying the key columns and the output names of these keys
         key_cols_map (dict): in case that key columns can have 2 different names for a single key column across
         multiple files, specify the key column mapping here (see Details for more)
+        cache (boolean): whether to read the files through the parse cache (see `read_workbook`)
+        n_jobs (int): the number of worker processes, files (or the tabs of a single file) are parsed in
+        parallel and put together in the order of `fi_nm`
+        path (string): the root path of the data (location of the parse cache)
 
     Returns:
     --------
@@ -59,7 +347,7 @@ def process_data_major(fi_nm, extra_key, key_cols, key_cols_map):
     Example:
     --------
     fi_nm = ['data/src_data/all-euro-data-2017-2018.xlsx', 'data/src_data/all-euro-data-1999-2000.xls']
-    extra_key = pd.DataFrame({'fi_nm':fi_nm, 'season':[i[23:32] for i in fi_nm]})
+    extra_key = pd.DataFrame({'fi_nm':fi_nm, 'season':[xl_season(i) for i in fi_nm]})
     print(extra_key)
                                        fi_nm        season
     0  data/src_data/all-euro-data-2017-2018.xlsx  2017-2018
@@ -89,6 +377,17 @@ def process_data_major(fi_nm, extra_key, key_cols, key_cols_map):
         AT and AwayTeam
 
     """
+    df = list(iter_data_major(fi_nm, extra_key=extra_key, key_cols=key_cols, key_cols_map=key_cols_map,
+                              cache=cache, n_jobs=n_jobs, path=path))
+    if len(df) == 0:
+        return pd.DataFrame()
+    return pd.concat(df, axis=0, ignore_index=True, sort=False)
+
+
+def iter_data_major(fi_nm, extra_key, key_cols, key_cols_map, cache=True, n_jobs=1, path=fp_data):
+    """Yields the processed data of the excel files of major leagues chunk by chunk (see `process_data_major`
+    for the parameters), so that the files can be written to the store without putting them together first.
+    A chunk is a tab of a file or a whole file if the file is read through the parse cache or in parallel."""
     # add season as additional key variable..
     key_cols_l = list(key_cols.keys())
     extra_key_nm = extra_key.columns[1]
@@ -97,28 +396,23 @@ def process_data_major(fi_nm, extra_key, key_cols, key_cols_map):
     # key_cols = ['season', 'Div', 'Date', 'HomeTeam', 'AwayTeam']
     # the key columns can have 2 different symbologies..
     # key_cols_map = {'HT': 'HomeTeam', 'AT': 'AwayTeam'}
-    df = pd.DataFrame()
-    for f in fi_nm:
-        df0 = pd.read_excel(f, sheet_name=None)
-        for key, i in df0.items():
-            si = extra_key[extra_key['fi_nm'] == f].iloc[0, 1]
-            i[extra_key_nm] = si
-            if i.shape[0] == 0:
-                continue
-            else:
-                if sum(s in key_cols_l for s in i.columns) != len(key_cols_l):
-                    i = i.rename(columns=key_cols_map)
-                else:
-                    df_lf = pd.melt(i,
-                                    id_vars=key_cols_l,
-                                    var_name='field',
-                                    value_name='val').dropna()
-                    df = df.append(df_lf, ignore_index=True, sort=False)
-            print(si + ' league: ' + i['Div'][0])
-
-    # rename columns to lower case..
-    df = df.rename(columns=key_cols)
-    return df
+    keys = [[extra_key_nm, extra_key[extra_key['fi_nm'] == f].iloc[0, 1]] for f in fi_nm]
+    # files are parsed in parallel, a single file is parsed in parallel by tabs
+    nj = [n_jobs, 1] if len(fi_nm) > 1 else [1, n_jobs]
+    if cache is True:
+        fun = partial(read_workbook, key_cols_l=key_cols_l, key_cols_map=key_cols_map, path=path, n_jobs=nj[1])
+        chunks = imap_jobs(fun, fi_nm, keys, n_jobs=nj[0])
+    elif nj[0] == 1:
+        chunks = (x for f, k in zip(fi_nm, keys)
+                  for x in iter_workbook(f, key=k, key_cols_l=key_cols_l, key_cols_map=key_cols_map, n_jobs=nj[1]))
+    else:
+        fun = partial(parse_workbook, key_cols_l=key_cols_l, key_cols_map=key_cols_map)
+        chunks = imap_jobs(fun, fi_nm, keys, n_jobs=nj[0])
+
+    for df_lf in chunks:
+        if df_lf.shape[0] > 0:
+            # rename columns to lower case..
+            yield df_lf.rename(columns=key_cols)
 
 
 def process_data_minor(data, key_cols):
@@ -156,17 +450,12 @@ def process_data_minor(data, key_cols):
                      var_name='field',
                      value_name='val').dropna()
     else:
-        df = pd.DataFrame()
-        for key, i in data.items():
-            if i.shape[0] == 0:
-                # in case of no data skip to next..
-                continue
-            else:
-                df_lf = pd.melt(i,
+        # tabs without data are skipped..
+        df = pd.concat([pd.melt(i,
                                 id_vars=key_cols_l,
                                 var_name='field',
-                                value_name='val').dropna()
-                df = df.append(df_lf, ignore_index=True, sort=False)
+                                value_name='val').dropna() for key, i in data.items() if i.shape[0] > 0],
+                       axis=0, ignore_index=True, sort=False)
 
     # transform to appropriate shape..
     df['div'] = df['Country'] + ' ' + df['League']
@@ -182,6 +471,13 @@ def process_data_minor(data, key_cols):
     return df
 
 
+def iter_data_minor(file, key_cols, n_jobs=1):
+    """Yields the processed data of the excel file of minor leagues tab by tab (see `process_data_minor`)."""
+    for key, i in iter_sheets(file, n_jobs=n_jobs):
+        if i.shape[0] > 0:
+            yield process_data_minor(i, key_cols=key_cols)
+
+
 
 def synchronise_data(data):
     """Synchronises the data so that all relevant fields have the same definition and
@@ -196,7 +492,7 @@ def synchronise_data(data):
     Returns:
     --------
         A dataframe with synchonised data is returned with the following columns:
-        season | div | date | home_team | away_team | field | val
+        season | div | date | home_team | away_team | field | val | code
 
     Details:
     --------
@@ -219,15 +515,14 @@ def synchronise_data(data):
         This adjusts the data for unique issues:
                 1. there're some leagues where the 4-digit season description is
                    forward-looking (Ireland Premier Division)
+        - Data Types
+        The mixed-type `val` column is split in a numeric float32 `val` column (eg. goals, odds) and a
+        categorical `code` column for all other values (eg. 'H', 'D', 'A' for FTR or kick-off times). The
+        division, team and field columns are categorical (see `source_types`).
 
     """
     # fields ---------------------
-    data['field'] = data['field'].replace({'FTR': 'FTR',
-                                            'Res': 'FTR',
-                                            'FTHG': 'FTHG',
-                                            'HG': 'FTHG',
-                                            'FTAG': 'FTAG',
-                                            'AG': 'FTAG'})
+    data['field'] = data['field'].replace(field_alias)
 
     # teams ----------------------
     data['home_team'] = data.loc[:, 'home_team'].str.replace(' ', '_').str.lower()
@@ -257,27 +552,303 @@ def synchronise_data(data):
     # exception alterations: there're some leagues where the 4-digit season description is forward-looking
     div_season_spec = 'Ireland Premier Division'
     res.loc[(res['div'] == div_season_spec), 'season'] = res.loc[(res['div'] == div_season_spec), 'season'].values - 1
+
+    # data types -----------------
+    res = split_val(data=res)
+    res = ver_type(data=res, field=source_types)
     res = res.sort_values(['date', 'div', 'season']).reset_index(level=0, drop=True)
 
     return res
 
 
+def con_match_table(data):
+    """Constructs the match table from the source data. The match table has one row per game
+    with key columns div, season, date, home_team, away_team and a column for each field of
+    the field mapping (eg. FTR, FTHG, FTAG, HS, B365H, see `fooStrat.mapping.match_cols`), so
+    that all partitions have the same columns. Numeric fields are float32, the results (eg.
+    FTR) are categorical. Fields that are not in the mapping are not part of the match table.
+
+    Parameters:
+    -----------
+        data:   pandas dataframe
+                a dataframe with columns div, season, date, home_team, away_team, field, val, code
+
+    Example:
+    --------
+                div  season       date home_team    away_team  FTHG  FTAG FTR ...
+        0        E0    2020 2020-09-12    fulham      arsenal   0.0   3.0   A ...
+        1        E0    2020 2020-09-12  c_palace  southampton   1.0   0.0   H ...
+
+    """
+    nf = [i for i in match_cols if i not in match_codes]
+    res = match_fields(data, field=nf, code=match_codes, dropna=False)
+    res.columns.name = None
+    res = res.reindex(columns=['div', 'season', 'date', 'home_team', 'away_team'] + match_cols)
+    res[nf] = res[nf].astype('float32')
+    for k in match_codes:
+        res[k] = res[k].astype('str').astype('category')
+    return res
+
+
+def write_source(data, path=fp_data, overwrite=False):
+    """Stores the source data, the match table, the results table (see `fooStrat.response.con_res_table`),
+    the team-season summary (see `fooStrat.servicers.con_team_season`), the odds cube and the standings
+    index for all div/season partitions in `data`.
+
+    Parameters:
+    -----------
+        data:       pandas dataframe
+                    source data with columns div, season, date, home_team, away_team, field, val, code
+                    (all data of the partitions to write)
+        path:       str
+                    the root path of the data
+        overwrite:  boolean, default False
+                    whether to delete all stored data before writing
+
+    """
+    update_keys(data[['div', 'home_team', 'away_team', 'field']].drop_duplicates(), path=path)
+    match_table = con_match_table(data)
+    # source data & match table are locked together, so readers never see derived data out of sync
+    with lock_dataset('source_core', shared=False, path=path), \
+            lock_dataset('match_table', shared=False, path=path):
+        write_partitions(data, 'source_core', path=path, overwrite=overwrite, group=source_group(data['field']))
+        write_partitions(match_table, 'match_table', path=path, overwrite=overwrite)
+        write_partitions(con_res_table(match_table), 'results', path=path, overwrite=overwrite)
+        write_partitions(con_team_season(match_table), 'team_season', path=path, overwrite=overwrite)
+        write_odds_cube(match_table, path=path, overwrite=overwrite)
+        write_standings(match_table, path=path, overwrite=overwrite)
+
+
+def write_stream(chunks, path=fp_data, overwrite=False):
+    """Stores source data that arrives in chunks (eg. the tabs of the excel files, see `iter_data_major`),
+    so that a single chunk is held in memory at a time rather than the whole history.
+
+    Parameters:
+    -----------
+        chunks:     iterable
+                    the chunks of unsynchronised source data with columns season, div, date, home_team,
+                    away_team, field, val (see `process_data_major`)
+        path:       str
+                    the root path of the data
+        overwrite:  boolean, default False
+                    whether to delete all stored data before writing the first chunk
+
+    Details:
+    --------
+        Each chunk is synchronised (see `synchronise_data`) and stored with `write_source`. A partition
+        that was written by an earlier chunk (eg. a league that was renamed across tabs) is read back
+        and written along with the chunk, so that no data of the stream is lost.
+
+    """
+    done = set()
+    for x in chunks:
+        # the columns in the order of the synchronised major leagues
+        x = synchronise_data(data=x)[['div', 'date', 'home_team', 'away_team', 'field', 'val', 'season', 'code']]
+        prt = x[['div', 'season']].drop_duplicates()
+        ov = [[d, s] for d, s in zip(prt['div'], prt['season']) if (part_key(d), part_key(s)) in done]
+        if len(ov) > 0:
+            x = pd.concat([read_partitions('source_core', div=[d], season=[s], path=path) for d, s in ov] + [x],
+                          axis=0, ignore_index=True, sort=False)
+            x = ver_type(data=x, field=source_types)
+        write_source(x, path=path, overwrite=overwrite and len(done) == 0)
+        done.update((part_key(d), part_key(s)) for d, s in zip(prt['div'], prt['season']))
+
+
+def source_group(field):
+    """The field groups of source fields (see `fooStrat.mapping.field_groups`), fields that are not
+    mapped are in group 'other'."""
+    x = pd.Categorical(field)
+    grp = np.array([field_groups.get(i, 'other') for i in x.categories] + ['other'], dtype=object)
+    return grp[x.codes]
+
+
+def read_source(div=None, season=None, group=None, field=None, n_season=None, wide=False, path=fp_data):
+    """Reads the source data of some field groups only. The source data is stored in a file per field
+    group (results, half_time, statistics, odds, closing_odds, liquidity & other as per the class in
+    data/mapping/fields.csv), so that stages that only need results do not read any odds.
+
+    Parameters:
+    -----------
+        div:        list
+                    optional, the divisions to retrieve (eg. ['E0'])
+        season:     list
+                    optional, the seasons to retrieve (eg. [2019, 2020])
+        group:      list
+                    optional, the field groups to retrieve (eg. ['results', 'statistics']), defaults to the
+                    groups of `field` or all groups
+        field:      list
+                    optional, the fields to retrieve (eg. ['FTR', 'FTHG', 'FTAG'])
+        n_season:   int
+                    optional, only the latest n seasons of each division
+        wide:       boolean, default False
+                    whether to retrieve the match table (one row per game) rather than the source data
+        path:       str
+                    the root path of the data
+
+    Example:
+    --------
+    x = read_source(div=['E0'], group=['results'])
+
+    """
+    if group is None and field is not None:
+        group = list(pd.unique(source_group(field)))
+    if wide is False:
+        return read_partitions('source_core', div=div, season=season, field=field, n_season=n_season,
+                               group=group, path=path)
+
+    # the match table holds a column per field, so only the columns of the groups are read
+    if field is None and group is not None and 'other' not in group:
+        field = [k for k, v in field_groups.items() if v in group]
+    return read_partitions('match_table', div=div, season=season, n_season=n_season,
+                           columns=None if field is None else
+                           ['div', 'season', 'date', 'home_team', 'away_team'] + list(field), path=path)
+
+
+def write_odds_cube(data, path=fp_data, overwrite=False):
+    """Stores the odds cube (see `fooStrat.servicers.con_odds_cube`) for all div/season partitions of
+    the match table in `data` (in pro_data/odds_cube/<div>/<season>)."""
+    with lock_dataset('odds_cube', shared=False, path=path):
+        if overwrite is True:
+            delete_partitions(None, 'odds_cube', path=path, file='values.npy')
+        for (d, k), x in data.groupby(['div', 'season'], sort=False, observed=True):
+            values, axes = con_odds_cube(x)
+            write_cube(values, axes, 'odds_cube/' + part_key(d) + '/' + part_key(k), path=path)
+
+
+def write_standings(data, path=fp_data, overwrite=False):
+    """Stores the standings index (see `fooStrat.servicers.con_standings_index`) for all div/season
+    partitions of the match table in `data` (in pro_data/standings/<div>/<season>)."""
+    with lock_dataset('standings', shared=False, path=path):
+        if overwrite is True:
+            delete_partitions(None, 'standings', path=path, file='values.npy')
+        for (d, k), x in data.groupby(['div', 'season'], sort=False, observed=True):
+            values, axes = con_standings_index(x)
+            write_cube(values, axes, 'standings/' + part_key(d) + '/' + part_key(k), path=path)
+
+
+def read_team_season(div=None, season=None, n_season=None, path=fp_data):
+    """Reads the team-season summary (see `fooStrat.servicers.con_team_season`), eg. to retrieve the teams
+    of each season or the final standings without reading the history of games.
+
+    Parameters:
+    -----------
+        div:        list
+                    optional, the divisions to retrieve (eg. ['E0'])
+        season:     list
+                    optional, the seasons to retrieve (eg. [2019, 2020])
+        n_season:   int
+                    optional, only the latest n seasons of each division
+        path:       str
+                    the root path of the data
+
+    Example:
+    --------
+    read_team_season(div=['E0'], season=[2020])
+
+    """
+    return read_partitions('team_season', div=div, season=season, n_season=n_season, path=path)
+
+
+def read_standings(div, season, date=None, path=fp_data):
+    """Reads the standings of a division & season from the standings index.
+
+    Parameters:
+    -----------
+        div:        str
+                    the division (eg. 'E0')
+        season:     int
+                    the season (eg. 2020)
+        date:       str
+                    optional, the date of the standings table (eg. '2020-12-31'), which is looked up
+                    with a binary search over the matchdays (see `fooStrat.servicers.comp_standings_asof`)
+        path:       str
+                    the root path of the data
+
+    Returns:
+    --------
+        The standings table as of `date` or, if no date is given, the standings after each matchday
+        (as `fooStrat.servicers.comp_league_standing`).
+
+    Example:
+    --------
+    read_standings('E0', 2020, date='2020-12-31')
+
+    """
+    with lock_dataset('standings', path=path):
+        values, axes = open_cube('standings/' + part_key(div) + '/' + part_key(season), path=path)
+    if date is None:
+        return con_standings(values, axes)
+    return comp_standings_asof(values, axes, date=date)
+
+
+def read_odds_cube(div=None, season=None, n_season=None, path=fp_data):
+    """Reads the odds cube (game x bookmaker x outcome) of the given divisions & seasons.
+
+    Parameters:
+    -----------
+        div:        list
+                    optional, the divisions to retrieve (eg. ['E0', 'Brazil Serie A'])
+        season:     list
+                    optional, the seasons to retrieve (eg. [2019, 2020])
+        n_season:   int
+                    optional, only the latest n seasons of each division
+        path:       str
+                    the root path of the data
+
+    Returns:
+    --------
+        The odds and a dict with the axes as in `fooStrat.servicers.con_odds_cube`.
+
+    Example:
+    --------
+    values, axes = read_odds_cube(div=['E0'])
+    best_odds = comp_odds_max(values)
+
+    """
+    with lock_dataset('odds_cube', path=path):
+        prt = list_partitions('odds_cube', div=div, season=season, n_season=n_season, path=path, file='values.npy')
+        l = [open_cube('odds_cube/' + d + '/' + k, path=path) for d, k in zip(prt['div'], prt['season'])]
+    if len(l) == 0:
+        return con_odds_cube(pd.DataFrame(columns=['div', 'season', 'date', 'home_team', 'away_team']))
+    values = np.concatenate([i[0] for i in l], axis=0)
+    axes = {k: l[0][1][k] if k in ['bookmaker', 'outcome'] else np.concatenate([i[1][k] for i in l])
+            for k in l[0][1]}
+    return values, axes
+
+
+def split_val(data):
+    """Splits the mixed-type `val` column into a numeric `val` column and a `code` column that
+    holds the non-numeric values (eg. FTR 'H', 'D', 'A')."""
+    num = pd.to_numeric(data['val'], errors='coerce')
+    code = data['val'].where(num.isna() & data['val'].notna())
+    data['code'] = code.where(code.isna(), code.astype(str))
+    data['val'] = num
+    return data
 
-def update_data_latest(ex, new_1, new_2, season, path=fp_cloud):
+
+
+def update_data_latest(new_1, new_2, season, n_jobs=1, path=fp_data):
     """Updates the data with latest games. Only latest season results are updated and history is
     not changed from previous seasons.
 
     Parameters:
     -----------
-        ex (dataframe): existing data
         new_1 (string): new latest data major leagues name
         new_2 (string): new latest data minor leagues name
         season (string): latest season for which the data is being updated (eg. '2019-2020')
+        n_jobs (int): the number of worker processes to parse the tabs of the excel files
         path (string): path to the data
 
     Returns:
     --------
-        A message that the data has been updated. The respective data file is 'source_core.pkl'.
+        A message that the data has been updated. The respective dataset is 'source_core'.
+
+    Details:
+    --------
+        Only the current season of each division is updated (the latest season in the new data), so only
+        these div/season partitions of 'source_core' are read and rewritten. The new data is upserted on
+        div, season, date, home_team, away_team & field: new values replace existing values (eg. corrected
+        results) and games that are not in the new data are kept.
 
     """
 
@@ -291,13 +862,15 @@ def update_data_latest(ex, new_1, new_2, season, path=fp_cloud):
                                                 'HomeTeam': 'home_team',
                                                 'AwayTeam': 'away_team'},
                                       key_cols_map={'HT': 'HomeTeam',
-                                                    'AT': 'AwayTeam'})
+                                                    'AT': 'AwayTeam'},
+                                      n_jobs=n_jobs,
+                                      path=path)
     # data synchronisation: renaming fields so that they have the same names to make it easier
     # to process the data later in a concise way..
     major_latest = synchronise_data(data=major_latest)
 
     # minor leagues recent data
-    minor_latest = pd.read_excel(path + 'src_data/' + new_2, sheet_name=None)
+    minor_latest = read_sheets(path + 'src_data/' + new_2, n_jobs=n_jobs)
     minor_latest = process_data_minor(minor_latest,
                                       key_cols={'Country': 'country',
                                                 'League': 'league',
@@ -307,16 +880,19 @@ def update_data_latest(ex, new_1, new_2, season, path=fp_cloud):
                                                 'Away': 'away_team'})
     minor_latest = synchronise_data(data=minor_latest)
 
-    # add major
-    data = pd.merge(ex, major_latest,
-                    on=['div', 'season', 'date', 'home_team', 'away_team', 'field', 'val'],
-                    how='outer')
-    # add minor
-    data = pd.merge(data, minor_latest,
-                    on=['div', 'season', 'date', 'home_team', 'away_team', 'field', 'val'],
-                    how='outer')
-    # store
-    data.to_pickle(path + 'pro_data/source_core.pkl')
+    # only the current season of each division is updated
+    new = pd.concat([major_latest, minor_latest], axis=0, ignore_index=True, sort=False)
+    new = new[new['season'] == new.groupby('div')['season'].transform('max')]
+    # existing data of affected partitions only
+    prt = new[['div', 'season']].drop_duplicates()
+    # the source data is locked from reading to writing, so concurrent updates are not lost
+    with lock_dataset('source_core', shared=False, path=path):
+        ex = read_partitions('source_core', parts=prt, path=path)
+        # new values replace existing values of the same game & field
+        data = upsert(ex, new, on=['div', 'season', 'date', 'home_team', 'away_team', 'field'])
+        # store
+        data = ver_type(data=data, field=source_types)
+        write_source(data, path=path)
     print("Source Data has been updated.")
 
 
@@ -325,8 +901,8 @@ def update_data_source(file_desc,
                        file_key_name,
                        file_desc_2,
                        file_key_name_2,
-                       path=fp_cloud,
-                       file_name='source_core'):
+                       n_jobs=1,
+                       path=fp_data):
     """Updates historical data across major and minor leagues.
 
     Parameters:
@@ -339,9 +915,15 @@ def update_data_source(file_desc,
                               but where all data is stored in a single file (eg. 'new_leagues_data.xlsx')
         file_key_name_2 (string): a column in the file that describes the same key that is used in file_key_name to
                                   be able to merge the different data sources by this key (eg. 'Season')
+        n_jobs (int): the number of worker processes, the excel files are parsed in parallel
         path (string): source path to all the underlying data within the project (eg. where
                        'all-euro-data-2004-2005.xls' is located)
-        file_name (string):  the name of the output file (default source_core)
+
+    Details:
+    --------
+        The source data ('source_core') and the match table ('match_table') are stored partitioned
+        by div and season (see `fooStrat.store.read_partitions`). The excel files are written tab by
+        tab (see `write_stream`), so that the whole history is never held in memory at once.
 
     """
     # MAJOR LEAGUES ------
@@ -352,37 +934,37 @@ def update_data_source(file_desc,
     # iterate through source folder and determine which files should be loaded
     fi_nm = [path_ed + f for f in os.listdir(src_dat_path) if f[:len(file_desc)] == file_desc]
     # map file key
-    season_extr = [i[-13:-4] if i.rsplit('.', 1)[1] == 'xls' else (i[-14:-5]) for i in fi_nm]
+    season_extr = [xl_season(i) for i in fi_nm]
     extra_key = pd.DataFrame({'fi_nm': fi_nm,
                               file_key_name: season_extr})
 
-    # process data
-    major = process_data_major(fi_nm=fi_nm,
-                               extra_key=extra_key,
-                               key_cols={'Div': 'div',
-                                         'Date': 'date',
-                                         'HomeTeam': 'home_team',
-                                         'AwayTeam': 'away_team'},
-                               key_cols_map={'HT': 'HomeTeam',
-                                             'AT': 'AwayTeam'})
+    # process data: the files are streamed into the store tab by tab
+    major = iter_data_major(fi_nm=fi_nm,
+                            extra_key=extra_key,
+                            key_cols={'Div': 'div',
+                                      'Date': 'date',
+                                      'HomeTeam': 'home_team',
+                                      'AwayTeam': 'away_team'},
+                            key_cols_map={'HT': 'HomeTeam',
+                                          'AT': 'AwayTeam'},
+                            n_jobs=n_jobs,
+                            path=path)
 
     # MINOR LEAGUES ------
-    minor = pd.read_excel(path_ed + file_desc_2, sheet_name=None)
-    # process data..
-    minor = process_data_minor(minor,
-                               key_cols={'Country': 'country',
-                                         'League': 'league',
-                                         'Date': 'date',
-                                         file_key_name_2: file_key_name,
-                                         'Home': 'home_team',
-                                         'Away': 'away_team'})
+    minor = iter_data_minor(path_ed + file_desc_2,
+                            key_cols={'Country': 'country',
+                                      'League': 'league',
+                                      'Date': 'date',
+                                      file_key_name_2: file_key_name,
+                                      'Home': 'home_team',
+                                      'Away': 'away_team'},
+                            n_jobs=n_jobs)
 
     # MERGE -------
-    data_prc = pd.concat([major, minor], axis=0, sort=False)
     # data synchronisation: renaming fields so that they have the same names to make it easier
     # to process the data later in a concise way..
-    data_prc = synchronise_data(data=data_prc)
-    data_prc.to_pickle(path + 'pro_data/' + file_name + '.pkl')
+    write_stream(chain(major, minor), path=path, overwrite=True)
+    prune_xl_cache(path=path)
     print("Source Data History has been updated.")
 
 
@@ -390,7 +972,7 @@ def update_data_source(file_desc,
 def dummy_data_upcoming(data, fields, glue=True):
     """Constructs dummy data for key fields so that the dataset has full representation."""
     vars = ['div', 'season', 'date', 'home_team', 'away_team']
-    df = data.groupby(vars).apply(lambda x: pd.Series(np.nan, index=['val'])).reset_index()
+    df = data[vars].drop_duplicates().assign(val=np.nan, code=np.nan)
     dfr = pd.DataFrame()
     for i in range(len(fields)):
         dfr = pd.concat([dfr, df.assign(field=fields[i])], axis=0, sort=False)
@@ -398,12 +980,14 @@ def dummy_data_upcoming(data, fields, glue=True):
     if glue is True:
         dfr = pd.concat([data, dfr], axis=0, sort=False)
 
+    dfr = ver_type(data=dfr, field=source_types)
     return dfr
 
 
 
-def update_upcoming_games(file_desc, file_desc_2, season, path=fp_cloud):
-    """Updates upcoming games that is used for signal generation."""
+def update_upcoming_games(file_desc, file_desc_2, season, n_jobs=1, path=fp_data):
+    """Updates upcoming games that is used for signal generation (with n_jobs worker processes to parse
+    the excel files)."""
 
     # MAJOR LEAGUES ------
     src_dat_path = os.path.join(os.getcwd(), path + 'src_data/', '')
@@ -417,7 +1001,9 @@ def update_upcoming_games(file_desc, file_desc_2, season, path=fp_cloud):
                                          'HomeTeam': 'home_team',
                                          'AwayTeam': 'away_team'},
                                key_cols_map={'HT': 'HomeTeam',
-                                             'AT': 'AwayTeam'})
+                                             'AT': 'AwayTeam'},
+                               n_jobs=n_jobs,
+                               path=path)
 
     # MINOR LEAGUES ------
     file_key_name_2 = 'Season'
@@ -436,37 +1022,54 @@ def update_upcoming_games(file_desc, file_desc_2, season, path=fp_cloud):
     data_prc = synchronise_data(data=data_prc)
     # add fields required for data analysis: FTR, FTHG, FTAG
     data_prc = dummy_data_upcoming(data=data_prc, fields=['FTR', 'FTHG', 'FTAG'], glue=True)
-    data_prc.to_pickle(path + 'pro_data/' + 'upcoming_games' + '.pkl')
+    write_frame(data_prc, 'upcoming_games', path=path)
     print("Upcoming game data has been updated.")
 
 
 
 
 
-def add_upcoming_games(date_tp1='2050-01-01', path=fp_cloud):
+def add_upcoming_games(date_tp1='2050-01-01', path=fp_data):
     """Add upcoming games to the source data.
 
     Details:    - upcoming games are overwritten in source data (no duplicates)
+                - only partitions with previous or new upcoming games are rewritten
     """
     # source upcoming games
-    upcoming = pd.read_pickle(path + 'pro_data/upcoming_games.pkl')
-    # delete existing prediction set if available in core data
-    source = pd.read_pickle(path + 'pro_data/source_core.pkl')
-    sc_ed = source[source['date'] != date_tp1]
+    upcoming = read_frame('upcoming_games', path=path)
     # modify date (so that all games to be predicted
     # are easily identified later on)
     upcoming['date'] = np.datetime64(date_tp1)
-    sc_ed = pd.concat([sc_ed, upcoming],
-                      axis=0,
-                      sort=True)
-    sc_ed.reset_index(drop=True, inplace=True)
-    sc_ed.to_pickle(path + 'pro_data/source_core.pkl')
+    with lock_dataset('source_core', shared=False, path=path):
+        # partitions with an existing prediction set & partitions of the new prediction set
+        prt = read_partitions('source_core',
+                              columns=['div', 'season'],
+                              filters=[('date', '=', pd.Timestamp(date_tp1))],
+                              path=path)
+        prt = pd.concat([prt, upcoming[['div', 'season']]], axis=0, sort=False).drop_duplicates()
+        source = read_partitions('source_core', parts=prt, path=path)
+        # delete existing prediction set if available in core data
+        sc_ed = source[source['date'] != date_tp1]
+        sc_ed = pd.concat([sc_ed, upcoming],
+                          axis=0,
+                          sort=True)
+        sc_ed.reset_index(drop=True, inplace=True)
+        sc_ed = ver_type(data=sc_ed, field=source_types)
+        # partitions that only held the previous prediction set
+        prt_del = anti_join(prt, sc_ed[['div', 'season']].drop_duplicates(), on=['div', 'season'])
+        delete_partitions(prt_del, 'source_core', path=path)
+        delete_partitions(prt_del, 'match_table', path=path)
+        delete_partitions(prt_del, 'results', path=path)
+        delete_partitions(prt_del, 'team_season', path=path)
+        delete_partitions(prt_del, 'odds_cube', path=path, file='values.npy')
+        delete_partitions(prt_del, 'standings', path=path, file='values.npy')
+        write_source(sc_ed, path=path)
     print("Source Data has been updated with upcoming games.")
 
 
 
 
-def update_flib(data, dir=fp_cloud, update=True, recreate_feature=False):
+def update_flib(data, dir=fp_data, update=True, recreate_feature=False):
     """Builds or updates the factor library. If some data is already present in
     source data, then it's overwritten by the new data.
 
@@ -483,96 +1086,202 @@ def update_flib(data, dir=fp_cloud, update=True, recreate_feature=False):
 
     Details:
     --------
-    Note that when update is True, it's assumed that there is a factor library
-    present by league.
+    The factor library of each league stores every feature separately as immutable append
+    segments (see `fooStrat.store.write_segment`), so adding, replacing or deleting a feature
+    only touches the data of that feature. An update appends the new data as a segment, so
+    its cost depends on the new data only. Observations that are already present are
+    overwritten by newer segments when the library is read (newest-wins on div, season,
+    team, date, field). Segments are merged by `compact_flib`. The catalog is updated from the
+    new data as well (see `comp_flib_stats`).
 
     """
-    dir_ed = dir + 'pro_data/'
     # consolidate list of df's in a single dataframe
     data_ed = pd.concat(data, axis=0, sort=False, ignore_index=True)
+    update_keys(data_ed[['div', 'team', 'field']].drop_duplicates(), path=dir)
     # i = 'F1'
     for i in data_ed.loc[:, 'div'].unique():
 
         data_new = data_ed.query("div==@i")
-        ik = i.lower().replace(" ", "_").replace("-", "_")
-
-        if update is False:
-            data_new.to_pickle(dir_ed + 'flib_' + ik + '.pkl')
-        else:
-            data_ex = pd.read_pickle(dir_ed + 'flib_' + ik + '.pkl')
-
-            if recreate_feature is True:
-
-                feat_tc = data_new['field'].unique()
-                data_ex_stay = data_ex.query("field not in @feat_tc")
-                res = pd.concat([data_ex_stay, data_new], axis=0, sort=True, ignore_index=True)
-
-            else:
-                # find what is new
-                # 1st identify mutual observations
-                data_mut = pd.merge(data_new.loc[:, ['div', 'season', 'team', 'date', 'field']],
-                                    data_ex.loc[:, ['div', 'season', 'team', 'date', 'field']],
-                                    on=['div', 'season', 'team', 'date', 'field'],
-                                    how="inner")
-                # remove already existing from source
-                data_res = anti_join(x=data_ex,
-                                     y=data_mut,
-                                     on=['div', 'season', 'team', 'date', 'field'])
-                # add new data
-                res = pd.concat([data_res, data_new], axis=0, sort=False, ignore_index=True)
-
-            res = res.sort_values(['div', 'season', 'date', 'field'])
-            res = res.reset_index(drop=True)
-            res.to_pickle(dir_ed + 'flib_' + ik + '.pkl')
+        # all features of a league are updated under one lock
+        with lock_dataset(flib_name(i), shared=False, path=dir):
+            # record the features in the catalog: an update adds the counts of its net new observations,
+            # a new library or recreated features replace the entries
+            fld = [str(k) for k in data_new['field'].unique()]
+            append = update is True and recreate_feature is False
+            stats = comp_flib_stats(data_new, append=append, path=dir)
+            if update is False:
+                delete_segments(flib_name(i), path=dir)
+
+            for k, x in data_new.groupby('field', sort=False, observed=True):
+                if update is True and recreate_feature is True:
+                    replace_segments(x, flib_name(i), part=k, path=dir)
+                else:
+                    write_segment(x, flib_name(i), part=k, path=dir)
+
+            update_catalog(flib_name(i), stats=stats, add=append,
+                           drop=None if append else 'all' if update is False else pd.DataFrame({'field': fld}),
+                           path=dir)
 
         print("Factor library for " + i + " is updated.")
 
 
 
-def delete_flib(field, path=fp_cloud):
+def comp_flib_stats(data, append=False, path=fp_data):
+    """Computes the catalog entries (see `fooStrat.store.comp_catalog_stats`) of new factors of a
+    league for `update_flib`.
+
+    Details:
+    --------
+        When the factors are appended, observations that are already stored are overwritten (newest
+        wins), so the counts of the stored observations are taken off. Only the stored data as of the
+        first date of the new factors is read.
+
+    """
+    data = data.drop_duplicates(subset=flib_keys, keep='last')
+    res = comp_catalog_stats(data)
+    if append is False or len(data) == 0:
+        return res
+    old = read_segments(flib_name(data['div'].iloc[0]), keys=flib_keys,
+                        part=[str(k) for k in data['field'].unique()], columns=['val'],
+                        filters=[('date', '>=', pd.Timestamp(data['date'].min()))], path=path)
+    if len(old) == 0:
+        return res
+    old = merge_key(old, data[flib_keys], on=flib_keys, path=path)
+    res = pd.merge(res, comp_catalog_stats(old), on=['div', 'season', 'field'], how='left', suffixes=('', '_old'))
+    for k in ['n', 'n_valid']:
+        res[k] = res[k] - res[k + '_old'].fillna(0).astype('int64')
+    return res[['div', 'season', 'field', 'n', 'n_valid']]
+
+
+
+def flib_name(div):
+    """The name of the factor library of a league (eg. 'E0' -> 'flib/e0')."""
+    return 'flib/' + part_key(div)
+
+
+
+def flib_leagues(path=fp_data):
+    """Retrieve a list of all leagues with a factor library (as in `fooStrat.servicers.flib_list`)."""
+    root = path + 'pro_data/flib/'
+    if not os.path.isdir(root):
+        return []
+    return [i for i in sorted(os.listdir(root)) if os.path.isdir(root + i)]
+
+
+
+def scan_flib(div=None, field=None, date=None, path=fp_data):
+    """A lazy view of the factor library that yields the matching factors league by league,
+    so that only the requested leagues and features are read and never all at once.
+
+    Parameters:
+    -----------
+        div:    list
+                optional, the leagues to retrieve (eg. ['E0'] or ['e0'])
+        field:  list
+                optional, the features to retrieve (eg. ['home', 'form_all'])
+        date:   tuple
+                optional, the first and last date to retrieve (eg. ('2015-01-01', None))
+        path:   str
+                the root path of the data
+
+    Example:
+    --------
+    for x in scan_flib(field=['home', 'form_all'], date=('2020-01-01', None)):
+        print(x['div'].iloc[0], len(x))
+
+    """
+    lg = flib_leagues(path=path) if div is None else [part_key(i) for i in div]
+    fl = []
+    if date is not None and date[0] is not None:
+        fl.append(('date', '>=', pd.Timestamp(date[0])))
+    if date is not None and date[1] is not None:
+        fl.append(('date', '<=', pd.Timestamp(date[1])))
+    for i in lg:
+        res = read_segments(flib_name(i), keys=flib_keys, part=field, filters=fl or None, path=path)
+        if len(res) > 0:
+            yield res.sort_values(['div', 'season', 'date', 'field']).reset_index(drop=True)
+
+
+
+def read_flib(div=None, field=None, date=None, path=fp_data):
+    """Reads the factor library. Only the requested leagues, features and dates are read
+    (see `scan_flib`).
+
+    Returns:
+    --------
+        A dataframe with columns div, season, date, team, field, val.
+
+    """
+    res = list(scan_flib(div=div, field=field, date=date, path=path))
+    if len(res) == 0:
+        return pd.DataFrame(columns=['div', 'season', 'date', 'team', 'field', 'val'])
+    return pd.concat(res, axis=0, sort=False, ignore_index=True)
+
+
+
+def compact_flib(min_segments=4, full=False, path=fp_data):
+    """Merges the append segments of the factor library (see `fooStrat.store.compact_segments`)."""
+    for i in flib_leagues(path=path):
+        ce = compact_segments(flib_name(i), keys=flib_keys, min_segments=min_segments, full=full, path=path)
+        if len(ce) > 0:
+            print("Factor library for " + i + " is compacted.")
+
+
+
+def delete_flib(field, path=fp_data):
     """Delete fields from the factor library.
 
     Parameters:
     -----------
         field:  str
                 the field(s) to be deleted from the factor library
-        dir:    str, default data/pro_data
-                a directory where to store the factor library
+        path:   str
+                the root path of the data
 
     """
-    # retrieve source path
-    path_ed = dir + 'pro_data/'
-    dat_path = os.path_ed.join(os.getcwd(), path_ed[:-1], '')
-    files = [path_ed + f for f in os.listdir(dat_path) if f[:5] == "flib_"]
-    # i = 0
-    for i in range(len(files)):
-        data_ex = pd.read_pickle(files[i])
-        res = data_ex.query("field not in @field")
-        res.to_pickle(files[i])
+    field = [field] if isinstance(field, str) else field
+    for i in flib_leagues(path=path):
+        delete_segments(flib_name(i), part=field, path=path)
+        update_catalog(flib_name(i), drop=pd.DataFrame({'field': field}), path=path)
 
     print("Factor library is updated.")
 
 
-def consol_flib(path=fp_cloud):
-    """Consolidate all feature libraries.
-
-    Details:
-    --------
-        Note that factor libraries are assumed to be stored as flib_-prefix.
+def flib_features(div, field=None, min=0.70, n_season=None, path=fp_data):
+    """Chooses the features of the factor library of a league from the catalog (see
+    `fooStrat.store.read_catalog`) without reading the factor library.
 
-    """
-    # read relevant files
-    l = []
-    for p in glob.glob(path + 'pro_data/flib_*'):
-        if p != path + 'pro_data/flib.pkl':
-            l.append(p)
+    Parameters:
+    -----------
+        div:        str
+                    the league (eg. 'E0' or 'e0')
+        field:      list
+                    optional, the candidate features (defaults to all)
+        min:        float, default 0.70
+                    the minimum share of non-missing values of a feature
+        n_season:   int
+                    optional, only the latest n seasons are considered
+        path:       str
+                    the root path of the data
 
-    res = pd.concat([pd.read_pickle(i) for i in l], axis=0, sort=False)
-    res.reset_index(drop=True, inplace=True)
-    res.to_pickle(path + "pro_data/flib.pkl")
+    Returns:
+    --------
+        A list with the features, or None if the league is not in the catalog (i.e. all
+        features need to be read).
 
-    print("Factor library is consolidated.")
+    Example:
+    --------
+    flib = read_flib(div=['E0'], field=flib_features('E0', field=core_features))
 
+    """
+    x = read_catalog(flib_name(div), path=path)
+    if len(x) == 0:
+        return None
+    if n_season is not None:
+        x = x[x['season'].isin(sorted(x['season'].unique())[-n_season:])]
+    x = x.groupby('field')[['n', 'n_valid']].sum()
+    res = x.index[x['n_valid'] / x['n'] > min]
+    return [i for i in (res if field is None else field) if i in res]
 
 
 def latest_data_only(data, n_season=4):
@@ -1,6 +1,11 @@
 import pandas as pd
 import numpy as np
 import fooStrat.servicers as fose
+from fooStrat.constants import fp_data
+from fooStrat.store import read_partitions
+
+# missing value of the int8 codes of the results table (eg. games that are not played yet)
+res_na = -128
 
 def con_res_gd(data, field):
     """Constructs the goals difference results object.
@@ -72,7 +77,8 @@ def reshape_wdl(data, event, as_numeric=False):
     Parameters:
     -----------
         data:           pandas dataframe
-                        A dataframe with columns season, date, div, home_team, away_team, field, val
+                        A dataframe with columns season, date, div, home_team, away_team, val (the result
+                        eg. 'H', 'D', 'A')
         event:          str
                         How to shape the result. Options are:
                             win     highlight whether a team won with 0 / 1
@@ -152,6 +158,7 @@ def con_res_wd(data, field, event=None, encoding=True):
     Parameters:
     -----------
         data (dataframe):       a dataframe with columns season, date, div, home_team, away_team, field, val
+                                or the match table (see `servicers.match_fields`)
         field (string):         a string that defines the event (eg. 'FTR' for full-time results)
         event (string):         optional, a specific event only (eg. win)
         encoding (string):      whether to encode the events or not (defaults to True)
@@ -177,9 +184,8 @@ def con_res_wd(data, field, event=None, encoding=True):
         4       1993-07-24   F1   win    1993  bordeaux    1
 
     """
-    # query relevant field
-    rel_field = field
-    res_tmp = data.query('field == @rel_field')
+    # query relevant field (games to be predicted have no result yet)
+    res_tmp = fose.match_fields(data, code=[field], dropna=False).rename(columns={field: 'val'})
 
     if encoding == True:
 
@@ -273,6 +279,82 @@ def con_res_multi(data, obj, as_list=True):
 
 
 
+def con_res_table(data):
+    """Constructs the results table with one row per team and game and int8 coded results, so that
+    results objects (see `read_res`) are a lookup instead of being reconstructed from the source data.
+
+    Parameters:
+    -----------
+        data:   pd DataFrame
+                the match table or a table with columns season, date, div, home_team, away_team, field, val
+
+    Returns:
+    --------
+        A dataframe with columns div, season, date, team and
+            wdl:    1 for a win, 0 for a draw & -1 for a loss
+            gd:     the goal difference
+            tg:     the total goals of the game
+        Results that are not available (eg. upcoming games) are `res_na`.
+
+    """
+    x = fose.match_fields(data, field=['FTHG', 'FTAG'], code=['FTR'], dropna=False)
+    ftr = x['FTR'].astype(object).values
+    wdl = np.select([ftr == 'H', ftr == 'D', ftr == 'A'], [1, 0, -1], default=res_na)
+    gd = (x['FTHG'] - x['FTAG']).values
+    tg = (x['FTHG'] + x['FTAG']).values
+
+    res = []
+    for k, s in [['home_team', 1], ['away_team', -1]]:
+        tmp = x[['div', 'season', 'date', k]].rename(columns={k: 'team'})
+        tmp['wdl'] = np.where(wdl == res_na, res_na, s * wdl).astype('int8')
+        tmp['gd'] = np.where(np.isnan(gd), res_na, s * gd).astype('int8')
+        tmp['tg'] = np.where(np.isnan(tg), res_na, tg).astype('int8')
+        res.append(tmp)
+    res = pd.concat(res, axis=0, sort=False, ignore_index=True)
+    res = res.sort_values(['div', 'season', 'date']).reset_index(drop=True)
+    return res
+
+
+def read_res(obj, div=None, season=None, n_season=None, path=fp_data):
+    """Same as `con_res` but looked up from the stored results table (see `con_res_table`).
 
+    Parameters:
+    -----------
+        obj:        str
+                    the object to construct (see `con_res`)
+        div:        list
+                    optional, the divisions to retrieve (eg. ['E0', 'Brazil Serie A'])
+        season:     list
+                    optional, the seasons to retrieve (eg. [2019, 2020])
+        n_season:   int
+                    optional, only the latest n seasons of each division
+        path:       str
+                    the root path of the data
 
+    Example:
+    --------
+    results = read_res('win', div=['E0'])
 
+    """
+    col = {'gd': 'gd', '25g': 'tg'}.get(obj, 'wdl')
+    x = read_partitions('results',
+                        div=div,
+                        season=season,
+                        n_season=n_season,
+                        columns=['div', 'season', 'date', 'team', col],
+                        path=path)
+    key = ['div', 'season', 'date', 'team']
+    wdl = {'win': 1, 'draw': 0, 'lose': -1}
+    if obj in wdl:
+        res = x[key].assign(field=obj, val=(x[col].values == wdl[obj]).astype('int64'))
+    elif obj == 'wdl':
+        res = pd.concat([x[key].assign(field=k, val=(x[col].values == v).astype('int64')) for k, v in wdl.items()],
+                        axis=0, sort=False, ignore_index=True)
+        res = res.sort_values(['date', 'div', 'season']).reset_index(drop=True)
+    elif obj == 'gd':
+        x = x[x[col] != res_na]
+        res = x[key].assign(val=x[col].astype('float64'))
+    elif obj == '25g':
+        x = x[x[col] != res_na]
+        res = x[key].assign(val=(x[col] >= 2.5).astype('int64'))
+    return res.reset_index(drop=True)
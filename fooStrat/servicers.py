@@ -4,6 +4,71 @@ from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import f1_score
 from scipy.stats import zscore
 from fooStrat.helpers import jitter, anti_join
+from fooStrat.keys import merge_key, anti_join_key
+from fooStrat.mapping import odds_books, odds_outcomes, odds_aggregates
+
+# metrics of the standings index (see `con_standings_index`)
+standings_metrics = ['points', 'goals_scored', 'goals_received', 'draws', 'losses', 'wins', 'rank']
+
+
+def match_fields(data, field=None, code=None, na_fill=None, dropna=True):
+    """Retrieves fields in a one-row-per-game format with columns div, season, date, home_team, away_team,
+    field_1, .., field_n.
+
+    Parameters:
+    -----------
+        data:       pandas dataframe
+                    either the wide match table (see `processing.con_match_table`) from which the fields
+                    are selected or a long table with columns div, season, date, home_team, away_team,
+                    field, val, code which is pivoted
+        field:      list
+                    optional, numeric fields of interest (eg. ['FTHG', 'FTAG'])
+        code:       list
+                    optional, non-numeric fields of interest (eg. ['FTR'])
+        na_fill:    float
+                    optional, fill missing numeric fields (eg. FTHG for upcoming games - `na_fill=0`)
+        dropna:     boolean, default True
+                    whether to drop games where none of the fields is available
+
+    Details:
+    --------
+        Fields that are not available in `data` are not returned.
+
+    """
+    gk = ['div', 'season', 'date', 'home_team', 'away_team']
+    field = [] if field is None else list(field)
+    code = [] if code is None else list(code)
+
+    if 'field' in data.columns:
+        data_ed = data[data['field'].isin(field + code)]
+        res = data_ed[gk].drop_duplicates()
+        if len(field) > 0:
+            data_num = data_ed[data_ed['field'].isin(field)]
+            if na_fill is not None:
+                data_num = data_num.assign(val=data_num['val'].fillna(na_fill))
+            tmp = pd.pivot_table(data_num,
+                                 index=gk,
+                                 columns='field',
+                                 values='val',
+                                 observed=True).reset_index()
+            res = merge_key(res, tmp, on=gk, how='left')
+        for k in code:
+            tmp = data_ed.loc[data_ed['field'] == k, gk + ['code']].drop_duplicates(gk)
+            res = merge_key(res, tmp.rename(columns={'code': k}), on=gk, how='left')
+    else:
+        res = data.loc[:, gk + [i for i in field + code if i in data.columns]]
+        if na_fill is not None:
+            fn = [i for i in field if i in res.columns]
+            res = res.assign(**{i: res[i].fillna(na_fill) for i in fn})
+
+    fa = [i for i in field + code if i in res.columns]
+    if len(fa) == 0:
+        return res.iloc[0:0].reset_index(drop=True)
+    if dropna is True:
+        res = res.dropna(subset=fa, how='all')
+    res = res.reset_index(drop=True)
+    return res
+
 
 def comp_league_standing(data,
                          season=None,
@@ -20,7 +85,8 @@ def comp_league_standing(data,
     Parameters:
     -----------
         data:       pandas dataframe
-                    a dataframe with columns div, season, date, home_team, away_team, field, val
+                    a dataframe with columns div, season, date, home_team, away_team, field, val or
+                    the match table (see `match_fields`)
         season:     list
                     a list of values in season for which to calculate standings (defaults to None in which case
                     standings for all seasons are calculated)
@@ -31,6 +97,12 @@ def comp_league_standing(data,
         result:     str
                     results field in data
 
+    Details:
+    --------
+        The standings are derived from the standings index of each division & season (see
+        `con_standings_index`). Teams that have not played yet have no points and are ranked
+        last (ties are ranked by team name).
+
     Returns:
     --------
         tbl (dataframe): a table with team rankings by division and season and the following
@@ -40,80 +112,175 @@ def comp_league_standing(data,
     if season is not None:
         data = data[data['season'].isin(season)]
 
-    # extract relevant fields..
-    df_fw = data.pivot_table(index=['season', 'div', 'date', 'home_team', 'away_team'],
-                             columns='field',
-                             values='val',
-                             aggfunc='sum').reset_index()
-
-    # home team stats..
-    df_h = df_fw.loc[:, ['season', 'div', 'date', 'home_team', away_goals, home_goals, result]]
-    df_h['points'] = df_h[result].apply(lambda x: 3 if x == 'H' else (1 if x == 'D' else 0))
-    df_h['res'] = df_h[result].apply(lambda x: 'w' if x == 'H' else ('d' if x == 'D' else ('l' if x=='A' else np.nan)))
-    df_h.rename(columns={'home_team': 'team',
-                         away_goals: 'goals_received',
-                         home_goals: 'goals_scored'}, inplace=True)
-    df_h = df_h.drop([result], axis=1)
-
-    # away team stats..
-    df_a = df_fw.loc[:, ['season', 'div', 'date', 'away_team', away_goals, home_goals, result]]
-    df_a['points'] = df_a[result].apply(lambda x: 3 if x == 'A' else (1 if x == 'D' else 0))
-    df_a['res'] = df_a[result].apply(lambda x: 'w' if x == 'A' else ('d' if x == 'D' else ('l' if x=='H' else np.nan)))
-    df_a.rename(columns={'away_team': 'team',
-                         away_goals: 'goals_scored',
-                         home_goals: 'goals_received'}, inplace=True)
-    df_a = df_a.drop([result], axis=1)
-
-    # consolidate
-    dfc = pd.concat([df_h, df_a], axis=0, sort=True)
-    dfc[['goals_scored', 'goals_received']] = dfc[['goals_scored', 'goals_received']].apply(pd.to_numeric,
-                                                                                            errors='coerce')
-
-    # a = res.query("div=='E2' & team in ['shrewsbury']").sort_values(['team', 'date'])
-
-    # over time
-    dfc_tot_pts = dfc.sort_values(['date']).reset_index(drop=True)
-    metr = dfc_tot_pts.groupby(by=['div', 'season', 'team'])[['points', 'goals_scored', 'goals_received']]. \
-        cumsum().reset_index(level=0, drop=True)
-    dfc_tot_pts_ed = pd.concat([dfc_tot_pts[['date', 'div', 'season', 'team']], metr], axis=1)
-
-    # number of wins, losses, draws
-    df_wdl = dfc.loc[:, ['season', 'div', 'date', 'team', 'res']]
-    df_wdl['dummy'] = 1
-    df_wdl = df_wdl.sort_values(['date']).reset_index(drop=True)
-    dfc_agg_wdl = df_wdl.pivot_table(index=['div', 'season', 'date', 'team'],
-                                     columns='res',
-                                     values='dummy').reset_index()
-    dfc_agg_wdl = dfc_agg_wdl.fillna(0)
-    dfc_agg_wdlc = dfc_agg_wdl.groupby(['div', 'season', 'team'])[['d', 'l', 'w']]. \
-        cumsum(skipna=True).reset_index(level=0, drop=True)
-    dfc_agg_wdl = pd.concat([dfc_agg_wdl[['date', 'div', 'season', 'team']], dfc_agg_wdlc], axis=1)
-
-    # rename columns
-    dfc_agg_wdl.rename(columns={'w': 'wins', 'l': 'losses', 'd': 'draws'}, inplace=True)
-
-    # add number of wins, draws & losses to standings
-    res_0 = pd.merge(dfc_tot_pts_ed, dfc_agg_wdl,
-                     on=['div', 'season', 'team', 'date'],
-                     how='left')
-
-    # need to expand to have a representation of every team at each date
-    res_1 = expand_event_sphere(data=res_0[['div', 'season', 'date', 'team']])
-    res_1.reset_index(drop=True, inplace=True)
-    res_2 = pd.merge(res_0, res_1, on = ['div', 'season', 'date', 'team'], how='outer')
-    # fill missing
-    res = res_2.sort_values(['div', 'season', 'team', 'date']).reset_index(drop=True)
-    res = res.fillna(method='ffill')
-    # a = res.query("div=='E2' & date in ['2050-01-01', '2020-12-19']")
-
-    # rankings
-    res['rank'] = res.groupby(['div', 'season', 'date'])['points'].rank(ascending=False,
-                                                                        method='first').reset_index(drop=True)
+    res = [con_standings(*con_standings_index(x, home_goals=home_goals, away_goals=away_goals, result=result))
+           for _, x in data.groupby(['div', 'season'], sort=True, observed=True)]
+    if len(res) == 0:
+        return pd.DataFrame(columns=['date', 'div', 'season', 'team'] + standings_metrics)
+    res = pd.concat(res, axis=0, sort=False, ignore_index=True)
+    res = res.sort_values(['div', 'season', 'team', 'date']).reset_index(drop=True)
+    return res
+
+
+
+def con_standings_index(data, home_goals='FTHG', away_goals='FTAG', result='FTR'):
+    """Constructs the standings index of a division & season: the points, goals, draws, losses,
+    wins and the rank of each team after each matchday.
 
+    Parameters:
+    -----------
+        data:       pandas dataframe
+                    the match table or a dataframe with columns div, season, date, home_team, away_team,
+                    field, val of a single division & season
+        home_goals: str
+                    home goals field in data
+        away_goals: str
+                    away goals field in data
+        result:     str
+                    results field in data
+
+    Returns:
+    --------
+        A float32 array (matchday x team x metric) and a dict with the axes date, team, metric
+        (see `standings_metrics`) and div, season.
+
+    """
+    x = match_fields(data, field=[home_goals, away_goals], code=[result], dropna=False)
+    dt = np.sort(x['date'].unique())
+    tm = np.sort(pd.unique(np.concatenate([x['home_team'].astype(str).values, x['away_team'].astype(str).values])))
+    di = np.searchsorted(dt, x['date'].values)
+    ftr = x[result].astype(object).values
+    hg = np.nan_to_num(x[home_goals].values.astype('float64'))
+    ag = np.nan_to_num(x[away_goals].values.astype('float64'))
+
+    # results by matchday & team (games without a result count for nothing)
+    res = np.zeros((len(dt), len(tm), len(standings_metrics)))
+    for k, gs, gr, w, l in [['home_team', hg, ag, 'H', 'A'], ['away_team', ag, hg, 'A', 'H']]:
+        ti = np.searchsorted(tm, x[k].astype(str).values)
+        for j, v in enumerate([np.where(ftr == w, 3, np.where(ftr == 'D', 1, 0)),
+                               gs,
+                               gr,
+                               ftr == 'D',
+                               ftr == l,
+                               ftr == w]):
+            np.add.at(res[:, :, j], (di, ti), v)
+    res = np.cumsum(res, axis=0)
+    # rank on points (ties in order of team names)
+    o = np.argsort(-res[:, :, 0], axis=1, kind='stable')
+    np.put_along_axis(res[:, :, -1], o, np.tile(np.arange(1, len(tm) + 1), (len(dt), 1)), axis=1)
+
+    axes = {'date': dt,
+            'team': tm,
+            'metric': np.array(standings_metrics),
+            'div': np.array([str(data['div'].iloc[0])]),
+            'season': np.array([data['season'].iloc[0]])}
+    return res.astype('float32'), axes
+
+
+
+def con_standings(values, axes):
+    """The standings of every team after each matchday from a standings index (see
+    `con_standings_index`) with columns date, div, season, team, points, goals_scored, goals_received,
+    draws, losses, wins, rank."""
+    d, t = np.meshgrid(axes['date'], axes['team'], indexing='ij')
+    res = pd.DataFrame(values.reshape(-1, values.shape[2]).astype('float64'), columns=axes['metric'])
+    res.insert(0, 'date', d.ravel())
+    res.insert(1, 'div', axes['div'][0])
+    res.insert(2, 'season', axes['season'][0])
+    res.insert(3, 'team', t.ravel())
     return res
 
 
 
+def con_team_season(data, home_goals='FTHG', away_goals='FTAG', result='FTR'):
+    """Constructs the team-season summary: the membership of each team in a division & season along with
+    its final standings, games played and the dates of its first & last game.
+
+    Parameters:
+    -----------
+        data:       pandas dataframe
+                    the match table or a dataframe with columns div, season, date, home_team, away_team,
+                    field, val
+        home_goals: str
+                    home goals field in data
+        away_goals: str
+                    away goals field in data
+        result:     str
+                    results field in data
+
+    Details:
+    --------
+        The final standings equal the standings after the last matchday (see `comp_league_standing`).
+        Games without a result (eg. upcoming games) count for membership and dates only.
+
+    Returns:
+    --------
+        A dataframe with columns div, season, team, n_games, points, goals_scored, goals_received, draws,
+        losses, wins, rank, first_date, last_date.
+
+    """
+    x = match_fields(data, field=[home_goals, away_goals], code=[result], dropna=False)
+    ftr = x[result].astype(object).values
+    hg = np.nan_to_num(x[home_goals].values.astype('float64'))
+    ag = np.nan_to_num(x[away_goals].values.astype('float64'))
+
+    l = []
+    for k, gs, gr, w, lo in [['home_team', hg, ag, 'H', 'A'], ['away_team', ag, hg, 'A', 'H']]:
+        l.append(pd.DataFrame({'div': x['div'].astype(str).values,
+                               'season': x['season'].values,
+                               'team': x[k].astype(str).values,
+                               'date': x['date'].values,
+                               'n_games': np.isin(ftr, ['H', 'D', 'A']).astype('int64'),
+                               'points': np.where(ftr == w, 3, np.where(ftr == 'D', 1, 0)),
+                               'goals_scored': gs,
+                               'goals_received': gr,
+                               'draws': (ftr == 'D').astype('int64'),
+                               'losses': (ftr == lo).astype('int64'),
+                               'wins': (ftr == w).astype('int64')}))
+    res = pd.concat(l, axis=0, ignore_index=True)
+    res = res.groupby(['div', 'season', 'team'], sort=True).agg(n_games=('n_games', 'sum'),
+                                                                points=('points', 'sum'),
+                                                                goals_scored=('goals_scored', 'sum'),
+                                                                goals_received=('goals_received', 'sum'),
+                                                                draws=('draws', 'sum'),
+                                                                losses=('losses', 'sum'),
+                                                                wins=('wins', 'sum'),
+                                                                first_date=('date', 'min'),
+                                                                last_date=('date', 'max')).reset_index()
+    # rank on points (ties in order of team names as in `con_standings_index`)
+    res.insert(10, 'rank', res.groupby(['div', 'season'])['points'].rank(method='first', ascending=False))
+    return res
+
+
+
+def con_team_univ(data):
+    """The teams of each division & season (columns div, season, team) from any dataframe with these
+    columns (eg. the team-season summary, see `con_team_season`)."""
+    return data[['div', 'season', 'team']].drop_duplicates().reset_index(drop=True)
+
+
+
+def comp_standings_asof(values, axes, date):
+    """The standings table as of a date (after all games up to & including the date). The matchday
+    is looked up with a binary search in the standings index (see `con_standings_index`).
+
+    Returns:
+    --------
+        A dataframe with columns team, points, goals_scored, goals_received, draws, losses, wins, rank
+        sorted by rank.
+
+    """
+    i = np.searchsorted(axes['date'], np.datetime64(pd.Timestamp(date)), side='right') - 1
+    if i >= 0:
+        x = values[i].astype('float64')
+    else:
+        # before the first matchday
+        x = np.zeros(values.shape[1:])
+        x[:, -1] = np.arange(1, values.shape[1] + 1)
+    res = pd.DataFrame(x, columns=axes['metric'])
+    res.insert(0, 'team', axes['team'])
+    return res.sort_values('rank').reset_index(drop=True)
+
+
 
 def neutralise_field(data, field, field_name=None, field_numeric=True, column_field=True, na_fill=None):
     """
@@ -122,12 +289,14 @@ def neutralise_field(data, field, field_name=None, field_numeric=True, column_fi
 
     Parameters:
     -----------
-        data (dataframe):   a dataframe with columns div, date, season, home_team, away_team, field, val
+        data (dataframe):   a dataframe with columns div, date, season, home_team, away_team, field, val or the
+                            match table (see `match_fields`)
         field (list):       a list specifying the field(s) of interest (eg. ['FTHG', 'FTAG'])
         field_name (list):  optional, a list with new field name for fields (eg. ['g_scored', 'g_received'])
-        field_numeric (boolean): whether the field to transpose is numeric (True) or not (False)
+        field_numeric (boolean): whether the field to transpose is numeric (True, from `val`) or not (False,
+                                 from `code`)
         column_field (boolean):  whether to have the fields in columns or in wide-format
-        na_fill (double or str):  fill na values where fields are not present (eg. FTHG - `na_fill=0`)
+        na_fill (double):  fill na values where numeric fields are not present (eg. FTHG - `na_fill=0`)
 
     Details:
     --------
@@ -162,25 +331,15 @@ def neutralise_field(data, field, field_name=None, field_numeric=True, column_fi
 
     """
 
-    # filter relevant fields..
-    data_ed = data[(data['field'].isin(field))].reset_index(drop=True)
+    # put the relevant fields in wide format (fill na values, mostly supposed to be predictions)..
+    if field_numeric == True:
+        tmp = match_fields(data, field=field, na_fill=na_fill)
+    else:
+        tmp = match_fields(data, code=field)
     # sometimes, the field does not exist, so return empty df
-    if len(data_ed) < 1:
+    if len(tmp) < 1:
         return pd.DataFrame(columns=['div', 'season', 'date', 'team'] + field_name)
 
-    if field_numeric == True:
-        data_ed['val'] = data_ed['val'].apply(lambda x: pd.to_numeric(x, errors='coerce'))
-
-    # fill na values (mostly supposed to be predictions)
-    if na_fill != None:
-        data_ed = data_ed.fillna(na_fill)
-
-    # put the fields in wide format
-    tmp = pd.pivot_table(data_ed,
-                         index=['div', 'season', 'date', 'home_team', 'away_team'],
-                         columns='field',
-                         values='val').reset_index()
-
     # home team..
     tmp1 = tmp.drop('away_team', axis=1)
     tmp1.rename(columns={'home_team': 'team'}, inplace=True)
@@ -211,35 +370,22 @@ def neutralise_field_multi(data, field, field_map, field_numeric=True, column_fi
     Same as `neutralise_field` but with multiple field functionality.
     """
 
-    # filter relevant fields
-    arf = field.get('odds_home_win') + field.get('odds_away_win') + field.get('odds_draw_win')
-    data_ed = data[data['field'].isin(arf)].reset_index(drop=True)
-
-    if field_numeric == True:
-        data_ed['val'] = data_ed['val'].apply(lambda x: pd.to_numeric(x, errors='coerce'))
-
     # home team..
     rfh = field.get('odds_home_win') + field.get('odds_draw_win')
-    tmp1 = pd.pivot_table(data_ed[data_ed['field'].isin(rfh)],
-                          index=['div', 'season', 'date', 'home_team', 'away_team'],
-                          columns='field',
-                          values='val').reset_index()
+    tmp1 = match_fields(data, field=rfh)
     tmp1 = tmp1.drop('away_team', axis=1)
     tmp1.rename(columns={'home_team': 'team'}, inplace=True)
     rfh_m = field_map[field_map['field'].isin(rfh)]
-    tmp1.rename(columns=dict(zip(tmp1.loc[:, rfh_m['field']], rfh_m['field_neutral'])), inplace=True)
+    tmp1.rename(columns=dict(zip(rfh_m['field'], rfh_m['field_neutral'])), inplace=True)
 
 
     # away team (note that fields are reversed here!)..
     rfa = field.get('odds_away_win') + field.get('odds_draw_win')
-    tmp2 = pd.pivot_table(data_ed[data_ed['field'].isin(rfa)],
-                          index=['div', 'season', 'date', 'home_team', 'away_team'],
-                          columns='field',
-                          values='val').reset_index()
+    tmp2 = match_fields(data, field=rfa)
     tmp2 = tmp2.drop('home_team', axis=1)
     tmp2.rename(columns={'away_team': 'team'}, inplace=True)
     rfa_m = field_map[field_map['field'].isin(rfa)]
-    tmp2.rename(columns=dict(zip(tmp2.loc[:, rfa_m['field']], rfa_m['field_neutral'])), inplace=True)
+    tmp2.rename(columns=dict(zip(rfa_m['field'], rfa_m['field_neutral'])), inplace=True)
 
     # put together..
     data_ed_co = pd.concat([tmp1, tmp2], axis=0, sort=False, ignore_index=True)
@@ -263,19 +409,15 @@ def con_h2h_set(data, field, field_name=None):
     Parameters:
     -----------
         data:       pandas dataframe
-                    a dataframe with columns div, season, date, home_team, away_team, field, val
+                    a dataframe with columns div, season, date, home_team, away_team, field, val or the
+                    match table (see `match_fields`)
         field:      list
                     a list with 2 relevant fields for each side (home_team, away_team) in `data` (eg. ['FTHG', 'FTAG'])
         field_name: list
                     optional, a list with names for the home_team field and away_team field (in this order)
 
     """
-    data_ed = data[data['field'].isin(field)].reset_index(drop=True)
-    data_ed['val'] = data_ed['val'].apply(lambda x: pd.to_numeric(x, errors='coerce'))
-    tmp = pd.pivot_table(data_ed,
-                         index=['div', 'season', 'date', 'home_team', 'away_team'],
-                         columns='field',
-                         values='val').reset_index()
+    tmp = match_fields(data, field=field)
 
     if field_name is None:
         field_name = field
@@ -302,7 +444,7 @@ def con_h2h_set(data, field, field_name=None):
 
 def con_h2h_set_upcoming(data):
     """Constructs the head-to-head upcoming games dataset."""
-    pds = data.query("field=='FTR'")[['div', 'season', 'date', 'home_team', 'away_team']]
+    pds = match_fields(data, code=['FTR'], dropna=False)[['div', 'season', 'date', 'home_team', 'away_team']]
     pds = pds[pds['date'] == pds['date'].max()].reset_index(drop=True)
     pds_1 = pds.rename(columns={'home_team': 'team',
                                 'away_team': 'opponent'})
@@ -314,13 +456,15 @@ def con_h2h_set_upcoming(data):
 
 
 
-def newcomers(data):
+def newcomers(data, team_univ=None):
     """Identify newcomers (promoted/demoted teams) in each season. This is used to neutralise scores for these
     teams at the start of each season.
 
     Parameters:
     -----------
-        data (dataframe):   a dataframe with columns div, date, season, team
+        data (dataframe):       a dataframe with columns div, date, season, team
+        team_univ (dataframe):  optional, the teams by season (eg. the team-season summary, see
+                                `con_team_season`) instead of the teams in data
 
     Details:
     --------
@@ -329,10 +473,7 @@ def newcomers(data):
 
     """
     # assemble all teams by season, div
-    U = data.groupby(['season', 'div'])['team'].unique().reset_index()
-    Ue = U.apply(lambda x: pd.Series(x['team']), axis=1).stack().reset_index(level=1, drop=True)
-    Ue.name = 'team'
-    Ue = U.drop('team', axis=1).join(Ue)
+    Ue = con_team_univ(data if team_univ is None else team_univ)
     # identify promoted & demoted teams
     Ue_0 = Ue.copy()
     Ue_0['season'] = Ue_0['season'] + 1
@@ -364,13 +505,13 @@ def neutralise_scores(data, teams, n):
 
     """
     # retrieve factor scores for the relevant teams..
-    Rt = pd.merge(data, teams, on=['div', 'season', 'team'], how='inner')
+    Rt = merge_key(data, teams, on=['div', 'season', 'team'], how='inner')
     Rt.sort_values(['div', 'team', 'date'], inplace=True)
     Rt = Rt.groupby(['div', 'season', 'team']).head(n)
     # set values to zero for these fields..
     Rt['val'] = 0
     # remove the adjusted values and add back the new values..
-    data_ed = anti_join(data, Rt[['div', 'date', 'team']], on=['div', 'team', 'date'])
+    data_ed = anti_join_key(data, Rt, on=['div', 'team', 'date'])
     res = pd.concat([data_ed, Rt], axis=0, sort=False, ignore_index=True)
     res = res.sort_values(['date', 'div', 'season']).reset_index(level=0, drop=True)
     return res
@@ -397,42 +538,32 @@ def norm_factor(data, neutralise=True):
     return res
 
 
-def expand_event_sphere(data, dates=None):
+def expand_event_sphere(data, dates=None, team_univ=None):
     """Expands the data universe to build a cross-sectional event dataset for each league so that
     each relevant team has a presence on each match day.
 
     Parameters:
     -----------
-        data:   pandas dataframe
-                a dataframe with columns div, date, season, team, field, val
-        dates:  pandas dataframe
-                optional, if not all dates are represented in `data`, provide
-                all relevant dates with columns div, season, date
+        data:       pandas dataframe
+                    a dataframe with columns div, date, season, team, field, val
+        dates:      pandas dataframe
+                    optional, if not all dates are represented in `data`, provide
+                    all relevant dates with columns div, season, date
+        team_univ:  pandas dataframe
+                    optional, the teams by season (eg. the team-season summary, see `con_team_season`)
+                    instead of the teams in data
 
     """
     # all game days by season and league
-    if dates is None:
-        agdg = data.groupby(['div', 'season'])['date'].unique().reset_index()
-    else:
-        agdg = dates.groupby(['div', 'season'])['date'].unique().reset_index()
+    agdg = (data if dates is None else dates)[['div', 'season', 'date']].drop_duplicates()
 
     # teams by season for each league
-    team_univ = pd.DataFrame(data.loc[:, 'team'].unique(), columns={'team'})
-    team_univ = data.groupby(['div', 'season'])['team'].unique().reset_index()
-    team_univ_tmp = team_univ.apply(lambda x:
-                                    pd.Series(x['team']), axis=1).stack().reset_index(level=1, drop=True)
-    team_univ_tmp.name = 'team'
-    team_univ = team_univ.drop('team', axis=1).join(team_univ_tmp)
-    team_univ.reset_index(drop=True, inplace=True)
+    team_univ = con_team_univ(data if team_univ is None else team_univ)
 
     # cross-sectional expansion
-    res = pd.merge(agdg, team_univ,
+    res = pd.merge(team_univ, agdg,
                    on=['div', 'season'],
                    how='inner')
-    tmp = res.apply(lambda x:
-                    pd.Series(x['date']), axis=1).stack().reset_index(level=1, drop=True)
-    tmp.name = 'date'
-    res = res.drop('date', axis=1).join(tmp)
 
     return res
 
@@ -460,21 +591,24 @@ def expand_field(data, dates=None, keys=['div', 'season', 'date', 'team', 'field
     --------
     - Note that the date expansion happens for each available date by league in data enabling
       cross-sectional factor building by competition
+    - An empty dataframe is returned as is
 
     """
+    if len(data) == 0:
+        return data.reset_index(drop=True)
     data_ed = expand_event_sphere(data=data, dates=dates)
-    res = pd.DataFrame()
+    res = []
     for k in data['field'].unique():
         tmp = data_ed.copy()
         tmp['field'] = k
-        tmp = pd.merge(tmp, data[data['field'] == k],
-                       on=keys,
-                       how='outer').sort_values(by='date')
+        tmp = merge_key(tmp, data[data['field'] == k],
+                        on=keys,
+                        how='outer').sort_values(by='date')
         tmp = tmp.sort_values(['div', 'season', 'team', 'field', 'date']).reset_index(drop=True)
-        tmp = tmp.fillna(method='ffill')
-        res = res.append(tmp, ignore_index=True, sort=False)
+        tmp = tmp.ffill()
+        res.append(tmp)
 
-    return res
+    return pd.concat(res, axis=0, ignore_index=True, sort=False)
 
 
 
@@ -503,12 +637,7 @@ def insert_tp1_vals(data, date_tp1='2050-01-01', by='field', append=True):
     c1['val'] = np.nan
     if append is True:
         # make sure no duplicates
-        dfz_0 = anti_join(c1, data.drop('val', axis=1),
-                          on=['div', 'season', 'team', 'field', 'date'])
-        # sometimes unexpectedly there are still some leftovers on the x dataset, so make sure no duplicates
-        dfz_0 = pd.merge(dfz_0, c1.drop('val', axis=1),
-                         how='inner',
-                         on=['div', 'season', 'team', 'field', 'date'])
+        dfz_0 = anti_join_key(c1, data, on=['div', 'season', 'team', 'field', 'date'])
         c1 = pd.concat([data, dfz_0], sort=True, axis=0)
 
     return(c1)
@@ -534,9 +663,8 @@ def max_event_odds_asym(data, field, team, new_field):
     # filter relevant fields..
     data_ed = data.loc[data['field'].isin(field), ['date', 'div', 'season', team, 'field', 'val']]
     data_ed.rename(columns={team: 'team'}, inplace=True)
-    data_ed['val'] = data_ed['val'].apply(pd.to_numeric, errors='coerce')
     # retrieve the best odds..
-    max_odds = data_ed.groupby(['season', 'div', 'date', 'team']).max()['val'].reset_index()
+    max_odds = data_ed.groupby(['season', 'div', 'date', 'team'], observed=True)['val'].max().reset_index()
     max_odds['field'] = new_field
     return max_odds
 
@@ -558,8 +686,8 @@ def max_event_odds_sym(data, field, new_field):
 
             """
     data_ed = data[(data['field'].isin(field))]
-    data_ed['val'] = data_ed['val'].apply(pd.to_numeric, errors='coerce')
-    max_odds = data_ed.groupby(['season', 'div', 'date', 'home_team', 'away_team']).max()['val'].reset_index()
+    max_odds = data_ed.groupby(['season', 'div', 'date', 'home_team', 'away_team'],
+                               observed=True)['val'].max().reset_index()
     # home numbers
     max_odds_dh = max_odds.loc[:, max_odds.columns != 'away_team']
     max_odds_dh.rename(columns={'home_team': 'team'}, inplace=True)
@@ -622,6 +750,119 @@ def get_odds(data, field_home, field_away, field_draw, field_25g):
 
 
 
+def con_odds_cube(data):
+    """Constructs the odds cube (game x bookmaker x outcome) from the match table, so that best odds,
+    odds volatility etc. are reductions over the bookmaker axis instead of pivots of the source data.
+
+    Parameters:
+    -----------
+        data:   pandas dataframe
+                the match table with columns div, season, date, home_team, away_team and the odds fields
+                (see `fooStrat.processing.con_match_table`)
+
+    Returns:
+    --------
+        A float32 array with the odds of each game (row of `data`), bookmaker and outcome and a dict with
+        the axes: the game index (div, season, date, home_team, away_team), bookmaker (eg. B365, PS, Max)
+        and outcome (home, draw, away, over, under 2.5 goals). Odds that are not available are NaN. Note
+        that the bookmaker axis includes the aggregates across bookmakers (eg. Max, Avg), see
+        `odds_book_mask`.
+
+    """
+    bk = odds_books['bookmaker'].unique()
+    oc = np.array(list(odds_outcomes.values()))
+    bi = dict(zip(bk, range(len(bk))))
+    oi = dict(zip(oc, range(len(oc))))
+    values = np.full((len(data), len(bk), len(oc)), np.nan, dtype='float32')
+    for f, b, o in odds_books.itertuples(index=False):
+        if f in data.columns:
+            values[:, bi[b], oi[o]] = data[f].values
+    axes = {k: np.asarray(data[k]) for k in ['div', 'season', 'date', 'home_team', 'away_team']}
+    axes['bookmaker'] = bk
+    axes['outcome'] = oc
+    return values, axes
+
+
+
+def comp_odds_max(values):
+    """The best odds of each game and outcome across bookmakers (game x outcome)."""
+    return np.fmax.reduce(values, axis=1)
+
+
+
+def odds_book_mask(axes):
+    """Whether each bookmaker of the odds cube (see `con_odds_cube`) is a single bookmaker rather than an
+    aggregate across bookmakers (eg. Max, Avg) as per `fooStrat.mapping.odds_aggregates`."""
+    return ~np.isin(axes['bookmaker'], odds_aggregates)
+
+
+
+def comp_odds_vol(values, axes):
+    """The volatility (standard deviation) of the odds of each game and outcome across bookmakers
+    (game x outcome). Aggregates across bookmakers are left out (see `odds_book_mask`). It is NaN
+    for less than 2 bookmakers."""
+    x = values[:, odds_book_mask(axes), :].astype('float64')
+    n = np.sum(~np.isnan(x), axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        m = np.nansum(x, axis=1) / n
+        res = np.nansum((x - m[:, None, :]) ** 2, axis=1) / (n - 1)
+    res[n < 2] = np.nan
+    return np.sqrt(res)
+
+
+
+def comp_odds_implied(values, axes):
+    """The implied probabilities of the best odds of each game and outcome (game x outcome) across
+    single bookmakers (see `odds_book_mask`). The probabilities of home/draw/away and over/under 2.5
+    goals are normalised to sum to 1 (ie. the bookmaker margin is removed)."""
+    res = 1 / comp_odds_max(values[:, odds_book_mask(axes), :]).astype('float64')
+    oc = list(axes['outcome'])
+    for k in [['home', 'draw', 'away'], ['over', 'under']]:
+        i = [oc.index(j) for j in k]
+        res[:, i] = res[:, i] / res[:, i].sum(axis=1, keepdims=True)
+    return res
+
+
+
+def get_odds_cube(values, axes):
+    """Same as `get_odds` but as a reduction of the odds cube (see `con_odds_cube`).
+
+    Returns:
+    --------
+        A dataframe with columns div, season, date, team, field, val where field is one of odds_25g,
+        odds_draw, odds_win, odds_lose.
+
+    """
+    mo = comp_odds_max(values)
+    oc = list(axes['outcome'])
+    gm = pd.DataFrame({k: axes[k] for k in ['div', 'season', 'date']})
+    # home & away team perspective
+    moh = gm.assign(team=axes['home_team'],
+                    odds_25g=mo[:, oc.index('over')],
+                    odds_draw=mo[:, oc.index('draw')],
+                    odds_win=mo[:, oc.index('home')])
+    moa = gm.assign(team=axes['away_team'],
+                    odds_25g=mo[:, oc.index('over')],
+                    odds_draw=mo[:, oc.index('draw')],
+                    odds_win=mo[:, oc.index('away')])
+    moc = pd.concat([moh, moa], axis=0, sort=False, ignore_index=True)
+    moc = moc.sort_values(['season', 'div', 'date', 'team']).reset_index(drop=True)
+    # -- implied losing odds
+    moc["odds_lose"] = 1 / (1 - (1 / moc["odds_draw"] + 1 / moc["odds_win"]))
+    for k in ['div', 'team']:
+        moc[k] = moc[k].astype('category')
+
+    res = pd.melt(moc,
+                  id_vars=['div', 'season', 'date', 'team'],
+                  var_name='field',
+                  value_name="val")
+    # outcomes without any odds are left out
+    res = res.dropna(subset=['val']).reset_index(drop=True)
+
+    return res
+
+
+
 def con_gameday(data):
     """Compute the game day for every team.
     Parameters:
@@ -672,7 +913,7 @@ def con_est_dates(data, k, map_date=False, div=None):
         ugd = game_day.groupby(['div', 'season'])['date'].unique().reset_index()
         ugd = ugd.explode('date').reset_index(drop=True)
         res = pd.merge(ugd, res, on=['div', 'season', 'date'], how='left')
-        res['est_date'] = res.groupby('div')['est_date'].fillna(method='ffill', axis=0)
+        res['est_date'] = res.groupby('div')['est_date'].ffill()
 
     return res
 
@@ -684,7 +925,7 @@ def con_est_dates(data, k, map_date=False, div=None):
 def con_date_univ(data):
     """Constructs the date universe (dates at which games are played) for every league and season.
     """
-    x = data.groupby(['div', 'season'])['date'].unique().reset_index()
+    x = data.groupby(['div', 'season'], observed=True)['date'].unique().reset_index()
     y = x.apply(lambda x: pd.Series(x['date']), axis=1).stack().reset_index(level=1, drop=True)
     y.name = 'date'
     y = x.drop('date', axis=1).join(y)
@@ -794,7 +1035,7 @@ def append_custom_window(data, k):
 
 def custom_window(k, l):
     """Constructs a custom window of k non-overlapping groups given a length."""
-    nper = np.int(np.ceil(l / k))
+    nper = int(np.ceil(l / k))
     nper = np.sort([i + 1 for i in range(0, nper, 1)] * k)
     nper = nper[::-1]
     nper = nper[(len(nper) - l):]
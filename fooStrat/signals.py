@@ -4,16 +4,21 @@ from datetime import date, datetime
 from fooStrat.modelling import mod_periods, est_proba_ensemble
 from fooStrat.servicers import neutralise_field
 from fooStrat.helpers import anti_join
-from fooStrat.constants import fp_cloud
+from fooStrat.constants import fp_data
+from fooStrat.store import lock_dataset
+
+
+# features used for the signals
+core_features = ['rank_position', 'goal_superiority', 'home', 'avg_goal_scored', 'turnaround_ability_last',
+                 'form_all', 'atadef_composite', 'turnaround_ability_trend', 'odds_accuracy', 'attack_strength',
+                 'points_advantage', 'not_failed_scoring', 'points_per_game', 'shots_attempted_tgt',
+                 'h2h_next_opponent_advantage', 'h2h_next_opponent_chance']
 
 
 def use_features(data, foi=None):
     """Extract a list of wanted features from the dataset."""
     if foi is None:
-        foi = ['rank_position', 'goal_superiority', 'home', 'avg_goal_scored', 'turnaround_ability_last',
-               'form_all', 'atadef_composite', 'turnaround_ability_trend', 'odds_accuracy', 'attack_strength',
-               'points_advantage', 'not_failed_scoring', 'points_per_game', 'shots_attempted_tgt',
-               'h2h_next_opponent_advantage', 'h2h_next_opponent_chance']
+        foi = core_features
 
     res = data.loc[:, data.columns.isin(['date', 'div', 'season', 'team', 'result'] + foi)]
     return res
@@ -69,7 +74,7 @@ def add_upcoming_date(data, upcoming):
 
 
 
-def register_predictions(data, event, path=fp_cloud, overwrite=False):
+def register_predictions(data, event, path=fp_data, overwrite=False):
     """Updates the predictions log-file with latest predictions.
 
     Parameters:
@@ -85,26 +90,28 @@ def register_predictions(data, event, path=fp_cloud, overwrite=False):
 
     """
     fp = path + 'log_data/predictions_' + event + '.xlsx'
-    if overwrite is False:
-        ex = pd.read_excel(fp,
-                           sheet_name=event,
-                           index_col=0)
-
-        # make sure date objects are correct
-        ex['date'] = ex['date'].apply(lambda x: np.datetime64(x))
-        ex['date_play'] = ex['date_play'].apply(lambda x: np.datetime64(x))
-        new = anti_join(x=data,
-                        y=ex[['div', 'season', 'team', 'date_play']],
-                        on=['div', 'season', 'team', 'date_play'])
-        new = new[new['date'].notnull()]
-        upd = pd.concat([ex, new], axis=0, sort=True)
-        upd = upd.sort_values(['date_play', 'date_pred']).reset_index(drop=True)
-        # transform dates to objects so it's easier to view outside excel
-        # upd[['date', 'date_play']] = upd[['date', 'date_play']].astype("object")
-        upd.to_excel(fp, sheet_name=event, engine='openpyxl')
-
-    else:
-        data.to_excel(fp, sheet_name=event, engine='openpyxl')
+    # several signal jobs may register predictions at the same time
+    with lock_dataset('predictions_' + event, shared=False, path=path):
+        if overwrite is False:
+            ex = pd.read_excel(fp,
+                               sheet_name=event,
+                               index_col=0)
+
+            # make sure date objects are correct
+            ex['date'] = ex['date'].apply(lambda x: np.datetime64(x))
+            ex['date_play'] = ex['date_play'].apply(lambda x: np.datetime64(x))
+            new = anti_join(x=data,
+                            y=ex[['div', 'season', 'team', 'date_play']],
+                            on=['div', 'season', 'team', 'date_play'])
+            new = new[new['date'].notnull()]
+            upd = pd.concat([ex, new], axis=0, sort=True)
+            upd = upd.sort_values(['date_play', 'date_pred']).reset_index(drop=True)
+            # transform dates to objects so it's easier to view outside excel
+            # upd[['date', 'date_play']] = upd[['date', 'date_play']].astype("object")
+            upd.to_excel(fp, sheet_name=event, engine='openpyxl')
+
+        else:
+            data.to_excel(fp, sheet_name=event, engine='openpyxl')
 
     print("Latest predictions were registered.")
 
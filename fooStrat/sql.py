@@ -0,0 +1,143 @@
+import os
+import duckdb
+import pandas as pd
+import pyarrow.dataset as ds
+from fooStrat.constants import fp_data
+from fooStrat.store import list_partitions, list_segments, get_codec, frame_ext, part_key
+from fooStrat.processing import flib_name, flib_leagues, flib_keys
+
+# partitioned datasets that are registered as views (see `connect_store`)
+sql_datasets = ['source_core', 'match_table', 'results', 'team_season']
+# single tables that are registered as views
+sql_frames = ['match_odds', 'upcoming_games']
+
+
+def sql_files(files):
+    """The SQL list of parquet files to scan (eg. "['a.parquet', 'b.parquet']")."""
+    return '[' + ', '.join("'" + i.replace("'", "''") + "'" for i in files) + ']'
+
+
+def con_sql_filter(div=None, season=None):
+    """The SQL where clause for divisions & seasons (divisions are matched by partition key)."""
+    l = []
+    if div is not None:
+        l.append("lower(replace(replace(cast(div as varchar), ' ', '_'), '-', '_')) in (" +
+                 ', '.join("'" + part_key(i).replace("'", "''") + "'" for i in div) + ")")
+    if season is not None:
+        l.append("cast(season as varchar) in (" + ', '.join("'" + part_key(i) + "'" for i in season) + ")")
+    return '' if len(l) == 0 else ' where ' + ' and '.join(l)
+
+
+def connect_store(div=None, season=None, path=fp_data):
+    """Opens an in-process SQL database (DuckDB) with views on the stored data, so that research
+    queries are run out of core instead of on the full data loaded into pandas.
+
+    Parameters:
+    -----------
+        div:        list
+                    optional, the divisions to register (eg. ['E0']), all other divisions are not
+                    even opened by the views
+        season:     list
+                    optional, the seasons to register (eg. [2019, 2020])
+        path:       str
+                    the root path of the data (eg. a snapshot, see `fooStrat.store.snapshot_path`)
+
+    Details:
+    --------
+        The following views are registered (if the data is available):
+            source_core, match_table, results,
+            team_season:                        the partitions of the datasets
+            match_odds, upcoming_games:         the stored tables
+            flib:                               the factor libraries (newest-wins as in `read_flib`)
+            predictions:                        the registered predictions with column event
+        The views only scan the files when a query is run and only read the columns and row groups
+        a query needs (filters are pushed down into the parquet scans). Since the views read the
+        files of the live store when a query runs, use a snapshot to query data that is being
+        rewritten at the same time.
+
+    Returns:
+    --------
+        A DuckDB connection.
+
+    Example:
+    --------
+    con = connect_store(div=['E0'])
+    con.execute("select * from match_odds where season = 2020 and field = 'odds_win'").df()
+
+    """
+    con = duckdb.connect(database=':memory:')
+
+    # partitioned datasets
+    for k in sql_datasets:
+        fl = list_partitions(k, div=div, season=season, path=path)['file']
+        if len(fl) > 0:
+            con.execute("create view " + k + " as select * from read_parquet(" + sql_files(fl) +
+                        ", union_by_name=true)")
+
+    # single tables
+    for k in sql_frames:
+        fm = get_codec(k)[0]
+        fn = [path + 'pro_data/' + k + frame_ext[i] for i in [fm] + [i for i in frame_ext if i != fm]]
+        fn = [i for i in fn if os.path.isfile(i)]
+        if len(fn) == 0:
+            continue
+        if fn[0].endswith('.parquet'):
+            con.execute("create view " + k + "_all as select * from read_parquet(" + sql_files(fn[:1]) + ")")
+        elif fn[0].endswith('.feather'):
+            con.register(k + '_all', ds.dataset(fn[0], format='feather'))
+        else:
+            con.register(k + '_all', pd.read_pickle(fn[0]))
+        con.execute("create view " + k + " as select * from " + k + "_all" + con_sql_filter(div, season))
+
+    # factor libraries (the segments of a feature are resolved by newest-wins)
+    fl = [list_segments(flib_name(i), path=path) for i in (flib_leagues(path=path) if div is None else div)]
+    fl = [i for i in fl if len(i) > 0]
+    if len(fl) > 0:
+        fl = pd.concat(fl, axis=0, ignore_index=True)['file']
+        con.execute("create view flib as select * exclude (filename, rn) from "
+                    "(select *, row_number() over (partition by " + ', '.join(flib_keys) +
+                    " order by filename desc) as rn from read_parquet(" + sql_files(fl) +
+                    ", union_by_name=true, filename=true)" + con_sql_filter(None, season) + ") where rn = 1")
+
+    # predictions
+    pr = []
+    for k in ['win', 'lose', 'goals']:
+        fp = path + 'log_data/predictions_' + k + '.xlsx'
+        if os.path.isfile(fp):
+            pr.append(pd.read_excel(fp, sheet_name=k, index_col=0).assign(event=k))
+    if len(pr) > 0:
+        con.register('predictions_all', pd.concat(pr, axis=0, sort=False, ignore_index=True))
+        con.execute("create view predictions as select * from predictions_all" + con_sql_filter(div, season))
+
+    return con
+
+
+def query_store(query, div=None, season=None, path=fp_data):
+    """Runs a SQL query on the stored data (see `connect_store` for the available views).
+
+    Parameters:
+    -----------
+        query:  str
+                the SQL query
+        div:    list
+                optional, the divisions to register
+        season: list
+                optional, the seasons to register
+        path:   str
+                the root path of the data
+
+    Returns:
+    --------
+        A pandas dataframe with the query result.
+
+    Example:
+    --------
+    query_store("select season, avg(val) as odds from match_odds where field = 'odds_win' group by season",
+                div=['E0'])
+
+    """
+    con = connect_store(div=div, season=season, path=path)
+    try:
+        return con.execute(query).df()
+    finally:
+        con.close()
@@ -0,0 +1,848 @@
+import os
+import fcntl
+import threading
+import shutil
+import fnmatch
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pyarrow.feather as feather
+from fooStrat.constants import fp_data, store_codec
+
+
+# dataset locks held by each thread of this process (see `lock_dataset`)
+lock_local = threading.local()
+# file extension of each format of single tables (see `write_frame`)
+frame_ext = {'pickle': '.pkl', 'parquet': '.parquet', 'feather': '.feather'}
+# partitioned datasets whose fields are recorded in the catalog when they are written (see `update_catalog`)
+catalog_names = ['source_core']
+catalog_cols = ['dataset', 'div', 'season', 'field', 'n', 'n_valid']
+
+
+@contextmanager
+def lock_dataset(name, shared=True, path=fp_data):
+    """Reader/writer lock of a dataset that works across processes. Any number of readers can
+    hold a shared lock while a writer holds an exclusive lock, so readers always see a consistent
+    version of a dataset even if it is rewritten by another job at the same time.
+
+    Parameters:
+    -----------
+        name:   str
+                the name of the dataset (eg. 'source_core' or 'match_odds')
+        shared: boolean, default True
+                whether to acquire a shared (read) or an exclusive (write) lock
+        path:   str
+                the root path of the data
+
+    Details:
+    --------
+        The lock is re-entrant within a thread, so functions that hold a lock can call other
+        functions that lock the same dataset (other threads wait as other processes do). A shared lock cannot be upgraded, i.e. requesting an
+        exclusive lock while a shared lock is held raises an error.
+
+    Example:
+    --------
+    with lock_dataset('source_core', shared=False):
+        ...
+
+    """
+    fp = path + 'pro_data/' + name + '.lock'
+    if not hasattr(lock_local, 'held'):
+        lock_local.held = {}
+    lock_held = lock_local.held
+    if fp in lock_held:
+        if shared is False and lock_held[fp][1] == fcntl.LOCK_SH:
+            # converting a lock is not atomic: two upgrading readers would deadlock and a writer
+            # could get in between, so the exclusive lock has to be taken from the start
+            raise RuntimeError("An exclusive lock on " + name + " is requested while a shared lock is held.")
+        yield
+        return
+
+    os.makedirs(os.path.dirname(fp), exist_ok=True)
+    f = open(fp, 'a+')
+    mode = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+    fcntl.flock(f, mode)
+    lock_held[fp] = [f, mode]
+    try:
+        yield
+    finally:
+        del lock_held[fp]
+        fcntl.flock(f, fcntl.LOCK_UN)
+        f.close()
+
+
+def dataset_version(name, path=fp_data):
+    """The version of a dataset, which is increased with every write (0 if never written)."""
+    fp = path + 'pro_data/' + name + '.version'
+    if not os.path.isfile(fp):
+        return 0
+    with open(fp) as f:
+        return int(f.read())
+
+
+def bump_version(name, path=fp_data):
+    """Increases the version of a dataset (see `dataset_version`)."""
+    fp = path + 'pro_data/' + name + '.version'
+    v = dataset_version(name, path=path) + 1
+    os.makedirs(os.path.dirname(fp), exist_ok=True)
+    with open(fp + '.tmp', 'w') as f:
+        f.write(str(v))
+    os.replace(fp + '.tmp', fp)
+    return v
+
+
+def sub_datasets(name, path=fp_data):
+    """The datasets that make up a dataset which is not written as a whole but by parts with their own
+    locks & versions (eg. 'flib' -> ['flib/e0', 'flib/sp1', ..]), otherwise the dataset itself."""
+    root = path + 'pro_data/' + name + '/'
+    if os.path.isfile(path + 'pro_data/' + name + '.version') or not os.path.isdir(root):
+        return [name]
+    return [name + '/' + i[:-8] for i in sorted(os.listdir(root)) if i.endswith('.version')] or [name]
+
+
+def get_codec(name):
+    """The storage format & compression codec of a dataset as configured in
+    `fooStrat.constants.store_codec` (eg. 'flib/e0' -> ['parquet', 'zstd']). Defaults to parquet
+    with snappy compression."""
+    return store_codec.get(name, store_codec.get(name.split('/')[0], ['parquet', 'snappy']))
+
+
+def part_key(x):
+    """Translates a division (or any partition value) into the name of its partition folder (eg.
+    'Turkey Süper Lig' -> 'turkey_süper_lig'). Note that the same convention is used for the
+    league-level factor libraries."""
+    if isinstance(x, str):
+        return x.lower().replace(" ", "_").replace("-", "_")
+    else:
+        return str(int(x))
+
+
+def list_partitions(name, div=None, season=None, n_season=None, parts=None, path=fp_data, file='*.parquet'):
+    """Lists the partitions of a stored dataset without reading any of them.
+
+    Parameters:
+    -----------
+        name:       str
+                    the name of the dataset (eg. 'source_core')
+        div:        list
+                    optional, the divisions to retrieve (eg. ['E0', 'Brazil Serie A'])
+        season:     list
+                    optional, the seasons to retrieve (eg. [2019, 2020])
+        n_season:   int
+                    optional, only the latest n seasons of each division (see `latest_data_only`)
+        parts:      pandas dataframe
+                    optional, the exact partitions to retrieve with columns div, season
+        path:       str
+                    the root path of the data
+        file:       str or list, default *.parquet
+                    the file(s) that each partition holds, either a pattern or a list of file names
+                    (eg. 'values.npy' for partitioned cubes or ['results.parquet'] for a field group)
+
+    Returns:
+    --------
+        A dataframe with columns div, season, file (one row per file) where div is the partition key
+        of the division.
+
+    """
+    root = path + 'pro_data/' + name + '/'
+    cols = ['div', 'season', 'file']
+    if not os.path.isdir(root):
+        return pd.DataFrame(columns=cols)
+
+    div_ed = None if div is None else [part_key(i) for i in div]
+    season_ed = None if season is None else [part_key(i) for i in season]
+    l = []
+    for d in sorted(os.listdir(root)):
+        if not os.path.isdir(root + d) or (div_ed is not None and d not in div_ed):
+            continue
+        for s in sorted(os.listdir(root + d)):
+            if season_ed is not None and s not in season_ed or not os.path.isdir(root + d + '/' + s):
+                continue
+            fp = root + d + '/' + s + '/'
+            fl = file if isinstance(file, list) else fnmatch.filter(sorted(os.listdir(fp)), file)
+            l += [[d, s, fp + f] for f in fl if os.path.isfile(fp + f)]
+
+    res = pd.DataFrame(l, columns=cols)
+    if parts is not None:
+        pk = pd.DataFrame({'div': [part_key(i) for i in parts['div']],
+                           'season': [part_key(i) for i in parts['season']]}).drop_duplicates()
+        res = pd.merge(res, pk, on=['div', 'season'], how='inner')
+    if n_season is not None:
+        pk = res[['div', 'season']].drop_duplicates().groupby('div').tail(n_season)
+        res = pd.merge(res, pk, on=['div', 'season'], how='inner')
+    return res
+
+
+def read_partitions(name, div=None, season=None, field=None, columns=None, n_season=None, parts=None,
+                    filters=None, group=None, path=fp_data):
+    """Reads a dataset that is partitioned by div and season. Only the partitions that match
+    the div & season filters are opened and only the requested fields and columns are read.
+
+    Parameters:
+    -----------
+        name:       str
+                    the name of the dataset (eg. 'source_core')
+        div:        list
+                    optional, the divisions to retrieve (eg. ['E0', 'Brazil Serie A'])
+        season:     list
+                    optional, the seasons to retrieve (eg. [2019, 2020])
+        field:      list
+                    optional, the fields to retrieve (eg. ['FTR', 'FTHG', 'FTAG'])
+        columns:    list
+                    optional, the columns to retrieve (defaults to all, columns that are not available
+                    in a partition are skipped)
+        n_season:   int
+                    optional, only the latest n seasons of each division
+        parts:      pandas dataframe
+                    optional, the exact partitions to retrieve with columns div, season
+        filters:    list
+                    optional, additional row filters passed on to the parquet reader
+                    (eg. [('date', '=', pd.Timestamp('2050-01-01'))])
+        group:      list
+                    optional, the groups to retrieve if the partitions are split into a file per group
+                    (see `write_partitions`), all other files are not opened (defaults to all groups)
+        path:       str
+                    the root path of the data
+
+    Example:
+    --------
+    x = read_partitions('source_core', div=['E0'], season=[2019, 2020], field=['FTR', 'FTHG', 'FTAG'],
+                        group=['results'])
+
+    """
+    with lock_dataset(name, path=path):
+        # partitions that are not split into groups hold all groups
+        fn = '*.parquet' if group is None else ['part.parquet'] + [i + '.parquet' for i in group]
+        prt = list_partitions(name=name, div=div, season=season, n_season=n_season, parts=parts, path=path,
+                              file=fn)
+        fl = [] if filters is None else list(filters)
+        if field is not None:
+            fl.append(('field', 'in', list(field)))
+            if name in catalog_names:
+                prt = skip_partitions(prt, name=name, field=field, path=path)
+        fl = fl if len(fl) > 0 else None
+
+        res = [pq.read_table(p, columns=avail_columns(p, columns), filters=fl).to_pandas() for p in prt['file']]
+        if len(res) == 0:
+            # no partition matches, so keep the schema of the dataset if there is one
+            prt = list_partitions(name=name, path=path)
+            if len(prt) == 0:
+                return pd.DataFrame(columns=columns)
+            res = [pq.read_schema(prt['file'].iloc[0]).empty_table().to_pandas()]
+            res = [res[0] if columns is None else res[0][avail_columns(prt['file'].iloc[0], columns)]]
+        # keep the schema even if no rows match
+        res = [i for i in res if len(i) > 0] or res[:1]
+        cat = [k for k in res[0].columns if res[0][k].dtype.name == 'category']
+        res = pd.concat(res, axis=0, sort=False, ignore_index=True)
+        # categories differ by partition
+        for k in cat:
+            res[k] = res[k].astype('category')
+        return res
+
+
+def avail_columns(file, columns):
+    """Returns the columns that are available in a stored partition (all if columns is None)."""
+    if columns is None:
+        return None
+    nm = pq.read_schema(file).names
+    return [i for i in columns if i in nm]
+
+
+def write_partitions(data, name, path=fp_data, overwrite=False, group=None):
+    """Writes a dataset partitioned by div and season. Only partitions present in `data` are
+    (re-)written, all other partitions are left untouched.
+
+    Parameters:
+    -----------
+        data:       pandas dataframe
+                    a dataframe with at least columns div, season
+        name:       str
+                    the name of the dataset (eg. 'source_core')
+        path:       str
+                    the root path of the data
+        overwrite:  boolean, default False
+                    whether to delete the entire dataset before writing
+        group:      array-like
+                    optional, the group of each row of `data` (eg. the field group), each partition is
+                    then split into a file per group (<group>.parquet) so that readers can open only
+                    the groups they need
+
+    Details:
+    --------
+        Note that the partitions in `data` replace the existing partitions as a whole, so
+        pass all data of a partition when updating it. Object columns are stored as strings and
+        categorical columns are stored dictionary-encoded. Files are never modified in place
+        (see `create_snapshot`).
+
+    Returns:
+    --------
+        A dataframe with the partitions written (columns div, season).
+
+    """
+    with lock_dataset(name, shared=False, path=path):
+        root = path + 'pro_data/' + name + '/'
+        if overwrite is True and os.path.isdir(root):
+            shutil.rmtree(root)
+
+        grp = np.full(len(data), 'part') if group is None else np.asarray(group, dtype=object)
+        l = []
+        for (d, s), ix in data.groupby(['div', 'season'], sort=False, observed=True).indices.items():
+            fp = root + part_key(d) + '/' + part_key(s) + '/'
+            os.makedirs(fp, exist_ok=True)
+            fl = []
+            for g in pd.unique(grp[ix]):
+                x = data.iloc[ix[grp[ix] == g]]
+                # replace rather than overwrite the file so that snapshots keep the previous version
+                pq.write_table(pa.Table.from_pandas(conform_types(x), preserve_index=False),
+                               fp + g + '.parquet.tmp', compression=get_codec(name)[1])
+                os.replace(fp + g + '.parquet.tmp', fp + g + '.parquet')
+                fl.append(g + '.parquet')
+            # groups that are no longer present in the partition
+            for f in fnmatch.filter(os.listdir(fp), '*.parquet'):
+                if f not in fl:
+                    os.remove(fp + f)
+            l.append([d, s])
+
+        if name in catalog_names:
+            update_catalog(name, stats=comp_catalog_stats(data),
+                           drop='all' if overwrite is True else data[['div', 'season']], path=path)
+        bump_version(name, path=path)
+        return pd.DataFrame(l, columns=['div', 'season'])
+
+
+def conform_types(data):
+    """Makes sure that object columns hold a single type so that they can be stored (mixed
+    values are stored as strings, missing values are kept). Unused categories are dropped."""
+    data = data.copy()
+    for k in data.columns:
+        if data[k].dtype.name == 'object':
+            data[k] = data[k].where(data[k].isna(), data[k].astype(str))
+        elif data[k].dtype.name == 'category':
+            data[k] = data[k].cat.remove_unused_categories()
+    return data
+
+
+def delete_partitions(parts, name, path=fp_data, file='*.parquet'):
+    """Deletes partitions of a dataset.
+
+    Parameters:
+    -----------
+        parts:  pandas dataframe
+                the partitions to delete with columns div, season (all partitions if None)
+        name:   str
+                the name of the dataset (eg. 'source_core')
+        path:   str
+                the root path of the data
+        file:   str, default *.parquet
+                the file(s) that each partition holds (see `list_partitions`)
+
+    """
+    with lock_dataset(name, shared=False, path=path):
+        for p in list_partitions(name=name, parts=parts, path=path, file=file)['file'].map(os.path.dirname).unique():
+            shutil.rmtree(p)
+        if name in catalog_names:
+            update_catalog(name, drop='all' if parts is None else parts[['div', 'season']], path=path)
+        bump_version(name, path=path)
+
+
+def comp_catalog_stats(data):
+    """Computes the number of rows & non-missing values of each field by div & season of a long
+    dataset (columns div, season, field, val & optionally code) for the catalog."""
+    ok = data['val'].notna()
+    if 'code' in data.columns:
+        ok = ok | data['code'].notna()
+    res = data[['div', 'season', 'field']].assign(n=1, n_valid=ok.values.astype('int64'))
+    res = res.groupby(['div', 'season', 'field'], observed=True, sort=True)[['n', 'n_valid']].sum().reset_index()
+    return res
+
+
+def read_catalog(name=None, div=None, season=None, field=None, path=fp_data):
+    """Reads the catalog of the stored fields, i.e. which fields exist for each div & season of a
+    dataset with their number of rows & non-missing values, without opening any of the datasets.
+
+    Parameters:
+    -----------
+        name:       str
+                    optional, the dataset (eg. 'source_core' or 'flib/e0')
+        div:        list
+                    optional, the divisions to retrieve (eg. ['E0'])
+        season:     list
+                    optional, the seasons to retrieve (eg. [2019, 2020])
+        field:      list
+                    optional, the fields to retrieve (eg. ['FTR', 'odds_win'])
+        path:       str
+                    the root path of the data
+
+    Details:
+    --------
+        The catalog is updated whenever a dataset in `catalog_names` is written or deleted and by
+        `fooStrat.processing.update_flib` for the factor libraries. Division & season are the
+        partition keys (see `part_key`).
+
+    Returns:
+    --------
+        A dataframe with columns dataset, div, season, field, n (rows), n_valid (non-missing values)
+        and ratio (share of non-missing values).
+
+    Example:
+    --------
+    read_catalog('source_core', div=['E0'], field=['odds_win'])
+
+    """
+    fp = path + 'pro_data/catalog.parquet'
+    with lock_dataset('catalog', path=path):
+        res = pq.read_table(fp).to_pandas() if os.path.isfile(fp) else pd.DataFrame(columns=catalog_cols)
+    if name is not None:
+        res = res[res['dataset'] == name]
+    if div is not None:
+        res = res[res['div'].isin([part_key(i) for i in div])]
+    if season is not None:
+        res = res[res['season'].isin([part_key(i) for i in season])]
+    if field is not None:
+        res = res[res['field'].isin(list(field))]
+    res = res.reset_index(drop=True)
+    res['ratio'] = (res['n_valid'] / res['n']).astype('float64')
+    return res
+
+
+def update_catalog(name, stats=None, drop=None, add=False, path=fp_data):
+    """Updates the entries of a dataset in the catalog (see `read_catalog`).
+
+    Parameters:
+    -----------
+        name:   str
+                the dataset (eg. 'source_core')
+        stats:  pandas dataframe
+                optional, the new entries with columns div, season, field, n, n_valid (see
+                `comp_catalog_stats`), existing entries for the same div, season & field are replaced
+        drop:   pandas dataframe or str
+                optional, the entries to delete given by any of the columns div, season, field (eg.
+                deleted partitions) or 'all' to delete all entries of the dataset
+        add:    boolean, default False
+                whether to add the counts of `stats` to the existing entries rather than replacing
+                them (eg. for data that is appended, see `write_segment`)
+        path:   str
+                the root path of the data
+
+    """
+    fp = path + 'pro_data/catalog.parquet'
+    with lock_dataset('catalog', shared=False, path=path):
+        res = read_catalog(path=path)[catalog_cols]
+        new = pd.DataFrame(columns=catalog_cols) if stats is None else stats.assign(dataset=name)[catalog_cols]
+        new = new.assign(div=[part_key(i) for i in new['div']], season=[part_key(i) for i in new['season']],
+                         field=new['field'].astype(str))
+        if add is True:
+            new = pd.merge(new, res.loc[res['dataset'] == name, ['div', 'season', 'field', 'n', 'n_valid']],
+                           on=['div', 'season', 'field'], how='left', suffixes=('', '_old'))
+            for k in ['n', 'n_valid']:
+                new[k] = new[k] + new[k + '_old'].fillna(0)
+            new = new[catalog_cols]
+        ds = res['dataset'] == name
+        if isinstance(drop, str) and drop == 'all':
+            res = res[~ds]
+        else:
+            for x in ([] if drop is None else [drop]) + [new[['div', 'season', 'field']]]:
+                if len(x) == 0:
+                    continue
+                on = list(x.columns)
+                x = x.assign(**{k: [str(i) if k == 'field' else part_key(i) for i in x[k]] for k in on})
+                x = x.drop_duplicates().assign(tbd=True)
+                tbd = pd.merge(res[on], x, on=on, how='left')['tbd'].eq(True).values
+                res = res[~(ds.values & tbd)]
+                ds = res['dataset'] == name
+        res = pd.concat([res, new], axis=0, sort=False, ignore_index=True)
+        res = res.sort_values(['dataset', 'div', 'season', 'field']).reset_index(drop=True)
+        res[['n', 'n_valid']] = res[['n', 'n_valid']].astype('int64')
+        pq.write_table(pa.Table.from_pandas(res, preserve_index=False), fp + '.tmp')
+        os.replace(fp + '.tmp', fp)
+        bump_version('catalog', path=path)
+
+
+def skip_partitions(prt, name, field, path=fp_data):
+    """Removes the partitions (see `list_partitions`) that hold none of the fields according to the
+    catalog. Partitions that are not in the catalog are kept."""
+    cat = read_catalog(name, path=path)
+    if len(cat) == 0:
+        return prt
+    hit = cat.loc[cat['field'].isin(list(field)) & (cat['n_valid'] > 0), ['div', 'season']]
+    tbd = pd.merge(cat[['div', 'season']].drop_duplicates(), hit.drop_duplicates().assign(hit=True),
+                   on=['div', 'season'], how='left')
+    tbd = tbd.loc[tbd['hit'].ne(True), ['div', 'season']].assign(tbd=True)
+    tbd = pd.merge(prt[['div', 'season']], tbd, on=['div', 'season'], how='left')['tbd'].eq(True).values
+    return prt[~tbd].reset_index(drop=True)
+
+
+def read_frame(name, path=fp_data):
+    """Reads a single table (eg. 'match_odds') stored by `write_frame` under a shared lock (see
+    `lock_dataset`). The table is read in the configured format or, if it has not been rewritten
+    since the configuration changed, in the format it was stored in."""
+    fp = path + 'pro_data/' + name
+    fm = get_codec(name)[0]
+    with lock_dataset(name, path=path):
+        for k in [fm] + [i for i in frame_ext if i != fm]:
+            fn = fp + frame_ext[k]
+            if not os.path.isfile(fn):
+                continue
+            if k == 'pickle':
+                return pd.read_pickle(fn)
+            elif k == 'parquet':
+                return pq.read_table(fn).to_pandas()
+            else:
+                return feather.read_feather(fn)
+    raise FileNotFoundError("Table " + name + " does not exist.")
+
+
+def write_frame(data, name, path=fp_data):
+    """Stores a single table (eg. 'match_odds' in `pro_data/match_odds.feather`) in the format and
+    with the compression codec configured in `fooStrat.constants.store_codec`.
+
+    Details:
+    --------
+        The file is written to a temporary file first and then renamed under an exclusive lock, so
+        readers never see a partially written file. Files of the table in other formats are
+        deleted. Note that the index is only kept by pickle.
+
+    """
+    fm, cd = get_codec(name)
+    fp = path + 'pro_data/' + name
+    fn = fp + frame_ext[fm]
+    with lock_dataset(name, shared=False, path=path):
+        if fm == 'pickle':
+            data.to_pickle(fn + '.tmp', compression=None)
+        elif fm == 'parquet':
+            pq.write_table(pa.Table.from_pandas(data, preserve_index=False), fn + '.tmp', compression=cd)
+        else:
+            feather.write_feather(data.reset_index(drop=True), fn + '.tmp',
+                                  compression='uncompressed' if cd == 'none' else cd)
+        os.replace(fn + '.tmp', fn)
+        for k in frame_ext.values():
+            if fp + k != fn and os.path.isfile(fp + k):
+                os.remove(fp + k)
+        bump_version(name, path=path)
+
+
+def list_segments(name, part=None, path=fp_data):
+    """Lists the append segments of a segmented dataset in the order they were written.
+
+    Parameters:
+    -----------
+        name:   str
+                the name of the dataset (eg. 'flib')
+        part:   list
+                optional, the partitions to retrieve (eg. ['E0', 'Brazil Serie A'])
+        path:   str
+                the root path of the data
+
+    Returns:
+    --------
+        A dataframe with columns part, seq, size, file where part is the partition key.
+
+    """
+    root = path + 'pro_data/' + name + '/'
+    cols = ['part', 'seq', 'size', 'file']
+    if not os.path.isdir(root):
+        return pd.DataFrame(columns=cols)
+
+    part_ed = None if part is None else [part_key(i) for i in part]
+    l = []
+    for d in sorted(os.listdir(root)):
+        if not os.path.isdir(root + d) or (part_ed is not None and d not in part_ed):
+            continue
+        for f in sorted(os.listdir(root + d)):
+            if f.startswith('seg_') and f.endswith('.parquet'):
+                fp = root + d + '/' + f
+                l.append([d, int(f[4:-8]), os.path.getsize(fp), fp])
+
+    return pd.DataFrame(l, columns=cols).sort_values(['part', 'seq']).reset_index(drop=True)
+
+
+def write_segment(data, name, part, path=fp_data):
+    """Appends an immutable segment to a partition of a segmented dataset. Existing segments
+    are never modified, so the cost of a write only depends on the size of `data`.
+
+    Parameters:
+    -----------
+        data:   pandas dataframe
+                the rows to append
+        name:   str
+                the name of the dataset (eg. 'flib')
+        part:   str
+                the partition to append to (eg. 'E0')
+        path:   str
+                the root path of the data
+
+    Details:
+    --------
+        The segment is written to a temporary file first and then renamed, so readers never
+        see a partially written segment.
+
+    Returns:
+    --------
+        The file of the new segment.
+
+    """
+    with lock_dataset(name, shared=False, path=path):
+        fp = path + 'pro_data/' + name + '/' + part_key(part) + '/'
+        os.makedirs(fp, exist_ok=True)
+        seg = list_segments(name=name, part=[part], path=path)
+        seq = 1 if len(seg) == 0 else seg['seq'].max() + 1
+        fn = fp + 'seg_' + str(seq).zfill(6) + '.parquet'
+        pq.write_table(pa.Table.from_pandas(conform_types(data), preserve_index=False), fn + '.tmp',
+                       compression=get_codec(name)[1])
+        os.replace(fn + '.tmp', fn)
+        bump_version(name, path=path)
+        return fn
+
+
+def read_segments(name, keys, part=None, columns=None, filters=None, path=fp_data):
+    """Reads a segmented dataset. Rows that appear in several segments are resolved by
+    newest-wins on `keys`.
+
+    Parameters:
+    -----------
+        name:       str
+                    the name of the dataset (eg. 'flib')
+        keys:       list
+                    the columns that identify a row (eg. ['div', 'season', 'team', 'date', 'field'])
+        part:       list
+                    optional, the partitions to retrieve (eg. ['E0', 'Brazil Serie A'])
+        columns:    list
+                    optional, the columns to retrieve (defaults to all, keys are always read)
+        filters:    list
+                    optional, row filters passed on to the parquet reader
+                    (eg. [('field', 'in', ['home', 'form_all'])])
+        path:       str
+                    the root path of the data
+
+    """
+    with lock_dataset(name, path=path):
+        seg = list_segments(name=name, part=part, path=path)
+        cols = None if columns is None else keys + [i for i in columns if i not in keys]
+        res = [pq.read_table(p, columns=cols, filters=filters).to_pandas() for p in seg['file']]
+        if len(res) == 0:
+            return pd.DataFrame(columns=cols)
+        res = [i for i in res if len(i) > 0] or res[:1]
+        cat = [k for k in res[0].columns if res[0][k].dtype.name == 'category']
+        res = pd.concat(res, axis=0, sort=False, ignore_index=True)
+        res = res.drop_duplicates(subset=keys, keep='last').reset_index(drop=True)
+        for k in cat:
+            res[k] = res[k].astype('category')
+        return res
+
+
+def compact_segments(name, keys, part=None, min_segments=4, full=False, path=fp_data):
+    """Merges the append segments of a segmented dataset.
+
+    Parameters:
+    -----------
+        name:           str
+                        the name of the dataset (eg. 'flib')
+        keys:           list
+                        the columns that identify a row (newest-wins)
+        part:           list
+                        optional, the partitions to compact (defaults to all)
+        min_segments:   int, default 4
+                        only partitions with at least that many segments are compacted
+        full:           boolean, default False
+                        whether to always merge all segments of a partition
+
+    Details:
+    --------
+        Unless `full` is True, only the segments written after the oldest (base) segment are
+        merged as long as they are smaller than the base segment, so that the (large) history
+        is only rewritten once the appended data has grown to a comparable size. The merged
+        segment is written before the merged segments are deleted, so an interrupted compaction
+        never loses data.
+
+    Returns:
+    --------
+        A list with the partitions that were compacted.
+
+    """
+    with lock_dataset(name, shared=False, path=path):
+        seg = list_segments(name=name, part=part, path=path)
+        l = []
+        for k, x in seg.groupby('part', sort=True):
+            if len(x) < max(min_segments, 2):
+                continue
+            if full is False and x['size'].iloc[1:].sum() < x['size'].iloc[0]:
+                x = x.iloc[1:]
+            if len(x) < 2:
+                continue
+            tmp = [pq.read_table(p).to_pandas() for p in x['file']]
+            tmp = pd.concat(tmp, axis=0, sort=False, ignore_index=True)
+            tmp = tmp.drop_duplicates(subset=keys, keep='last').reset_index(drop=True)
+            write_segment(tmp, name=name, part=k, path=path)
+            for p in x['file']:
+                os.remove(p)
+            l.append(k)
+        if len(l) > 0:
+            bump_version(name, path=path)
+        return l
+
+
+def replace_segments(data, name, part, path=fp_data):
+    """Replaces all segments of a partition of a segmented dataset by a single segment with
+    `data`. The new segment is written before the existing segments are deleted."""
+    with lock_dataset(name, shared=False, path=path):
+        seg = list_segments(name=name, part=[part], path=path)
+        write_segment(data, name=name, part=part, path=path)
+        for p in seg['file']:
+            os.remove(p)
+        bump_version(name, path=path)
+
+
+def delete_segments(name, part=None, path=fp_data):
+    """Deletes partitions of a segmented dataset with all their segments (defaults to all)."""
+    with lock_dataset(name, shared=False, path=path):
+        for p in list_segments(name=name, part=part, path=path)['file'].map(os.path.dirname).unique():
+            shutil.rmtree(p)
+        bump_version(name, path=path)
+
+
+def write_cube(values, axes, name, path=fp_data):
+    """Stores a dense array together with its axis indexes so that it can be memory-mapped.
+
+    Parameters:
+    -----------
+        values: numpy array
+                the array to store (eg. a float32 date x team x feature cube)
+        axes:   dict
+                the sorted index of each axis and any other array aligned with an axis
+                (eg. {'date': .., 'team': .., 'feature': ..})
+        name:   str
+                the name of the cube (eg. 'cube/e0')
+        path:   str
+                the root path of the data
+
+    Details:
+    --------
+        The cube is written to a temporary directory first which then replaces the existing
+        cube, so readers never see a partially written cube.
+
+    """
+    with lock_dataset(name, shared=False, path=path):
+        root = path + 'pro_data/' + name
+        tmp = root + '.tmp/'
+        if os.path.isdir(tmp):
+            shutil.rmtree(tmp)
+        os.makedirs(tmp)
+        mm = np.lib.format.open_memmap(tmp + 'values.npy', mode='w+', dtype=values.dtype, shape=values.shape)
+        mm[:] = values
+        mm.flush()
+        del mm
+        for k, v in axes.items():
+            v = np.asarray(v)
+            np.save(tmp + 'axis_' + k + '.npy', v.astype(str) if v.dtype.kind == 'O' else v)
+        if os.path.isdir(root):
+            shutil.rmtree(root)
+        os.replace(tmp, root)
+        bump_version(name, path=path)
+
+
+def open_cube(name, path=fp_data, mode='r'):
+    """Opens a stored cube (see `write_cube`) memory-mapped.
+
+    Parameters:
+    -----------
+        name:   str
+                the name of the cube (eg. 'cube/e0')
+        path:   str
+                the root path of the data
+        mode:   str, default 'r'
+                the memory-map mode (eg. 'r' for read-only or 'c' for copy-on-write)
+
+    Returns:
+    --------
+        The memory-mapped values and a dict with the axis indexes. Slices of the values are
+        views on the file, so several processes opening the same cube share one copy of the
+        data in memory.
+
+    """
+    with lock_dataset(name, path=path):
+        root = path + 'pro_data/' + name + '/'
+        values = np.load(root + 'values.npy', mmap_mode=mode)
+        axes = {f[5:-4]: np.load(root + f) for f in sorted(os.listdir(root)) if f.startswith('axis_')}
+        return values, axes
+
+
+def create_snapshot(name, datasets=None, path=fp_data, overwrite=False):
+    """Creates a named snapshot of stored datasets which can be read like the live data
+    (see `snapshot_path`).
+
+    Parameters:
+    -----------
+        name:       str
+                    the name of the snapshot (eg. 'backtest_2021_01')
+        datasets:   list
+                    optional, the datasets and files in pro_data to include (defaults to
+                    source_core, match_table, results, team_season, odds_cube, standings,
+                    flib, catalog, key_dict, match_odds)
+        path:       str
+                    the root path of the data
+        overwrite:  boolean, default False
+                    whether to replace an existing snapshot with the same name
+
+    Details:
+    --------
+        The files of partitioned and segmented datasets are hard-linked, so a snapshot does not
+        copy any data and shares all unchanged partitions with the live store. This works since
+        the store never modifies a file in place but writes a new file and renames it. Note that
+        hard links require the snapshot and the live data to be on the same file system, otherwise
+        files are copied.
+
+    """
+    datasets = ['source_core', 'match_table', 'results', 'team_season', 'odds_cube', 'standings', 'flib',
+                'catalog', 'key_dict', 'match_odds'] if datasets is None else datasets
+    root = path + 'snapshots/' + name + '/pro_data/'
+    if os.path.isdir(path + 'snapshots/' + name):
+        if overwrite is False:
+            raise ValueError("Snapshot " + name + " already exists.")
+        shutil.rmtree(path + 'snapshots/' + name)
+
+    for k in datasets:
+        # single tables can be given with their extension (eg. 'catalog.parquet')
+        k = os.path.splitext(k)[0] if os.path.splitext(k)[1] in frame_ext.values() else k
+        # datasets written by parts (eg. the factor library of each league) are copied part by part
+        for j in sub_datasets(k, path=path):
+            src = path + 'pro_data/' + j
+            with lock_dataset(j, path=path):
+                # single tables (see `write_frame`) & the version, which identifies the data of the
+                # snapshot in the cache (see `fooStrat.cache.read_cached`)
+                for i in [''] + list(frame_ext.values()) + ['.version']:
+                    if os.path.isfile(src + i):
+                        os.makedirs(os.path.dirname(root + j + i), exist_ok=True)
+                        link_file(src + i, root + j + i)
+                if os.path.isdir(src):
+                    shutil.copytree(src, root + j, copy_function=link_file,
+                                    ignore=shutil.ignore_patterns('*.tmp', '*.lock'))
+
+
+def link_file(src, dst):
+    """Hard-links a file (copies it if hard links are not supported)."""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def snapshot_path(name, path=fp_data):
+    """The root path of a snapshot. Pass it as `path` to any reader to read the snapshot
+    instead of the live data (eg. `read_partitions('match_table', path=snapshot_path('bt'))`)."""
+    res = path + 'snapshots/' + name + '/'
+    if not os.path.isdir(res):
+        raise ValueError("Snapshot " + name + " does not exist.")
+    return res
+
+
+def list_snapshots(path=fp_data):
+    """Lists the names of all snapshots."""
+    root = path + 'snapshots/'
+    return sorted(os.listdir(root)) if os.path.isdir(root) else []
+
+
+def delete_snapshot(name, path=fp_data):
+    """Deletes a snapshot (the live data is not affected)."""
+    shutil.rmtree(snapshot_path(name, path=path))
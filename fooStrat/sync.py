@@ -0,0 +1,232 @@
+import os
+import json
+import time
+import shutil
+import threading
+from fooStrat.constants import fp_data, fp_cloud
+from fooStrat.store import lock_dataset, dataset_version, sub_datasets
+
+# folders that are mirrored between the local working directory and the cloud folder
+sync_folders = ['src_data', 'pro_data', 'log_data', 'res_data']
+
+
+def list_files(root, folders=None):
+    """Lists all files below the given folders of a root path.
+
+    Returns:
+    --------
+        A dict with the relative path of each file and its modification time & size.
+
+    """
+    folders = sync_folders if folders is None else folders
+    res = {}
+    for k in folders:
+        for d, _, fs in os.walk(root + k):
+            for f in fs:
+                if f.endswith('.tmp') or f.endswith('.lock'):
+                    continue
+                fp = os.path.join(d, f)
+                st = os.stat(fp)
+                res[os.path.relpath(fp, root)] = [st.st_mtime, st.st_size]
+    return res
+
+
+def copy_atomic(src, dst):
+    """Copies a file so that the destination is replaced in a single step (via a temporary
+    file in the destination folder and a rename). The modification time is kept."""
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    shutil.copy2(src, dst + '.sync.tmp')
+    os.replace(dst + '.sync.tmp', dst)
+
+
+def is_stale(x, y):
+    """Whether file info y (modification time, size) is out of date compared to file info x."""
+    return y is None or x[0] > y[0] + 1 or (x[0] >= y[0] and x[1] != y[1])
+
+
+def list_datasets(path):
+    """The datasets in pro_data, each of which is pushed under its own lock (see `push`)."""
+    root = path + 'pro_data/'
+    if not os.path.isdir(root):
+        return []
+    nm = sorted({i if os.path.isdir(root + i) else i.split('.', 1)[0] for i in os.listdir(root)})
+    return [j for k in nm if k != '' for j in sub_datasets(k, path=path)]
+
+
+def in_dataset(x, name):
+    """Whether a file (relative path) belongs to a dataset in pro_data (eg. 'pro_data/flib/e0/seg_000001.parquet'
+    or 'pro_data/flib/e0.version' to 'flib/e0')."""
+    return x.startswith('pro_data/' + name + '/') or x.startswith('pro_data/' + name + '.')
+
+
+def list_dataset(root, name):
+    """Lists the files of a dataset in pro_data (see `list_files`)."""
+    res = list_files(root, folders=['pro_data/' + name])
+    fp = os.path.dirname(root + 'pro_data/' + name)
+    for f in os.listdir(fp):
+        x = os.path.relpath(os.path.join(fp, f), root)
+        if in_dataset(x, name) and os.path.isfile(root + x) and not (f.endswith('.tmp') or f.endswith('.lock')):
+            st = os.stat(root + x)
+            res[x] = [st.st_mtime, st.st_size]
+    return res
+
+
+def read_manifest(path_local):
+    """Reads the files mirrored so far and the versions of the datasets they belong to (see `push`)."""
+    fm = path_local + '.sync_manifest.json'
+    if not os.path.isfile(fm):
+        return {'files': {}, 'versions': {}}
+    with open(fm) as f:
+        mf = json.load(f)
+    # manifests of earlier releases only hold the files
+    return mf if 'files' in mf else {'files': mf, 'versions': {}}
+
+
+def write_manifest(mf, path_local):
+    """Stores the files mirrored so far (see `push`)."""
+    fm = path_local + '.sync_manifest.json'
+    os.makedirs(path_local, exist_ok=True)
+    with open(fm + '.tmp', 'w') as f:
+        json.dump(mf, f)
+    os.replace(fm + '.tmp', fm)
+
+
+def push_files(loc, drop, mf, path_local, path_cloud, t0):
+    """Copies the files in `loc` that are newer locally and settled (modified before `t0`) to the cloud
+    folder and deletes the files in `drop` that are no longer in `loc` from it (see `push`). The manifest
+    is updated in place.
+
+    Returns:
+    --------
+        The number of files copied, deleted and not yet settled.
+
+    """
+    n_cp = n_rm = n_wt = 0
+    for k, v in loc.items():
+        if not is_stale(v, mf['files'].get(k)):
+            continue
+        if v[0] > t0:
+            n_wt += 1
+            continue
+        copy_atomic(path_local + k, path_cloud + k)
+        mf['files'][k] = v
+        n_cp += 1
+    for k in [i for i in drop if i not in loc]:
+        if os.path.isfile(path_cloud + k):
+            os.remove(path_cloud + k)
+        del mf['files'][k]
+        n_rm += 1
+    return n_cp, n_rm, n_wt
+
+
+def push(path_local=fp_data, path_cloud=fp_cloud, folders=None, settle=5):
+    """Mirrors finished files from the local working directory to the cloud folder.
+
+    Parameters:
+    -----------
+        path_local: str
+                    the local working directory
+        path_cloud: str
+                    the cloud folder
+        folders:    list
+                    optional, the folders to mirror (defaults to `sync_folders`)
+        settle:     int, default 5
+                    files that were modified within the last `settle` seconds are considered
+                    to be in progress and are mirrored with the next push
+
+    Details:
+    --------
+        Only files that are newer locally are copied, each with an atomic rename so that the cloud
+        folder never holds a partially written file. Files that were mirrored before and have
+        since been deleted locally (eg. replaced partitions or compacted segments) are deleted
+        from the cloud folder. The datasets in pro_data are pushed one by one under a shared lock
+        (see `fooStrat.store.lock_dataset`), so a dataset is never pushed while it is being written.
+        The mirrored files and the version of each dataset that was pushed in full are recorded in
+        `.sync_manifest.json` of the local working directory.
+
+    Returns:
+    --------
+        The number of files copied and deleted.
+
+    """
+    if path_local == path_cloud:
+        return 0, 0
+    folders = sync_folders if folders is None else folders
+    mf = read_manifest(path_local)
+    t0 = time.time() - settle
+    n_cp = n_rm = 0
+    seen = set()
+    names = list_datasets(path_local) if 'pro_data' in folders else []
+    for j in names:
+        with lock_dataset(j, path=path_local):
+            loc = list_dataset(path_local, j)
+            n = push_files(loc, [k for k in mf['files'] if in_dataset(k, j)], mf, path_local, path_cloud, t0)
+            if n[2] == 0:
+                mf['versions'][j] = dataset_version(j, path=path_local)
+        n_cp, n_rm = n_cp + n[0], n_rm + n[1]
+        seen.update(loc)
+
+    # all other files (including the files of deleted datasets)
+    loc = list_files(path_local, folders=[i for i in folders if i != 'pro_data'])
+    drop = [k for k in mf['files'] if k.split('/', 1)[0] in folders and k not in seen]
+    n = push_files(loc, drop, mf, path_local, path_cloud, t0)
+    mf['versions'] = {k: v for k, v in mf['versions'].items() if k in names}
+
+    write_manifest(mf, path_local)
+    return n_cp + n[0], n_rm + n[1]
+
+
+def fetch(path_local=fp_data, path_cloud=fp_cloud, folders=None):
+    """Copies files from the cloud folder to the local working directory if the local copy is
+    missing or older (see `push`).
+
+    Returns:
+    --------
+        The number of files copied.
+
+    """
+    if path_local == path_cloud:
+        return 0
+    mf = read_manifest(path_local)
+    loc = list_files(path_local, folders=folders)
+    n_cp = 0
+    for k, v in list_files(path_cloud, folders=folders).items():
+        if is_stale(v, loc.get(k)):
+            copy_atomic(path_cloud + k, path_local + k)
+            mf['files'][k] = v
+            n_cp += 1
+
+    write_manifest(mf, path_local)
+    return n_cp
+
+
+def start_sync(interval=60, path_local=fp_data, path_cloud=fp_cloud, folders=None, settle=5):
+    """Starts a background thread that pushes finished files to the cloud folder every
+    `interval` seconds (see `push`).
+
+    Returns:
+    --------
+        A function that stops the background syncer after a final push of all files.
+
+    Example:
+    --------
+    stop_sync = start_sync(interval=60)
+    ... # run the pipeline on the local working directory
+    stop_sync()
+
+    """
+    ev = threading.Event()
+
+    def run():
+        while not ev.wait(interval):
+            push(path_local=path_local, path_cloud=path_cloud, folders=folders, settle=settle)
+
+    th = threading.Thread(target=run, name='fooStrat-sync', daemon=True)
+    th.start()
+
+    def stop():
+        ev.set()
+        th.join()
+        return push(path_local=path_local, path_cloud=path_cloud, folders=folders, settle=0)
+
+    return stop
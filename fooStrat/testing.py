@@ -0,0 +1,175 @@
+import os
+import time
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pyarrow.feather as feather
+
+# formats & codecs compared by `bench_codecs`
+bench_formats = [['pickle', 'none'],
+                 ['parquet', 'none'],
+                 ['parquet', 'snappy'],
+                 ['parquet', 'lz4'],
+                 ['parquet', 'zstd'],
+                 ['feather', 'none'],
+                 ['feather', 'lz4'],
+                 ['feather', 'zstd']]
+
+
+def con_synth_source(n_div=10, n_season=10, n_team=20, n_field=60, seed=0):
+    """Constructs synthetic source data that resembles `source_core` (double round robin leagues,
+    integer goals, odds with two decimals).
+
+    Parameters:
+    -----------
+        n_div:      int
+                    the number of divisions
+        n_season:   int
+                    the number of seasons per division
+        n_team:     int
+                    the number of teams per division
+        n_field:    int
+                    the number of fields per game (results, statistics & odds)
+        seed:       int
+                    the random seed
+
+    Returns:
+    --------
+        A dataframe with columns div, season, date, home_team, away_team, field, val, code.
+
+    """
+    rng = np.random.default_rng(seed)
+    team = np.array(['team_' + str(i) for i in range(n_div * n_team)])
+    l = []
+    for d in range(n_div):
+        tm = team[d * n_team:(d + 1) * n_team]
+        ht, at = [i.ravel() for i in np.meshgrid(tm, tm)]
+        ht, at = ht[ht != at], at[ht != at]
+        for s in range(n_season):
+            l.append(pd.DataFrame({'div': 'div_' + str(d),
+                                   'season': 2010 + s,
+                                   'date': pd.Timestamp(str(2010 + s) + '-08-01') +
+                                           pd.to_timedelta(rng.integers(0, 280, len(ht)), unit='D'),
+                                   'home_team': ht,
+                                   'away_team': at}))
+    games = pd.concat(l, axis=0, ignore_index=True)
+
+    n = len(games)
+    fields = ['FTHG', 'FTAG', 'HTHG', 'HTAG', 'HS', 'AS', 'HST', 'AST', 'HC', 'AC'] + \
+             ['odds_' + str(i) for i in range(max(n_field - 11, 0))]
+    res = games.loc[np.repeat(np.arange(n), len(fields))].reset_index(drop=True)
+    res['field'] = np.tile(fields, n)
+    val = np.where(res['field'].str.startswith('odds').values,
+                   np.round(rng.uniform(1.05, 12, len(res)), 2),
+                   rng.poisson(3, len(res)))
+    res['val'] = val.astype('float32')
+    res['code'] = None
+    # full time result
+    ftr = games.assign(field='FTR', val=np.nan, code=rng.choice(['H', 'D', 'A'], n))
+    res = pd.concat([res, ftr], axis=0, sort=False, ignore_index=True)
+    res = res.sort_values(['date', 'div', 'season']).reset_index(drop=True)
+    for k in ['div', 'home_team', 'away_team', 'field', 'code']:
+        res[k] = res[k].astype('category')
+    res['val'] = res['val'].astype('float32')
+    return res
+
+
+def con_synth_flib(data, n_feature=30, seed=0):
+    """Constructs a synthetic factor library (z-scores for each team, date & feature) for the
+    games of synthetic source data (see `con_synth_source`).
+
+    Returns:
+    --------
+        A dataframe with columns div, season, team, date, field, val.
+
+    """
+    rng = np.random.default_rng(seed)
+    gm = data[['div', 'season', 'date', 'home_team', 'away_team']].drop_duplicates()
+    tg = pd.concat([gm[['div', 'season', 'date', 'home_team']].rename(columns={'home_team': 'team'}),
+                    gm[['div', 'season', 'date', 'away_team']].rename(columns={'away_team': 'team'})],
+                   axis=0, ignore_index=True)
+    res = tg.loc[np.repeat(np.arange(len(tg)), n_feature)].reset_index(drop=True)
+    res['field'] = pd.Categorical(np.tile(['feature_' + str(i) for i in range(n_feature)], len(tg)))
+    res['val'] = rng.standard_normal(len(res))
+    res['team'] = res['team'].astype(str).astype('category')
+    return res[['div', 'season', 'team', 'date', 'field', 'val']]
+
+
+def write_bench(data, fp, format, codec):
+    """Stores a dataframe in a format & codec (see `bench_codecs`)."""
+    if format == 'pickle':
+        data.to_pickle(fp, compression=None if codec == 'none' else codec)
+    elif format == 'parquet':
+        pq.write_table(pa.Table.from_pandas(data, preserve_index=False), fp, compression=codec)
+    elif format == 'feather':
+        feather.write_feather(data, fp, compression='uncompressed' if codec == 'none' else codec)
+
+
+def read_bench(fp, format, codec):
+    """Reads a dataframe stored by `write_bench`."""
+    if format == 'pickle':
+        return pd.read_pickle(fp, compression=None if codec == 'none' else codec)
+    elif format == 'parquet':
+        return pq.read_table(fp).to_pandas()
+    elif format == 'feather':
+        return feather.read_feather(fp)
+
+
+def bench_codecs(data, formats=None, n_rep=3, path=None):
+    """Measures write & read throughput and size on disk of a dataframe across storage formats
+    and compression codecs.
+
+    Parameters:
+    -----------
+        data:       pandas dataframe
+                    the data to store (eg. `con_synth_source()` or the actual source data)
+        formats:    list
+                    optional, the [format, codec] pairs to compare (defaults to `bench_formats`)
+        n_rep:      int, default 3
+                    the number of repetitions (the fastest is reported)
+        path:       str
+                    optional, the directory to write to (defaults to a temporary directory). Use a
+                    directory on the same disk as the data (eg. the synced folder).
+
+    Returns:
+    --------
+        A dataframe with format, codec, size (mb), ratio (size relative to pickle without
+        compression), write & read time (seconds) and write & read throughput (mb of the data
+        in memory per second).
+
+    Example:
+    --------
+    source_core = con_synth_source()
+    bench_codecs(data=source_core)
+
+    """
+    formats = bench_formats if formats is None else formats
+    fp = tempfile.mkdtemp(dir=path)
+    data = data.reset_index(drop=True)
+    mb = data.memory_usage(deep=True).sum() / 1e6
+    l = []
+    try:
+        for k, c in formats:
+            fn = os.path.join(fp, k + '_' + c)
+            tw, tr = [], []
+            for i in range(n_rep):
+                t0 = time.perf_counter()
+                write_bench(data, fn, format=k, codec=c)
+                tw.append(time.perf_counter() - t0)
+                t0 = time.perf_counter()
+                read_bench(fn, format=k, codec=c)
+                tr.append(time.perf_counter() - t0)
+            l.append([k, c, os.path.getsize(fn) / 1e6, min(tw), min(tr)])
+            os.remove(fn)
+    finally:
+        shutil.rmtree(fp)
+
+    res = pd.DataFrame(l, columns=['format', 'codec', 'size', 'write', 'read'])
+    base = res.query("format=='pickle' & codec=='none'")['size']
+    res['ratio'] = res['size'] / (base.iloc[0] if len(base) > 0 else res['size'].max())
+    res['write_mbs'] = mb / res['write']
+    res['read_mbs'] = mb / res['read']
+    return res.round(3)
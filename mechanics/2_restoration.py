@@ -1,10 +1,19 @@
 # ----------------------------------------------------
 # --- DATA RESTORATION
 # ----------------------------------------------------
-from fooStrat.processing import update_data_source
+import os
+from fooStrat.constants import fp_data
+from fooStrat.processing import update_data_source, con_xl_schema, comp_field_avail
+
+# schema check (header rows only) -------------------------------------
+fi_nm = [fp_data + 'src_data/' + f for f in os.listdir(fp_data + 'src_data/') if f[:13] == 'all-euro-data']
+schema = con_xl_schema(fi_nm, id_col='Div', n_jobs=4)
+avail = comp_field_avail(schema)
+print(avail.mean().sort_values())
 
 # history update ------------------------------------------------------
 update_data_source(file_desc='all-euro-data',
                    file_key_name='season',
                    file_desc_2='new_leagues_data.xlsx',
-                   file_key_name_2='Season')
+                   file_key_name_2='Season',
+                   n_jobs=4)
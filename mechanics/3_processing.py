@@ -4,44 +4,39 @@
 # This script reads the necessary data files and processes them into the right shape. As of now,
 # two different data source formats are handled: major leagues, minor leagues
 import pandas as pd
-from fooStrat.processing import update_data_latest, update_upcoming_games, add_upcoming_games
-from fooStrat.constants import fp_cloud
-from fooStrat.mapping import odds_fields
-from fooStrat.servicers import get_odds
+from fooStrat.processing import update_data_latest, update_upcoming_games, add_upcoming_games, read_odds_cube
+from fooStrat.constants import fp_data
+from fooStrat.servicers import get_odds_cube
+from fooStrat.store import read_partitions, write_frame
 
 
 # latest update ------------------------------------------------------
-# read existing
-source_core = pd.read_pickle(fp_cloud + 'pro_data/source_core.pkl')
-
 # update data
-update_data_latest(ex=source_core,
-                   new_1='latest_results_major.xlsx',
+update_data_latest(new_1='latest_results_major.xlsx',
                    new_2='latest_results_minor.xlsx',
-                   season='2020-2021')
+                   season='2020-2021',
+                   n_jobs=4)
 # upcoming games
 update_upcoming_games(file_desc='latest_fixtures_major',
                       file_desc_2='latest_fixtures_minor.xlsx',
-                      season='2020-2021')
+                      season='2020-2021',
+                      n_jobs=4)
 # add to source data file
 add_upcoming_games()
 
 
 
 # odds update --------------------------------------------------------
-source_core = pd.read_pickle(fp_cloud + 'pro_data/source_core.pkl')
-match_odds = get_odds(data=source_core,
-                      field_home=list(odds_fields.get('odds_home_win')),
-                      field_away=list(odds_fields.get('odds_away_win')),
-                      field_draw=list(odds_fields.get('odds_draw_win')),
-                      field_25g=list(odds_fields.get('odds_above_25_goal')))
-match_odds.to_pickle(fp_cloud + 'pro_data/match_odds.pkl')
+odds_values, odds_axes = read_odds_cube()
+match_odds = get_odds_cube(values=odds_values, axes=odds_axes)
+write_frame(match_odds, 'match_odds')
 
 
 
 # meta data ----------------------------------------------------------
-leagues_map = pd.DataFrame(source_core.loc[:, 'div'].unique(), columns={'div'})
-leagues_map.to_pickle(fp_cloud + 'src_data/leagues_map.pkl')
+source_core = read_partitions('match_table', columns=['div'])
+leagues_map = pd.DataFrame(source_core.loc[:, 'div'].unique(), columns=['div'])
+leagues_map.to_pickle(fp_data + 'src_data/leagues_map.pkl')
 
 
 
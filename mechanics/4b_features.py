@@ -1,3 +1,3 @@
 import fooStrat.processing as su
-# consolidate feature libraries
-su.consol_flib()
+# merge the append segments of the feature libraries
+su.compact_flib()
@@ -1,16 +1,26 @@
 # STRATEGY TESTING ----------------------------------------------------------------------------------------------------
 import pandas as pd
 import numpy as np
-from fooStrat.constants import fp_cloud
+from fooStrat.constants import fp_data
 import fooStrat.evaluation as se
 from fooStrat.modelling import est_prob, comp_mispriced
-from fooStrat.response import con_res_multi
+from fooStrat.response import read_res
+from fooStrat.store import read_partitions, snapshot_path, read_frame
+from fooStrat.processing import read_flib, flib_name
+from fooStrat.cache import read_cached
 
 # DATA PREPARATIONS ---------------------------------------------------------------------------------------------------
-flib = pd.read_pickle(fp_cloud + 'pro_data/flib_e0.pkl')
-match_odds = pd.read_pickle(fp_cloud + 'pro_data/match_odds.pkl')
-source_core = pd.read_pickle(fp_cloud + 'pro_data/source_core.pkl')
-results = con_res_multi(data=source_core, obj=['win', 'gd'])
+# optionally, read a named snapshot instead of the live data (eg. 'backtest_2021_01')
+snapshot = None
+if snapshot is not None:
+    fp_data = snapshot_path(snapshot)
+# artifacts are read through the cache (see `fooStrat.cache`)
+flib = read_cached(read_flib, flib_name('E0'), div=['E0'], path=fp_data)
+match_odds = read_cached(read_frame, 'match_odds', name='match_odds', path=fp_data)
+source_core = read_cached(read_partitions, 'match_table', name='match_table', div=['E0'],
+                          columns=['div', 'season', 'date', 'home_team', 'away_team', 'FTR', 'FTHG', 'FTAG'],
+                          path=fp_data)
+results = {k: read_cached(read_res, 'results', obj=k, div=['E0'], path=fp_data) for k in ['win', 'gd']}
 # not working at season start with insufficient data
 # flib = flib.query("season not in ['2020']").reset_index(drop=True)
 
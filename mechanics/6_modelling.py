@@ -1,38 +1,54 @@
 # MODEL CONSTRUCTION --------------------------------------------------------------------------------------------------
 import pandas as pd
 import numpy as np
-from fooStrat.constants import fp_cloud
+from fooStrat.constants import fp_data
 import fooStrat.modelling as sm
 import fooStrat.evaluation as se
-from fooStrat.response import con_res
-from fooStrat.servicers import con_est_dates, flib_list, elim_na_features
-from fooStrat.signals import use_features
+from fooStrat.response import read_res
+from fooStrat.store import read_partitions, snapshot_path, read_frame
+from fooStrat.processing import read_flib, flib_features, flib_name
+from fooStrat.cache import read_cached
+from fooStrat.servicers import con_est_dates, flib_list
+from fooStrat.signals import core_features
 
 # DATA LOADING --------------------------------------------------------------------------------------------------------
-# pre-processed
-source_core = pd.read_pickle(fp_cloud + 'pro_data/source_core.pkl')
-match_odds = pd.read_pickle(fp_cloud + 'pro_data/match_odds.pkl')
-results = con_res(data=source_core, obj='win')
+# optionally, run the backtest on a named snapshot instead of the live data (eg. 'backtest_2021_01')
+# - create it with `fooStrat.store.create_snapshot('backtest_2021_01')`
+snapshot = None
+if snapshot is not None:
+    fp_data = snapshot_path(snapshot)
+# pre-processed (read through the cache, see `fooStrat.cache`)
+source_core = read_cached(read_partitions, 'match_table', name='match_table',
+                          columns=['div', 'season', 'date', 'home_team', 'away_team', 'FTR', 'FTHG', 'FTAG'],
+                          path=fp_data)
+match_odds = read_cached(read_frame, 'match_odds', name='match_odds', path=fp_data)
+results = read_cached(read_res, 'results', obj='win', path=fp_data)
 leagues = flib_list(data=source_core)
 # nf0.query("div=='E0' & season=='2020' & date=='2021-01-04'")
 # div_k = 'd1'
 
 epnl_fin = pd.DataFrame()
 for div_k in leagues:
-    flib = pd.read_pickle(fp_cloud + 'pro_data/flib_' + div_k + '.pkl')
-    # data reshaping for evaluation
-    dasetmod = sm.con_mod_datset_0(factors=flib, results=results)
-    dasetmod = elim_na_features(data=dasetmod)
+    # only the core features with sufficient data according to the catalog
+    flib = read_cached(read_flib, flib_name(div_k), div=[div_k],
+                       field=flib_features(div_k, field=core_features, path=fp_data), path=fp_data)
+    # data reshaping for evaluation (memory-mapped factor cube)
+    sm.con_mod_cube(factors=flib, results=results, path=fp_data)
+    foi = [i for i in sm.elim_na_cube(div=div_k, path=fp_data) if i in core_features]
 
     est_dates = con_est_dates(data=source_core, k=5, map_date=True, div=flib['div'].unique())
-    dasetmod_fi = use_features(data=dasetmod)
-    # ensemble model estimation
-    pe = sm.est_hist_proba(data=dasetmod_fi,
-                           est_dates=est_dates,
-                           start_date=np.datetime64('2015-01-01'),
-                           lookback='520W',
-                           categorical=['home'],
-                           models=['nb', 'knn', 'lg', 'dt'])
+    # ensemble model estimation (teams are estimated in parallel on the shared cube), observations with
+    # missing features are left out as by `elim_na_features`
+    pe = sm.est_hist_proba_cube(div=div_k,
+                                est_dates=est_dates,
+                                start_date=np.datetime64('2015-01-01'),
+                                lookback='520W',
+                                features=foi,
+                                categorical=['home'] if 'home' in foi else None,
+                                models=['nb', 'knn', 'lg', 'dt'],
+                                dropna=True,
+                                n_jobs=4,
+                                path=fp_data)
     # note: p1 returns empty DF
     if len(pe) > 0:
         # derive mispriced events
@@ -54,10 +70,10 @@ for div_k in leagues:
 
     print(div_k)
 
-# epnl_fin.to_excel(fp_cloud + 'res_data/' + 'results_approach_win_4' + '.xlsx', engine='openpyxl')
+# epnl_fin.to_excel(fp_data + 'res_data/' + 'results_approach_win_4' + '.xlsx', engine='openpyxl')
 # epnl_fin.groupby(level=0)['val'].mean().round(2)
 
-# a = pd.read_excel(fp_cloud + 'res_data/results_approach_6.xlsx', index_col=0)
+# a = pd.read_excel(fp_data + 'res_data/results_approach_6.xlsx', index_col=0)
 # a.groupby(level=0)['val'].mean().round(2)
 # epnl_fin.loc['profit_total']
 
@@ -1,23 +1,27 @@
 # SIGNALS / PREDICTIONS -----------------------------------------------------------------------------------------------
 import pandas as pd
 import numpy as np
-from fooStrat.constants import fp_cloud
+from fooStrat.constants import fp_data
 import fooStrat.modelling as sm
 import fooStrat.evaluation as se
 import fooStrat.signals as si
-from fooStrat.response import con_res
+from fooStrat.response import read_res
+from fooStrat.store import read_partitions, read_frame
+from fooStrat.processing import read_flib
+from fooStrat.cache import read_cached
 from fooStrat.servicers import con_est_dates, elim_na_features
 
 
 # DATA LOADING --------------------------------------------------------------------------------------------------------
-# pre-processed
-source_core = pd.read_pickle(fp_cloud + 'pro_data/source_core.pkl')
-match_odds = pd.read_pickle(fp_cloud + 'pro_data/match_odds.pkl')
-ucg = pd.read_pickle(fp_cloud + 'pro_data/upcoming_games.pkl')
-flib = pd.read_pickle(fp_cloud + 'pro_data/flib.pkl')
+# pre-processed (read through the cache, see `fooStrat.cache`)
+source_core = read_cached(read_partitions, 'match_table', name='match_table',
+                          columns=['div', 'season', 'date', 'home_team', 'away_team', 'FTR', 'FTHG', 'FTAG'])
+match_odds = read_cached(read_frame, 'match_odds', name='match_odds')
+ucg = read_frame('upcoming_games')
+flib = read_cached(read_flib, 'flib', field=si.core_features)
 
 # data reshaping for evaluation
-results = con_res(data=source_core, obj='lose')
+results = read_cached(read_res, 'results', obj='lose')
 dasetmod = sm.con_mod_datset_0(factors=flib, results=results)
 dasetmod = elim_na_features(data=dasetmod)
 dasetmod = si.use_features(data=dasetmod)
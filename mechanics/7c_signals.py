@@ -1,31 +1,36 @@
 # MODEL CONSTRUCTION --------------------------------------------------------------------------------------------------
 import pandas as pd
 import numpy as np
-from fooStrat.constants import fp_cloud
+from fooStrat.constants import fp_data
 import fooStrat.modelling as sm
 import fooStrat.evaluation as se
-from fooStrat.response import con_res
+from fooStrat.response import read_res
+from fooStrat.store import read_partitions, read_frame
+from fooStrat.processing import read_flib, flib_features, flib_name
+from fooStrat.cache import read_cached
 from fooStrat.servicers import con_est_dates, flib_list, elim_na_features
 from fooStrat.signals import use_features
 
 # DATA LOADING --------------------------------------------------------------------------------------------------------
-# pre-processed
-source_core = pd.read_pickle(fp_cloud + 'pro_data/source_core.pkl')
-match_odds = pd.read_pickle(fp_cloud + 'pro_data/match_odds.pkl')
-results = con_res(data=source_core, obj='25g')
+# pre-processed (read through the cache, see `fooStrat.cache`)
+source_core = read_cached(read_partitions, 'match_table', name='match_table',
+                          columns=['div', 'season', 'date', 'home_team', 'away_team', 'FTHG', 'FTAG'])
+match_odds = read_cached(read_frame, 'match_odds', name='match_odds')
+results = read_cached(read_res, 'results', obj='25g')
 leagues = flib_list(data=source_core)
 # div_k = 'e0'
 
 
 epnl_fin = pd.DataFrame()
 for div_k in leagues:
-    flib = pd.read_pickle(fp_cloud + 'pro_data/flib_' + div_k + '.pkl')
+    foi = ['goal_superiority', 'home', 'avg_goal_scored', 'form_all', 'attack_strength', 'not_failed_scoring',
+           'points_per_game', 'shots_attempted_tgt', 'h2h_next_opponent_chance']
+    # features without sufficient data according to the catalog are not read
+    foi = flib_features(div_k, field=foi) or foi
+    flib = read_cached(read_flib, flib_name(div_k), div=[div_k], field=foi)
     # data reshaping for evaluation
     dasetmod = sm.con_mod_datset_0(factors=flib, results=results)
-    dasetmod_fi = use_features(data=dasetmod,
-                               foi=['goal_superiority', 'home', 'avg_goal_scored', 'form_all',
-                                    'attack_strength', 'not_failed_scoring', 'points_per_game',
-                                    'shots_attempted_tgt', 'h2h_next_opponent_chance'])
+    dasetmod_fi = use_features(data=dasetmod, foi=foi)
     dasetmod_fi = elim_na_features(data=dasetmod_fi)
     est_dates = con_est_dates(data=source_core, k=5, map_date=True, div=flib['div'].unique())
 
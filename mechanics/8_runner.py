@@ -1,7 +1,9 @@
 # ETL RUNNER ----------------------------------------------------------------------------------------------------------
 import os
+import subprocess
 from datetime import datetime
-from fooStrat.constants import fp_cloud_log
+from fooStrat.constants import fp_data_log
+from fooStrat.sync import fetch, start_sync
 # python virtual env
 py_inst = '/Users/dariopopadic/PycharmProjects/fooStrat/venv/bin/python3.7'
 # scripts to execute
@@ -12,16 +14,21 @@ pyf_4 = '/Users/dariopopadic/PycharmProjects/fooStrat/mechanics/4b_features.py'
 pyf_5 = '/Users/dariopopadic/PycharmProjects/fooStrat/mechanics/7a_signals.py'
 pyf_6 = '/Users/dariopopadic/PycharmProjects/fooStrat/mechanics/7b_signals.py'
 pyf_7 = '/Users/dariopopadic/PycharmProjects/fooStrat/mechanics/9_monitoring.py'
+# local working directory: refresh stale files from the cloud folder & mirror results in the background
+fetch()
+stop_sync = start_sync(interval=60)
 os.system(py_inst + ' ' + pyf_1)
 os.system(py_inst + ' ' + pyf_2)
 os.system(py_inst + ' ' + pyf_3)
 os.system(py_inst + ' ' + pyf_4)
-os.system(py_inst + ' ' + pyf_5)
-os.system(py_inst + ' ' + pyf_6)
-os.system(py_inst + ' ' + pyf_7)
+# signal & monitoring jobs only read the stored data, so they run at the same time
+jobs = [subprocess.Popen([py_inst, i]) for i in [pyf_5, pyf_6, pyf_7]]
+for j in jobs:
+    j.wait()
 
 # last update stamp -----------------------------------------------
-fl = fp_cloud_log + 'model_updated.txt'
+fl = fp_data_log + 'model_updated.txt'
 fo = open(fl, 'a+')
 fo.write('\nModel updated on ' + str(datetime.now()))
 fo.close()
+stop_sync()
@@ -1,9 +1,10 @@
 import pandas as pd
-from fooStrat.constants import fp_cloud, fp_cloud_log
+from fooStrat.constants import fp_data, fp_data_log
 from fooStrat.evaluation import trade_monitor
+from fooStrat.store import read_partitions
 
-source_core = pd.read_pickle(fp_cloud + 'pro_data/source_core.pkl')
-trade_monitor(data=source_core, path=fp_cloud_log)
+source_core = read_partitions('match_table', columns=['div', 'season', 'date', 'home_team', 'away_team', 'FTR'])
+trade_monitor(data=source_core, path=fp_data_log)
 
 
 
@@ -0,0 +1,104 @@
+import pandas as pd
+import pytest
+from fooStrat.cache import read_cached, set_cache, clear_cache, cache_info, cache_conf, cache_mem
+from fooStrat.store import read_frame, write_frame, write_segment, read_segments
+
+keys = ['div', 'season', 'team', 'date', 'field']
+calls = []
+
+
+def read_count(name, path):
+    """`read_frame` which records its calls."""
+    calls.append(name)
+    return read_frame(name, path=path)
+
+
+def con_flib(team, val):
+    """A segment of a factor library with one observation per team."""
+    return pd.DataFrame({'div': 'E0',
+                         'season': 2020,
+                         'team': team,
+                         'date': pd.Timestamp('2020-09-12'),
+                         'field': 'home',
+                         'val': val})
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """A fresh cache with its disk tier in tmp_path, the configuration is restored afterwards."""
+    conf = dict(cache_conf)
+    calls.clear()
+    set_cache(mem=10 ** 8, disk=10 ** 8, path=str(tmp_path) + '/cache')
+    clear_cache(disk=True)
+    yield str(tmp_path) + '/'
+    clear_cache(disk=True)
+    cache_conf.update(conf)
+
+
+def test_read_cached_hits_and_invalidates(cache):
+    path = cache
+    write_frame(pd.DataFrame({'x': [1, 2]}), 'match_odds', path=path)
+    a = read_cached(read_count, 'match_odds', path=path, name='match_odds')
+    b = read_cached(read_count, 'match_odds', path=path, name='match_odds')
+    assert b['x'].tolist() == [1, 2] and a['x'].tolist() == [1, 2]
+    assert calls == ['match_odds']
+    assert cache_info()['hit_mem'] == 1
+
+    # a write bumps the version of the dataset
+    write_frame(pd.DataFrame({'x': [3]}), 'match_odds', path=path)
+    assert read_cached(read_count, 'match_odds', path=path, name='match_odds')['x'].tolist() == [3]
+    assert len(calls) == 2
+
+
+def test_read_cached_disk_tier(cache):
+    path = cache
+    write_frame(pd.DataFrame({'x': [1, 2]}), 'match_odds', path=path)
+    read_cached(read_count, 'match_odds', path=path, name='match_odds')
+    # another process starts with an empty memory tier
+    cache_mem.clear()
+    assert read_cached(read_count, 'match_odds', path=path, name='match_odds')['x'].tolist() == [1, 2]
+    assert len(calls) == 1
+    assert cache_info()['hit_disk'] == 1 and cache_info()['disk_items'] == 1
+
+    # outdated versions are replaced on disk
+    write_frame(pd.DataFrame({'x': [3]}), 'match_odds', path=path)
+    read_cached(read_count, 'match_odds', path=path, name='match_odds')
+    assert len(calls) == 2 and cache_info()['disk_items'] == 1
+
+
+def test_read_cached_sub_datasets(cache):
+    path = cache
+    write_segment(con_flib(['a'], [1.0]), 'flib/e0', part='home', path=path)
+    write_segment(con_flib(['a'], [1.0]), 'flib/sp1', part='home', path=path)
+    read_cached(read_segments, 'flib', path=path, name='flib/e0', keys=keys)
+    read_cached(read_segments, 'flib', path=path, name='flib/e0', keys=keys)
+    assert cache_info()['miss'] == 1
+
+    # the write to another league invalidates an artifact read from all leagues
+    write_segment(con_flib(['b'], [2.0]), 'flib/sp1', part='home', path=path)
+    read_cached(read_segments, 'flib', path=path, name='flib/e0', keys=keys)
+    assert cache_info()['miss'] == 2
+
+
+def test_cache_eviction(cache):
+    path = cache
+    for i in range(3):
+        write_frame(pd.DataFrame({'x': range(1000)}), 'tab_' + str(i), path=path)
+        read_cached(read_count, 'tab_' + str(i), path=path, name='tab_' + str(i))
+    size = cache_info()['mem_bytes'] // 3
+    disk = cache_info()['disk_bytes'] // 3
+
+    # only the two most recently used artifacts fit
+    set_cache(mem=2 * size, disk=2 * disk)
+    assert cache_info()['mem_items'] == 2 and cache_info()['disk_items'] == 2
+    read_cached(read_count, 'tab_2', path=path, name='tab_2')
+    assert len(calls) == 3
+    read_cached(read_count, 'tab_0', path=path, name='tab_0')
+    assert len(calls) == 4
+
+    # artifacts beyond the limit are not held at all
+    set_cache(mem=0, disk=0)
+    assert cache_info()['mem_items'] == 0 and cache_info()['disk_items'] == 0
+    read_cached(read_count, 'tab_1', path=path, name='tab_1')
+    read_cached(read_count, 'tab_1', path=path, name='tab_1')
+    assert len(calls) == 6
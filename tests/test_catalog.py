@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+from fooStrat.testing import con_synth_source, con_synth_flib
+from fooStrat.processing import write_source, update_flib, read_flib, delete_flib
+from fooStrat.store import read_catalog
+
+
+def comp_counts(data):
+    return data.assign(n=1, n_valid=data['val'].notna().astype('int64')). \
+        groupby(['field'], observed=True)[['n', 'n_valid']].sum().sort_index()
+
+
+def test_catalog_of_source(tmp_path):
+    path = str(tmp_path) + '/'
+    data = con_synth_source(n_div=2, n_season=2, n_team=4, n_field=12)
+    write_source(data, path=path, overwrite=True)
+
+    res = read_catalog('source_core', path=path)
+    n = data.groupby(['div', 'season', 'field'], observed=True).size()
+    assert res['n'].sum() == len(data)
+    assert len(res) == len(n)
+    assert (res.loc[res['field'] == 'FTR', 'ratio'] == 1).all()
+
+
+def test_catalog_of_flib_updates(tmp_path):
+    path = str(tmp_path) + '/'
+    flib = con_synth_flib(con_synth_source(n_div=1, n_season=2, n_team=4, n_field=12), n_feature=3)
+    flib.loc[flib.index[::10], 'val'] = np.nan
+    dt = np.sort(flib['date'].unique())
+    update_flib([flib[flib['date'] <= dt[len(dt) // 2]]], dir=path, update=False)
+    # the refresh overwrites the latest dates & adds new ones, twice
+    new = flib[flib['date'] >= dt[len(dt) // 3]]
+    update_flib([new], dir=path, update=True)
+    update_flib([new.assign(val=new['val'].fillna(0))], dir=path, update=True)
+
+    cat = read_catalog(path=path).groupby('field')[['n', 'n_valid']].sum().sort_index()
+    exp = comp_counts(read_flib(path=path))
+    assert len(read_flib(path=path)) == len(flib)
+    assert (cat.values == exp.values).all()
+
+    # recreating & deleting features replaces their entries
+    update_flib([flib[flib['field'] == 'feature_0']], dir=path, update=True, recreate_feature=True)
+    delete_flib('feature_1', path=path)
+    cat = read_catalog(path=path).groupby('field')[['n', 'n_valid']].sum().sort_index()
+    exp = comp_counts(read_flib(path=path))
+    assert list(cat.index) == ['feature_0', 'feature_2']
+    assert (cat.values == exp.values).all()
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+from fooStrat.testing import con_synth_source
+from fooStrat.processing import write_source, read_source, read_team_season, read_odds_cube, latest_data_only
+from fooStrat.servicers import expand_field, get_odds_cube
+from fooStrat.mapping import odds_fields
+import fooStrat.features as sf
+from fooStrat.metrics import team_quality_cluster
+
+
+@pytest.fixture(scope='module')
+def path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('data')) + '/'
+    # synthetic source data with the odds fields of the mapping
+    of = [f for k in odds_fields for f in odds_fields[k]]
+    data = con_synth_source(n_div=2, n_season=3, n_team=6, n_field=11 + len(of))
+    data['field'] = data['field'].cat.rename_categories({'odds_' + str(i): f for i, f in enumerate(of)})
+    write_source(data, path=path, overwrite=True)
+    return path
+
+
+@pytest.fixture(scope='module')
+def source(path):
+    return read_source(group=['results', 'half_time'], wide=True, path=path), read_team_season(path=path)
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+def test_feat_turnaround(source):
+    data, _ = source
+    res = sf.feat_turnaround(data)
+    assert set(res['field']) == {'turnaround_ability_last', 'turnaround_ability_trend'}
+    assert res['val'].notna().any()
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+def test_feat_stanbased(source):
+    data, team_season = source
+    res = sf.feat_stanbased(data, team_season=team_season)
+    assert {'team_quality_cluster', 'team_quality_consistency'} <= set(res['field'])
+    assert res['val'].notna().any()
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+def test_team_quality_consistency(source):
+    _, team_season = source
+    res = team_quality_cluster(team_season).query("field == 'team_quality_consistency'")
+    x = team_season.sort_values(['div', 'season', 'team'])
+    # autocorrelation of the points of the last (up to) 5 seasons
+    exp = x.groupby('team')['points'].agg(lambda y: pd.Series(y.values[-5:]).autocorr(lag=1)).dropna()
+    last = res.sort_values('season').groupby('team')['val'].last()
+    np.testing.assert_allclose(last[exp.index].values, exp.values)
+
+
+def test_expand_field_empty():
+    x = pd.DataFrame(columns=['div', 'season', 'date', 'team', 'field', 'val'])
+    assert expand_field(x).empty
+
+
+def test_feat_odds_volatility_from_cube(path, source):
+    data, _ = source
+    res = sf.feat_odds_volatility(data, cube=read_odds_cube(path=path))
+    exp = sf.feat_odds_volatility(read_source(wide=True, path=path))
+    assert len(res) > 0
+    pd.testing.assert_frame_equal(res.astype({'div': str, 'team': str}), exp.astype({'div': str, 'team': str}),
+                                  check_dtype=False)
+
+
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+def test_feat_odds_uncertainty(path, source):
+    data, _ = source
+    cube = read_odds_cube(path=path)
+    res = sf.feat_odds_uncertainty(data, odds=latest_data_only(get_odds_cube(*cube)), cube=cube)
+    assert set(res['field']) == {'odds_volatility', 'odds_accuracy', 'uncertainty_composite'}
@@ -0,0 +1,38 @@
+import pandas as pd
+from fooStrat.helpers import upsert, hash_keys
+
+on = ['div', 'date', 'field']
+
+
+def test_upsert_replaces_matching_keys():
+    x = pd.DataFrame({'div': ['E0', 'E0', 'D1'],
+                      'date': pd.to_datetime(['2020-09-12', '2020-09-19', '2020-09-12']),
+                      'field': ['FTHG', 'FTHG', 'FTHG'],
+                      'val': [1.0, 2.0, 3.0]})
+    y = pd.DataFrame({'div': ['E0', 'I1'],
+                      'date': pd.to_datetime(['2020-09-19', '2020-09-12']),
+                      'field': ['FTHG', 'FTHG'],
+                      'val': [20.0, 4.0]})
+
+    res = upsert(x, y, on=on).sort_values(on).reset_index(drop=True)
+    assert len(res) == 4
+    assert res['val'].tolist() == [3.0, 1.0, 20.0, 4.0]
+
+
+def test_upsert_newest_duplicate_wins():
+    x = pd.DataFrame({'div': ['E0'], 'date': pd.to_datetime(['2020-09-12']), 'field': ['FTHG'], 'val': [1.0]})
+    y = pd.concat([x.assign(val=2.0), x.assign(val=3.0)], axis=0, ignore_index=True)
+
+    res = upsert(x, y, on=on)
+    assert res['val'].tolist() == [3.0]
+
+
+def test_hash_keys_ignore_dtypes():
+    x = pd.DataFrame({'div': pd.Categorical(['E0', 'D1']),
+                      'date': pd.to_datetime(['2020-09-12', '2020-09-19']).astype('datetime64[us]'),
+                      'field': ['FTHG', 'FTAG']})
+    y = pd.DataFrame({'div': ['E0', 'D1'],
+                      'date': pd.to_datetime(['2020-09-12', '2020-09-19']).astype('datetime64[ns]'),
+                      'field': pd.Categorical(['FTHG', 'FTAG'])})
+
+    assert (hash_keys(x, on) == hash_keys(y, on)).all()
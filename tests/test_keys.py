@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+from fooStrat.keys import pack_key, merge_key, anti_join_key, update_keys, read_keys, key_cache
+
+on = ['div', 'season', 'date', 'team']
+
+
+def con_obs(seed, n=200):
+    """Random observations by league, season, date & team (with duplicate keys)."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({'div': rng.choice(['E0', 'D1', 'Brazil Serie A'], n),
+                         'season': rng.choice([2019, 2020], n),
+                         'date': pd.Timestamp('2020-08-01') + pd.to_timedelta(rng.integers(0, 10, n), unit='D'),
+                         'team': rng.choice(['arsenal', 'fulham', 'bayern', 'santos'], n),
+                         'val_' + str(seed): rng.standard_normal(n)})
+
+
+def sort_all(x):
+    return x[sorted(x.columns)].sort_values(sorted(x.columns)).reset_index(drop=True)
+
+
+@pytest.mark.parametrize('how', ['inner', 'left', 'right', 'outer'])
+def test_merge_key_equals_merge(tmp_path, how):
+    path = str(tmp_path) + '/'
+    x, y = con_obs(0), con_obs(1)
+    res = merge_key(x, y, on=on, how=how, path=path)
+    pd.testing.assert_frame_equal(sort_all(res), sort_all(pd.merge(x, y, on=on, how=how)))
+
+
+def con_missing(x):
+    """Upcoming games without a date and a row without a team."""
+    x = x.copy()
+    x.loc[x.index[:5], 'date'] = pd.NaT
+    x.loc[x.index[5], 'team'] = np.nan
+    return x
+
+
+@pytest.mark.parametrize('how', ['inner', 'left', 'right', 'outer'])
+def test_merge_key_missing_keys_never_match(tmp_path, how):
+    path = str(tmp_path) + '/'
+    x, y = con_missing(con_obs(0)), con_missing(con_obs(1))
+    xn, yn = x[on].isna().any(axis=1), y[on].isna().any(axis=1)
+    res = merge_key(x, y, on=on, how=how, path=path)
+
+    exp = [pd.merge(x[~xn], y[~yn], on=on, how=how)]
+    if how in ['left', 'outer']:
+        exp.append(x[xn])
+    if how in ['right', 'outer']:
+        exp.append(y[yn])
+    exp = pd.concat(exp, axis=0, sort=False)
+    pd.testing.assert_frame_equal(sort_all(res), sort_all(exp))
+
+
+def test_anti_join_key_keeps_missing_keys(tmp_path):
+    path = str(tmp_path) + '/'
+    x, y = con_missing(con_obs(0)), con_missing(con_obs(1))
+    xn = x[on].isna().any(axis=1)
+    res = anti_join_key(x, y, on=on, path=path)
+
+    exp = pd.merge(x[~xn], y[on].dropna().drop_duplicates(), on=on, how='left', indicator=True)
+    assert len(res) == (exp['_merge'] == 'left_only').sum() + xn.sum()
+    assert xn[res.index].sum() == xn.sum()
+
+
+def test_pack_key_is_unique(tmp_path):
+    path = str(tmp_path) + '/'
+    x = con_obs(0)
+    k = pack_key(x, on=on, path=path)
+    assert len(np.unique(k)) == len(x[on].drop_duplicates())
+
+
+def test_update_keys_round_trip(tmp_path):
+    path = str(tmp_path) + '/'
+    x = con_obs(0)
+    update_keys(x[['div', 'team']].drop_duplicates(), path=path)
+    k0 = pack_key(x, on=on, path=path)
+
+    # the stored dictionary gives the same keys in a new session
+    key_cache.pop(path)
+    assert (pack_key(x, on=on, path=path) == k0).all()
+    assert set(read_keys(path=path)['team']) == set(x['team'])
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+from fooStrat.testing import con_synth_source, con_synth_flib
+from fooStrat.response import con_res
+from fooStrat.store import open_cube
+import fooStrat.modelling as sm
+
+
+@pytest.fixture(scope='module')
+def cube(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('data')) + '/'
+    data = con_synth_source(n_div=1, n_season=3, n_team=6, n_field=12)
+    results = con_res(data, 'win')
+    flib = con_synth_flib(data, n_feature=3)
+    flib.loc[flib.index[::7], 'val'] = np.nan
+    # a categorical feature
+    home = flib.drop_duplicates(['date', 'team']).assign(field='home')
+    home['val'] = np.where(np.arange(len(home)) % 2 == 0, 1.0, -1.0)
+    flib = pd.concat([flib, home], axis=0, ignore_index=True)
+    flib['field'] = flib['field'].astype(str)
+    sm.con_mod_cube(factors=flib, results=results, path=path)
+    per_ind = results[['div', 'season', 'date']].drop_duplicates().sort_values('date').reset_index(drop=True)
+    data = sm.con_mod_datset_0(factors=flib, results=results.drop('field', axis=1))
+    return open_cube('cube/div_0', path=path), data, per_ind
+
+
+def con_windows(per_ind):
+    dt = per_ind['date'].values
+    return [(dt[i], dt[i + 10]) for i in range(40, len(dt) - 10, 15)]
+
+
+def test_con_mod_datset_2_equals_con_mod_datset_1(cube):
+    (values, axes), data, per_ind = cube
+    team = axes['team'][0]
+    x = data[data['team'] == team].drop('home', axis=1).reset_index(drop=True)
+    for t_fit, t_pred in con_windows(per_ind):
+        res = sm.con_mod_datset_2(values, axes, team=team, per_ind=per_ind, t_fit=t_fit, t_pred=t_pred,
+                                  per='104W', features=['feature_0', 'feature_1', 'feature_2'])
+        exp = sm.con_mod_datset_1(x, per_ind=per_ind, t_fit=t_fit, t_pred=t_pred, per='104W')
+        assert np.isnan(res[0]).any()
+        for i in range(3):
+            np.testing.assert_allclose(res[i], exp[i].astype('float64'), rtol=1e-6)
+        assert (res[3]['date'].values == exp[3]['date'].values).all()
+
+
+def test_con_mod_datset_2_dropna(cube):
+    (values, axes), _, per_ind = cube
+    t_fit, t_pred = con_windows(per_ind)[0]
+    args = dict(team=axes['team'][0], per_ind=per_ind, t_fit=t_fit, t_pred=t_pred, per='104W')
+    res = sm.con_mod_datset_2(values, axes, dropna=True, **args)
+    exp = sm.con_mod_datset_2(values, axes, **args)
+    assert not np.isnan(res[0]).any()
+    assert len(res[0]) == (~np.isnan(exp[0]).any(axis=1)).sum()
+
+
+def test_con_mod_datset_2_categories(cube):
+    (values, axes), _, per_ind = cube
+    ft = ['feature_0', 'home']
+    for team in axes['team']:
+        for t_fit, t_pred in con_windows(per_ind):
+            X_train, X_test, _, _ = sm.con_mod_datset_2(values, axes, team=team, per_ind=per_ind, t_fit=t_fit,
+                                                        t_pred=t_pred, per='8W', features=ft, categorical=['home'])
+            # the feature & a dummy for each category of the cube
+            assert X_train.shape[1] == X_test.shape[1] == 3
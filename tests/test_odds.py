@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+from fooStrat.testing import con_synth_source
+from fooStrat.processing import write_source, read_source, read_odds_cube
+from fooStrat.servicers import con_odds_cube, comp_odds_vol, comp_odds_implied, get_odds, get_odds_cube
+from fooStrat.mapping import odds_fields
+
+
+def con_match_odds():
+    """A match table with the odds of two bookmakers and the maximum & average odds across bookmakers."""
+    res = pd.DataFrame({'div': 'E0',
+                        'season': 2020,
+                        'date': pd.to_datetime(['2020-09-12', '2020-09-19']),
+                        'home_team': ['arsenal', 'fulham'],
+                        'away_team': ['fulham', 'arsenal']})
+    for b, o in [['B365', [2.0, 3.0, 4.0]], ['PS', [2.2, 3.1, 3.6]], ['Max', [2.6, 3.4, 4.5]], ['Avg', [2.1, 3.05, 3.8]]]:
+        for k, v in zip(['H', 'D', 'A'], o):
+            res[b + k] = v
+    return res
+
+
+def test_comp_odds_vol_leaves_out_aggregates():
+    values, axes = con_odds_cube(con_match_odds())
+    vol = comp_odds_vol(values, axes)
+    oc = list(axes['outcome'])
+    exp = np.std([[2.0, 3.0, 4.0], [2.2, 3.1, 3.6]], axis=0, ddof=1)
+    np.testing.assert_allclose(vol[:, [oc.index('home'), oc.index('draw'), oc.index('away')]],
+                               np.tile(exp, (2, 1)), rtol=1e-6)
+    assert np.isnan(vol[:, oc.index('over')]).all()
+
+
+def test_comp_odds_implied_leaves_out_aggregates():
+    values, axes = con_odds_cube(con_match_odds())
+    res = comp_odds_implied(values, axes)
+    oc = list(axes['outcome'])
+    exp = 1 / np.array([2.2, 3.1, 4.0])
+    np.testing.assert_allclose(res[:, [oc.index('home'), oc.index('draw'), oc.index('away')]],
+                               np.tile(exp / exp.sum(), (2, 1)), rtol=1e-6)
+
+
+def test_get_odds_cube_equals_get_odds(tmp_path):
+    path = str(tmp_path) + '/'
+    of = [f for k in odds_fields for f in odds_fields[k]]
+    data = con_synth_source(n_div=2, n_season=2, n_team=6, n_field=11 + len(of))
+    data['field'] = data['field'].cat.rename_categories({'odds_' + str(i): f for i, f in enumerate(of)})
+    # some games without 2.5 goals odds, some without any odds
+    gm = data['date'].dt.day
+    ou = data['field'].isin(odds_fields['odds_above_25_goal'] + odds_fields['odds_under_25_goal'])
+    data = data[~((gm % 3 == 0) & ou) & ~((gm % 7 == 0) & data['field'].isin(of))]
+    # get_odds is by team & date, so teams play at most once a day
+    gm = data[['date', 'home_team', 'away_team']].drop_duplicates()
+    tg = pd.concat([gm[['date', 'home_team']].set_axis(['date', 'team'], axis=1),
+                    gm[['date', 'away_team']].set_axis(['date', 'team'], axis=1)], axis=0)
+    data = data[~data['date'].isin(tg.loc[tg.duplicated(), 'date'])]
+    write_source(data, path=path, overwrite=True)
+
+    src = read_source(group=['odds'], path=path)
+    exp = get_odds(src, odds_fields['odds_home_win'], odds_fields['odds_away_win'],
+                   odds_fields['odds_draw_win'], odds_fields['odds_above_25_goal'])
+    res = get_odds_cube(*read_odds_cube(path=path))
+    assert res['val'].notna().all()
+
+    keys = ['div', 'season', 'date', 'team', 'field']
+    exp = exp.dropna(subset=['val']).astype({'div': str, 'team': str, 'field': str})
+    res = res.astype({'div': str, 'team': str, 'field': str})
+    pd.testing.assert_frame_equal(res[keys + ['val']].sort_values(keys).reset_index(drop=True),
+                                  exp[keys + ['val']].sort_values(keys).reset_index(drop=True),
+                                  check_dtype=False, rtol=1e-5)
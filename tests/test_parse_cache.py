@@ -0,0 +1,81 @@
+import os
+import pandas as pd
+import fooStrat.processing as fopr
+from fooStrat.processing import read_workbook, xl_cache_dir, prune_xl_cache
+
+key_cols_l = ['Div', 'Date', 'HomeTeam', 'AwayTeam']
+key_cols_map = {'HT': 'HomeTeam', 'AT': 'AwayTeam'}
+
+
+def write_xl(file, goals):
+    """An excel file of major leagues with a tab per league."""
+    with pd.ExcelWriter(file, engine='openpyxl') as x:
+        for k in ['E0', 'SP1']:
+            pd.DataFrame({'Div': k,
+                          'Date': pd.to_datetime(['2020-09-12', '2020-09-19']),
+                          'HomeTeam': ['a', 'b'],
+                          'AwayTeam': ['b', 'a'],
+                          'FTHG': goals,
+                          'FTAG': [0, 1]}).to_excel(x, sheet_name=k, index=False)
+
+
+def read_xl(file, path):
+    return read_workbook(file, key=['season', '2020-2021'], key_cols_l=key_cols_l, key_cols_map=key_cols_map,
+                         path=path)
+
+
+def list_cache(path):
+    fp = xl_cache_dir(path=path)
+    return sorted(i for i in os.listdir(fp) if i.endswith('.pkl')) if os.path.isdir(fp) else []
+
+
+def test_read_workbook_cache(tmp_path, monkeypatch):
+    path = str(tmp_path) + '/'
+    os.makedirs(path + 'src_data')
+    file = path + 'src_data/all-euro-data-2020-2021.xlsx'
+    write_xl(file, [1, 2])
+    calls = []
+    parse = fopr.parse_workbook
+
+    def parse_count(file, **kwargs):
+        calls.append(file)
+        return parse(file, **kwargs)
+
+    monkeypatch.setattr(fopr, 'parse_workbook', parse_count)
+
+    res = read_xl(file, path)
+    assert len(calls) == 1 and len(list_cache(path)) == 1
+    hit = read_xl(file, path)
+    assert len(calls) == 1
+    pd.testing.assert_frame_equal(hit, res)
+    assert res.loc[res['field'] == 'FTHG', 'val'].tolist() == [1, 2, 1, 2]
+
+    # a modified file is parsed again & replaces its entry
+    write_xl(file, [3, 4])
+    res = read_xl(file, path)
+    assert len(calls) == 2 and len(list_cache(path)) == 1
+    assert res.loc[res['field'] == 'FTHG', 'val'].tolist() == [3, 4, 3, 4]
+
+
+def test_prune_xl_cache(tmp_path, monkeypatch):
+    path = str(tmp_path) + '/'
+    os.makedirs(path + 'src_data')
+    fa = path + 'src_data/all-euro-data-2019-2020.xlsx'
+    fb = path + 'src_data/all-euro-data-2020-2021.xlsx'
+    write_xl(fa, [1, 2])
+    write_xl(fb, [3, 4])
+    read_xl(fa, path)
+    read_xl(fb, path)
+    assert prune_xl_cache(path=path) == 0 and len(list_cache(path)) == 2
+
+    # entries of files that are gone are removed
+    os.remove(fa)
+    assert prune_xl_cache(path=path) == 1
+    assert len(list_cache(path)) == 1
+
+    # a new cache version starts empty & the entries of the old version are removed
+    old = xl_cache_dir(path=path)
+    monkeypatch.setattr(fopr, 'xl_cache_version', fopr.xl_cache_version + 1)
+    assert xl_cache_dir(path=path) != old and len(list_cache(path)) == 0
+    assert prune_xl_cache(path=path) == 1
+    assert not os.path.isdir(old)
@@ -0,0 +1,26 @@
+import pandas as pd
+import pyarrow.parquet as pq
+from fooStrat.testing import con_synth_source
+from fooStrat.processing import write_source
+from fooStrat.store import list_partitions, read_partitions
+from fooStrat.mapping import match_cols
+
+
+def test_match_table_schema(tmp_path):
+    path = str(tmp_path) + '/'
+    data = con_synth_source(n_div=2, n_season=2, n_team=4, n_field=12)
+    # a league without statistics & a season without results
+    data = data[~((data['div'] == 'div_1') & data['field'].isin(['HS', 'AS', 'HC', 'AC']))]
+    data = data[~((data['season'] == 2011) & (data['field'] == 'FTR'))]
+    write_source(data, path=path, overwrite=True)
+
+    prt = list_partitions('match_table', path=path)
+    sch = [pq.read_schema(p) for p in prt['file']]
+    assert len(sch) == 4
+    assert all(i.equals(sch[0]) for i in sch)
+    assert sch[0].names[:5 + len(match_cols)] == ['div', 'season', 'date', 'home_team', 'away_team'] + match_cols
+
+    res = read_partitions('match_table', path=path)
+    assert str(res['FTR'].dtype) == 'category' and str(res['HS'].dtype) == 'float32'
+    assert res.loc[res['div'] == 'div_1', 'HS'].isna().all()
+    assert res.loc[res['season'] == 2010, 'FTR'].notna().all()
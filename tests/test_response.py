@@ -0,0 +1,26 @@
+import pandas as pd
+import pytest
+from fooStrat.testing import con_synth_source
+from fooStrat.processing import write_source
+from fooStrat.response import con_res, read_res
+
+
+@pytest.fixture(scope='module')
+def source(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('data')) + '/'
+    data = con_synth_source(n_div=2, n_season=2, n_team=6, n_field=12)
+    write_source(data, path=path, overwrite=True)
+    return data, path
+
+
+def sort_res(x):
+    cols = [i for i in ['div', 'season', 'date', 'team', 'field', 'val'] if i in x.columns]
+    x = x[cols].astype({i: str for i in ['div', 'team', 'field'] if i in cols})
+    return x.sort_values(cols).reset_index(drop=True)
+
+
+@pytest.mark.parametrize('obj', ['win', 'draw', 'lose', 'wdl', 'gd', '25g'])
+def test_read_res_equals_con_res(source, obj):
+    data, path = source
+    pd.testing.assert_frame_equal(sort_res(read_res(obj, path=path)), sort_res(con_res(data, obj)),
+                                  check_dtype=False)
@@ -0,0 +1,73 @@
+import pandas as pd
+import pytest
+from fooStrat.store import dataset_version, write_frame, read_frame, write_segment, read_segments, \
+    write_partitions, read_partitions, create_snapshot, snapshot_path, list_snapshots, delete_snapshot
+
+keys = ['div', 'season', 'team', 'date', 'field']
+
+
+def con_flib(team, val):
+    """A segment of a factor library with one observation per team."""
+    return pd.DataFrame({'div': 'E0',
+                         'season': 2020,
+                         'team': team,
+                         'date': pd.Timestamp('2020-09-12'),
+                         'field': 'home',
+                         'val': val})
+
+
+def con_table(season):
+    return pd.DataFrame({'div': 'E0', 'season': season, 'team': ['a', 'b'], 'val': [1.0, 2.0]})
+
+
+def test_snapshot_unaffected_by_later_writes(tmp_path):
+    path = str(tmp_path) + '/'
+    write_frame(pd.DataFrame({'x': [1, 2]}), 'match_odds', path=path)
+    write_segment(con_flib(['a', 'b'], [1.0, 2.0]), 'flib/e0', part='home', path=path)
+    write_partitions(con_table(2020), 'match_table', path=path)
+
+    create_snapshot('bt', datasets=['match_odds', 'flib', 'match_table'], path=path)
+    write_frame(pd.DataFrame({'x': [3]}), 'match_odds', path=path)
+    write_segment(con_flib(['a'], [10.0]), 'flib/e0', part='home', path=path)
+    write_partitions(con_table(2021), 'match_table', path=path)
+
+    sp = snapshot_path('bt', path=path)
+    assert read_frame('match_odds', path=sp)['x'].tolist() == [1, 2]
+    assert read_segments('flib/e0', keys=keys, path=sp).sort_values('team')['val'].tolist() == [1.0, 2.0]
+    assert read_partitions('match_table', path=sp)['season'].unique().tolist() == [2020]
+    # the live data moves on
+    assert read_frame('match_odds', path=path)['x'].tolist() == [3]
+    assert read_segments('flib/e0', keys=keys, path=path).sort_values('team')['val'].tolist() == [10.0, 2.0]
+
+
+def test_snapshot_keeps_versions(tmp_path):
+    path = str(tmp_path) + '/'
+    write_frame(pd.DataFrame({'x': [1]}), 'match_odds', path=path)
+    write_segment(con_flib(['a'], [1.0]), 'flib/e0', part='home', path=path)
+    create_snapshot('bt', datasets=['match_odds', 'flib'], path=path)
+    write_frame(pd.DataFrame({'x': [2]}), 'match_odds', path=path)
+
+    sp = snapshot_path('bt', path=path)
+    assert dataset_version('match_odds', path=sp) == 1
+    assert dataset_version('flib/e0', path=sp) == dataset_version('flib/e0', path=path)
+    assert dataset_version('match_odds', path=path) == 2
+
+
+def test_snapshot_list_overwrite_delete(tmp_path):
+    path = str(tmp_path) + '/'
+    write_frame(pd.DataFrame({'x': [1]}), 'match_odds', path=path)
+    create_snapshot('b', datasets=['match_odds'], path=path)
+    create_snapshot('a', datasets=['match_odds.feather'], path=path)
+    assert list_snapshots(path=path) == ['a', 'b']
+
+    with pytest.raises(ValueError):
+        create_snapshot('a', datasets=['match_odds'], path=path)
+    write_frame(pd.DataFrame({'x': [2]}), 'match_odds', path=path)
+    create_snapshot('a', datasets=['match_odds'], path=path, overwrite=True)
+    assert read_frame('match_odds', path=snapshot_path('a', path=path))['x'].tolist() == [2]
+
+    delete_snapshot('b', path=path)
+    assert list_snapshots(path=path) == ['a']
+    with pytest.raises(ValueError):
+        snapshot_path('b', path=path)
+    assert read_frame('match_odds', path=path)['x'].tolist() == [2]
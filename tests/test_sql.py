@@ -0,0 +1,57 @@
+import pandas as pd
+from fooStrat.testing import con_synth_source, con_synth_flib
+from fooStrat.processing import write_source, update_flib, read_flib, flib_keys
+from fooStrat.store import write_frame, write_partitions
+from fooStrat.sql import connect_store, query_store
+
+
+def test_sql_source_view(tmp_path):
+    path = str(tmp_path) + '/'
+    data = con_synth_source(n_div=2, n_season=2, n_team=4, n_field=12)
+    write_source(data, path=path, overwrite=True)
+    div = data['div'].cat.categories[0]
+    season = int(data['season'].max())
+
+    res = query_store("select count(*) as n from source_core", path=path)
+    assert res['n'].iloc[0] == len(data)
+    res = query_store("select distinct div, season from source_core", div=[div], season=[season], path=path)
+    assert res['div'].astype(str).tolist() == [div]
+    assert res['season'].astype(int).tolist() == [season]
+
+
+def test_sql_views_union_by_name(tmp_path):
+    path = str(tmp_path) + '/'
+    # a partition written before a column was added
+    write_partitions(pd.DataFrame({'div': 'E0', 'season': 2019, 'team': ['a', 'b'], 'val': [1.0, 2.0]}),
+                     'match_table', path=path)
+    write_partitions(pd.DataFrame({'div': 'E0', 'season': 2020, 'team': ['a', 'b'], 'val': [3.0, 4.0],
+                                   'xg': [0.5, 1.5]}), 'match_table', path=path)
+    res = query_store("select season, team, val, xg from match_table order by season, team", path=path)
+    assert res['val'].tolist() == [1.0, 2.0, 3.0, 4.0]
+    assert res['xg'].isna().tolist() == [True, True, False, False]
+
+    write_frame(pd.DataFrame({'div': ['E0', 'SP1'], 'season': [2020, 2020], 'field': 'odds_win',
+                              'val': [2.0, 3.0]}), 'match_odds', path=path)
+    res = query_store("select div, val from match_odds", div=['SP1'], path=path)
+    assert res['div'].tolist() == ['SP1'] and res['val'].tolist() == [3.0]
+
+    con = connect_store(path=path)
+    v = set(con.execute("select table_name from information_schema.tables").df()['table_name'])
+    con.close()
+    assert {'match_table', 'match_odds'} <= v and 'results' not in v
+
+
+def test_sql_flib_newest_wins(tmp_path):
+    path = str(tmp_path) + '/'
+    flib = con_synth_flib(con_synth_source(n_div=2, n_season=2, n_team=4, n_field=12), n_feature=2)
+    update_flib([flib], dir=path, update=False)
+    dt = flib['date'].max()
+    update_flib([flib[flib['date'] == dt].assign(val=-1.0)], dir=path, update=True)
+
+    res = query_store("select * from flib", path=path)
+    exp = read_flib(path=path)
+    res = res.sort_values(flib_keys).reset_index(drop=True)
+    exp = exp.sort_values(flib_keys).reset_index(drop=True)
+    assert len(res) == len(exp) == len(flib)
+    assert (res['val'].values == exp['val'].values).all()
+    assert (res.loc[res['date'] == dt, 'val'] == -1.0).all()
@@ -0,0 +1,83 @@
+import pandas as pd
+from fooStrat.store import dataset_version, write_segment, read_segments, compact_segments, replace_segments, list_segments, \
+    write_partitions, read_partitions
+
+keys = ['div', 'season', 'team', 'date', 'field']
+
+
+def con_segment(team, val, field='home'):
+    """A segment of a factor library with one observation per team."""
+    return pd.DataFrame({'div': 'E0',
+                         'season': 2020,
+                         'team': team,
+                         'date': pd.Timestamp('2020-09-12'),
+                         'field': field,
+                         'val': val})
+
+
+def sort_keys(x):
+    return x[keys + ['val']].sort_values(keys).reset_index(drop=True)
+
+
+def test_read_segments_newest_wins(tmp_path):
+    path = str(tmp_path) + '/'
+    write_segment(con_segment(['a', 'b', 'c'], [1.0, 2.0, 3.0]), 'flib/e0', part='home', path=path)
+    write_segment(con_segment(['b', 'd'], [20.0, 40.0]), 'flib/e0', part='home', path=path)
+    write_segment(con_segment(['c'], [300.0]), 'flib/e0', part='home', path=path)
+
+    res = read_segments('flib/e0', keys=keys, path=path)
+    assert len(list_segments('flib/e0', path=path)) == 3
+    assert sort_keys(res)['val'].tolist() == [1.0, 20.0, 300.0, 40.0]
+
+
+def test_compact_segments_keeps_newest(tmp_path):
+    path = str(tmp_path) + '/'
+    write_segment(con_segment(['a', 'b', 'c'], [1.0, 2.0, 3.0]), 'flib/e0', part='home', path=path)
+    write_segment(con_segment(['b'], [20.0]), 'flib/e0', part='home', path=path)
+    write_segment(con_segment(['c', 'd'], [30.0, 40.0]), 'flib/e0', part='home', path=path)
+    write_segment(con_segment(['a'], [10.0], field='away'), 'flib/e0', part='away', path=path)
+    before = sort_keys(read_segments('flib/e0', keys=keys, path=path))
+
+    ce = compact_segments('flib/e0', keys=keys, min_segments=2, full=True, path=path)
+    assert ce == ['home']
+    assert len(list_segments('flib/e0', part=['home'], path=path)) == 1
+    pd.testing.assert_frame_equal(sort_keys(read_segments('flib/e0', keys=keys, path=path)), before)
+
+    # appended after compaction, the newest segment still wins
+    write_segment(con_segment(['a'], [100.0]), 'flib/e0', part='home', path=path)
+    res = sort_keys(read_segments('flib/e0', keys=keys, part=['home'], path=path))
+    assert res['val'].tolist() == [100.0, 20.0, 30.0, 40.0]
+
+
+def test_compact_segments_without_work_keeps_version(tmp_path):
+    path = str(tmp_path) + '/'
+    write_segment(con_segment(['a', 'b'], [1.0, 2.0]), 'flib/e0', part='home', path=path)
+    write_segment(con_segment(['b'], [20.0]), 'flib/e0', part='home', path=path)
+    v = dataset_version('flib/e0', path=path)
+
+    assert compact_segments('flib/e0', keys=keys, min_segments=4, path=path) == []
+    assert dataset_version('flib/e0', path=path) == v
+    assert compact_segments('flib/e0', keys=keys, min_segments=2, full=True, path=path) == ['home']
+    assert dataset_version('flib/e0', path=path) > v
+
+
+def test_replace_segments(tmp_path):
+    path = str(tmp_path) + '/'
+    write_segment(con_segment(['a', 'b'], [1.0, 2.0]), 'flib/e0', part='home', path=path)
+    write_segment(con_segment(['b'], [20.0]), 'flib/e0', part='home', path=path)
+    replace_segments(con_segment(['c'], [3.0]), 'flib/e0', part='home', path=path)
+
+    res = read_segments('flib/e0', keys=keys, path=path)
+    assert len(list_segments('flib/e0', path=path)) == 1
+    assert res['team'].astype(str).tolist() == ['c']
+
+
+def test_write_partitions_replaces_partitions(tmp_path):
+    path = str(tmp_path) + '/'
+    x = pd.DataFrame({'div': ['E0', 'E0', 'D1'], 'season': [2019, 2020, 2020], 'val': [1.0, 2.0, 3.0]})
+    write_partitions(x, 'test', path=path)
+    write_partitions(pd.DataFrame({'div': ['E0'], 'season': [2020], 'val': [20.0]}), 'test', path=path)
+
+    res = read_partitions('test', path=path).sort_values(['div', 'season']).reset_index(drop=True)
+    assert res['val'].tolist() == [3.0, 1.0, 20.0]
+    assert read_partitions('test', div=['D1'], path=path)['val'].tolist() == [3.0]